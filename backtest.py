@@ -0,0 +1,232 @@
+# backtest.py
+import os
+import re
+import sys
+import glob
+import argparse
+
+import numpy as np
+import pandas as pd
+
+import bar_cache
+import stock_bot
+from stock_bot import BotConfig
+
+# ==============================================================================
+# ⚙️ 설정
+# ==============================================================================
+LOG_DIR = "logs"
+
+class ConfigView:
+    """BotConfig 값을 그대로 쓰되 overrides 에 있는 항목만 덮어쓰는 읽기 전용 뷰 (파라미터 스윕용)"""
+    def __init__(self, overrides=None):
+        self.overrides = dict(overrides or {})
+
+    def __getattr__(self, name):
+        if name in self.overrides: return self.overrides[name]
+        return getattr(BotConfig, name)
+
+# ==============================================================================
+# 1. value_volume_log 로딩 + 수급 속도 계산 (종목/일자 그룹 단일 패스)
+# ==============================================================================
+def load_value_logs(log_dir=LOG_DIR):
+    """
+    logs/value_volume_log_*.csv 전체를 하나의 DataFrame 으로 읽고 종목·일자별로 정렬한 뒤
+    직전 로깅 시점 대비 분당 거래대금/프로그램 유입 속도(억/분)와 가격 변화를 붙입니다.
+    """
+    frames = []
+    for path in sorted(glob.glob(os.path.join(log_dir, "value_volume_log_*.csv"))):
+        date_str = re.search(r"(\d{8})", os.path.basename(path)).group(1)
+        df = pd.read_csv(path, encoding="utf-8-sig", dtype={"Code": str})
+        df.columns = ["Time", "Code", "Name", "Price", "Volume", "Trade_Amt", "Rate", "PG_Amt", "Market_Cap"][:len(df.columns)]
+        df["Date"] = date_str
+        frames.append(df)
+    if not frames:
+        return pd.DataFrame()
+
+    df = pd.concat(frames, ignore_index=True)
+    for c in ["Price", "Volume", "Trade_Amt", "Rate", "PG_Amt", "Market_Cap"]:
+        if c not in df.columns: df[c] = 0
+        df[c] = pd.to_numeric(df[c].astype(str).str.replace(",", ""), errors="coerce").fillna(0)
+    df["Code"] = df["Code"].astype(str).str.zfill(6)
+    df["Name"] = df["Name"].astype(str)
+    t = df["Time"].astype(str).str.split(":", expand=True).astype(int)
+    df["Sec"] = t[0] * 3600 + t[1] * 60 + t[2]
+
+    df = df.sort_values(["Code", "Date", "Sec"], kind="mergesort").reset_index(drop=True)
+
+    code = df["Code"].to_numpy()
+    date = df["Date"].to_numpy()
+    sec = df["Sec"].to_numpy(dtype=np.float64)
+    trade = df["Trade_Amt"].to_numpy(dtype=np.float64)
+    pg = df["PG_Amt"].to_numpy(dtype=np.float64)
+    price = df["Price"].to_numpy(dtype=np.float64)
+
+    same = np.zeros(len(df), dtype=bool)
+    same[1:] = (code[1:] == code[:-1]) & (date[1:] == date[:-1])
+    dt_min = np.zeros(len(df))
+    dt_min[1:] = (sec[1:] - sec[:-1]) / 60.0
+    valid = same & (dt_min > 0)
+    safe_dt = np.where(valid, dt_min, 1.0)
+
+    d_trade = np.zeros(len(df)); d_trade[1:] = trade[1:] - trade[:-1]
+    d_pg = np.zeros(len(df)); d_pg[1:] = pg[1:] - pg[:-1]
+    d_price = np.zeros(len(df)); d_price[1:] = price[1:] - price[:-1]
+
+    df["has_prev"] = valid
+    df["trade_speed"] = np.where(valid, d_trade / safe_dt, 0.0)
+    df["pg_speed"] = np.where(valid, d_pg / safe_dt, 0.0)
+    df["price_diff"] = np.where(valid, d_price, 0.0)
+
+    # 이름 기반 플래그는 설정과 무관하므로 한 번만 계산
+    exclude_pat = "|".join(re.escape(k) for k in BotConfig.EXCLUDE_KEYWORDS)
+    etf_pat = "|".join(re.escape(k) for k in BotConfig.ETF_KEYWORDS)
+    df["excluded"] = df["Name"].str.endswith("우") | df["Name"].str.contains(exclude_pat, regex=True)
+    df["is_etf"] = df["Name"].str.contains(etf_pat, regex=True)
+    return df
+
+# ==============================================================================
+# 2. 진입 필터 체인 (BotConfig 그대로 적용)
+# ==============================================================================
+def signal_mask(df, cfg=BotConfig):
+    """
+    봇의 REST 스캔 필터 체인을 벡터 연산으로 적용합니다.
+    로그에 없는 값(시가·고가)이 필요한 양봉 필터는 일봉을 붙인 뒤 first_signals 에서,
+    장중 고가가 필요한 윗꼬리 필터는 미래 참조가 되므로 적용하지 않습니다.
+    :param df: DataFrame 또는 컬럼명 -> 배열 dict (스윕 워커의 memmap 배열)
+    """
+    price = np.asarray(df["Price"])
+    rate = np.asarray(df["Rate"])
+    trade_won = np.asarray(df["Trade_Amt"]) * 100_000_000
+    pg_won = np.asarray(df["PG_Amt"]) * 100_000_000
+    mcap = np.asarray(df["Market_Cap"])
+    sec = np.asarray(df["Sec"])
+    is_etf = np.asarray(df["is_etf"])
+
+    mask = ~np.asarray(df["excluded"])
+    mask &= (price >= cfg.MIN_STOCK_PRICE) & (price <= cfg.MAX_STOCK_PRICE)
+
+    # 수급 속도 (분당 거래대금 유입 + 가격 상승)
+    mask &= np.asarray(df["has_prev"]) & (np.asarray(df["trade_speed"]) >= cfg.TRADE_SPEED_MIN) & (np.asarray(df["price_diff"]) > 0)
+
+    # 투-트랙 시간대별 누적 거래대금
+    in_track = np.zeros(len(price), dtype=bool)
+    for start, end, min_amt, max_amt in cfg.ENTRY_TRACKS:
+        s = start.hour * 3600 + start.minute * 60 + start.second
+        e = end.hour * 3600 + end.minute * 60 + end.second
+        in_track |= (sec >= s) & (sec <= e) & (trade_won >= min_amt) & (trade_won <= max_amt)
+    mask &= in_track
+
+    mask &= (rate >= cfg.MIN_RATE_LIMIT) & (rate <= cfg.MAX_RATE_LIMIT)
+    mask &= is_etf | ~((pg_won >= cfg.PROGRAM_BUY_AMBIGUOUS_MIN) & (pg_won < cfg.PROGRAM_BUY_AMBIGUOUS_MAX))
+    mask &= (mcap >= cfg.MIN_MARKET_CAP) & (mcap <= cfg.MAX_MARKET_CAP)
+    return mask
+
+def first_signals(df, mask, bars):
+    """
+    종목별 하루 1회 진입 (봇과 같은 순서: 양봉 필터까지 통과한 시그널 중 가장 먼저 포착된 시점)
+    첫 시그널이 양봉 필터(현재가 >= 시가)에 걸려도 같은 날 이후 시그널은 그대로 후보로 남습니다.
+    :param bars: load_daily_bars 결과 (Open/High/Low/Close 가 붙은 시그널을 반환)
+    """
+    signals = df[mask].merge(bars, on=["Code", "Date"], how="inner")
+    signals = signals[signals["Price"] >= signals["Open"]]
+    return signals.drop_duplicates(subset=["Date", "Code"], keep="first").copy()
+
+# ==============================================================================
+# 3. 일봉 캐시 (bar_cache 파티션: (종목, 일자)당 1회만 조회)
+# ==============================================================================
+def load_daily_bars(pairs, cache_dir=bar_cache.CACHE_DIR):
+    """
+    :param pairs: (Code, Date 'YYYYMMDD') 쌍 목록
+    :return: Code, Date, Open, High, Low, Close DataFrame (캐시에 없는 쌍만 FinanceDataReader 로 조회)
+    """
+    cols = ["Code", "Date", "Open", "High", "Low", "Close"]
+    bars = bar_cache.load_daily_bars(pairs, cache_dir)
+    rows = [(code, date_str, o, h, l, c) for (code, date_str), (o, h, l, c, _) in bars.items()]
+    return pd.DataFrame(rows, columns=cols)
+
+# ==============================================================================
+# 4. 청산 시뮬레이션 (일봉 기준)
+# ==============================================================================
+OUTCOME_TAKE, OUTCOME_STOP, OUTCOME_BOTH, OUTCOME_CLOSE = "익절", "손절", "롤러코스터", "종가청산"
+
+def simulate_exits(signals, cfg=BotConfig):
+    """
+    +PARTIAL_PROFIT_RATE 익절 / HARD_STOP_RATE 손절을 일봉 고가·저가로 판정합니다.
+    둘 다 닿은 날은 순서를 알 수 없으므로 종가로 청산한 것으로 봅니다. (정확한 순서는 replay.py 사용)
+    :param signals: first_signals 결과 (일봉이 붙어 있음)
+    """
+    merged = signals.copy()
+    if merged.empty: return merged
+
+    outcome, profit = exit_profits(merged["Price"].to_numpy(), merged["High"].to_numpy(),
+                                   merged["Low"].to_numpy(), merged["Close"].to_numpy(), cfg)
+    merged["Outcome"] = outcome
+    merged["Profit"] = profit
+    return merged
+
+def exit_profits(buy, high, low, close, cfg=BotConfig):
+    """일봉 고가·저가·종가 배열로 (청산 구분, 수익률%) 배열 계산"""
+    buy = np.asarray(buy, dtype=np.float64)
+    max_profit = (np.asarray(high) - buy) / buy
+    max_loss = (np.asarray(low) - buy) / buy
+    close_profit = (np.asarray(close) - buy) / buy
+
+    take = max_profit >= cfg.PARTIAL_PROFIT_RATE
+    stop = max_loss <= cfg.HARD_STOP_RATE
+    outcome = np.select([take & stop, take, stop], [OUTCOME_BOTH, OUTCOME_TAKE, OUTCOME_STOP], OUTCOME_CLOSE)
+    profit = np.select([take & stop, take, stop], [close_profit, cfg.PARTIAL_PROFIT_RATE, cfg.HARD_STOP_RATE], close_profit) * 100
+    return outcome, profit
+
+def summarize(trades):
+    """기대값(평균 수익률), 승률, 누적 수익 곡선 기준 최대 낙폭(%p)"""
+    if trades is None or trades.empty:
+        return summarize_profits(np.zeros(0))
+    return summarize_profits(trades.sort_values(["Date", "Sec"])["Profit"].to_numpy())
+
+def summarize_profits(profit):
+    """시간순으로 정렬된 거래별 수익률(%) 배열 -> 통계"""
+    if len(profit) == 0:
+        return {"trades": 0, "expectancy": 0.0, "hit_rate": 0.0, "max_drawdown": 0.0, "total": 0.0}
+    equity = np.cumsum(profit)
+    drawdown = np.maximum.accumulate(np.concatenate([[0.0], equity]))[1:] - equity
+    return {
+        "trades": len(profit),
+        "expectancy": float(profit.mean()),
+        "hit_rate": float((profit > 0).mean() * 100),
+        "max_drawdown": float(drawdown.max()),
+        "total": float(equity[-1]),
+    }
+
+def run_backtest(df, bars, cfg=BotConfig):
+    signals = first_signals(df, signal_mask(df, cfg), bars)
+    return simulate_exits(signals, cfg)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="value_volume_log 기반 밸류킹 벡터 백테스트")
+    parser.add_argument("--log-dir", default=LOG_DIR)
+    parser.add_argument("--out", default="backtest_result.csv")
+    args = parser.parse_args()
+
+    df = load_value_logs(args.log_dir)
+    if df.empty:
+        print(f"❌ '{args.log_dir}' 에 value_volume_log_*.csv 가 없습니다.")
+        sys.exit(1)
+
+    mask = signal_mask(df)
+    # 양봉 필터 전 후보 전체의 일봉을 붙여야 첫 시그널이 걸러진 날도 이후 시그널로 진입 가능
+    candidates = df[mask]
+    bars = load_daily_bars(set(zip(candidates["Code"], candidates["Date"])))
+    signals = first_signals(df, mask, bars)
+    print(f"✅ 로그 {len(df):,}행 / {df['Date'].nunique()}일 -> 매수 시그널 {len(signals)}건")
+    trades = simulate_exits(signals)
+    stats = summarize(trades)
+
+    print("\n==================================================")
+    print("🚀 [밸류킹] 벡터 백테스트 결과 (BotConfig 기준)")
+    print("==================================================")
+    print(f"총 진입: {stats['trades']}건 | 기대값: {stats['expectancy']:.2f}% | 승률: {stats['hit_rate']:.1f}% | 최대낙폭: {stats['max_drawdown']:.2f}%p")
+    if not trades.empty:
+        print(trades["Outcome"].value_counts().to_string())
+        trades.to_csv(args.out, index=False, encoding="utf-8-sig")
+        print(f"\n✅ 상세 내역 저장: {args.out}")
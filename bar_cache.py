@@ -0,0 +1,104 @@
+# bar_cache.py
+import os
+import datetime
+
+import numpy as np
+
+# ==============================================================================
+# 🗄️ 로컬 OHLCV 봉 캐시 (종목, 일자, 주기) 단위 .npy 파티션
+# ==============================================================================
+# 경로: cache/bars/<interval>/<code>/<YYYYMMDD>.npy
+#  - interval "1d" : FinanceDataReader 일봉 (time = YYYYMMDD)
+#  - interval "1m" : KIS 당일 1분봉 (time = HHMMSS)
+# 이미 받은 파티션은 다시 조회하지 않으며, 데이터가 없는 날(휴장/거래정지)도 빈 파티션으로 저장해 재조회를 막습니다.
+
+CACHE_DIR = os.path.join("cache", "bars")
+BAR_DTYPE = np.dtype([("time", "i8"), ("open", "f8"), ("high", "f8"), ("low", "f8"), ("close", "f8"), ("volume", "i8")])
+MARKET_OPEN_HHMMSS = 90000
+MARKET_CLOSE = datetime.time(15, 30)
+
+def partition_path(code, date_str, interval, cache_dir=CACHE_DIR):
+    return os.path.join(cache_dir, interval, code, f"{date_str}.npy")
+
+def has_partition(code, date_str, interval, cache_dir=CACHE_DIR):
+    return os.path.exists(partition_path(code, date_str, interval, cache_dir))
+
+def read_partition(code, date_str, interval, cache_dir=CACHE_DIR):
+    """캐시된 파티션 반환 (없으면 None)"""
+    path = partition_path(code, date_str, interval, cache_dir)
+    if not os.path.exists(path): return None
+    return np.load(path)
+
+def write_partition(code, date_str, interval, bars, cache_dir=CACHE_DIR):
+    """bars: BAR_DTYPE 배열 또는 (time, open, high, low, close, volume) 튜플 목록"""
+    arr = np.asarray(bars, dtype=BAR_DTYPE) if not isinstance(bars, np.ndarray) else bars.astype(BAR_DTYPE)
+    path = partition_path(code, date_str, interval, cache_dir)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        np.save(f, arr)
+    os.replace(tmp_path, path)   # 중간에 끊겨도 반쪽 파티션이 남지 않도록 교체
+    return arr
+
+def is_complete_session(date_str, now=None):
+    """장 마감 이후의 날짜만 완결된 파티션으로 캐시 (장중 부분 데이터는 저장하지 않음)"""
+    now = now or datetime.datetime.now()
+    today = now.strftime("%Y%m%d")
+    return date_str < today or (date_str == today and now.time() >= MARKET_CLOSE)
+
+# ==============================================================================
+# 📅 일봉 (FinanceDataReader)
+# ==============================================================================
+def load_daily_bars(pairs, cache_dir=CACHE_DIR):
+    """
+    :param pairs: (code, 'YYYYMMDD') 쌍 목록
+    :return: {(code, date_str): (open, high, low, close, volume)} - 캐시에 없는 파티션만 종목별 1회 구간 조회
+    """
+    result = {}
+    missing = {}
+    for code, date_str in set(pairs):
+        arr = read_partition(code, date_str, "1d", cache_dir)
+        if arr is None:
+            missing.setdefault(code, []).append(date_str)
+        elif len(arr):
+            r = arr[0]
+            result[(code, date_str)] = (r["open"], r["high"], r["low"], r["close"], r["volume"])
+
+    if missing:
+        import FinanceDataReader as fdr
+        for code, dates in missing.items():
+            start, end = min(dates), max(dates)
+            try:
+                df = fdr.DataReader(code, f"{start[:4]}-{start[4:6]}-{start[6:]}", f"{end[:4]}-{end[4:6]}-{end[6:]}")
+            except Exception as e:
+                print(f"⚠️ 일봉 조회 실패 [{code}]: {e}")
+                continue
+            # 구간 안에서 받은 날짜는 요청하지 않았어도 함께 저장 (다음 실행에서 재조회 방지)
+            for idx, row in df.iterrows():
+                date_str = idx.strftime("%Y%m%d")
+                if not is_complete_session(date_str) or has_partition(code, date_str, "1d", cache_dir): continue
+                bar = (int(date_str), row["Open"], row["High"], row["Low"], row["Close"], int(row["Volume"]))
+                write_partition(code, date_str, "1d", [bar], cache_dir)
+                if date_str in dates:
+                    result[(code, date_str)] = bar[1:]
+            for date_str in dates:
+                if (code, date_str) not in result and is_complete_session(date_str):
+                    write_partition(code, date_str, "1d", [], cache_dir)   # 휴장/거래정지
+    return result
+
+# ==============================================================================
+# ⏱️ 분봉 (KIS inquire-time-itemchartprice 등 외부 수집기)
+# ==============================================================================
+def load_minute_bars(code, date_str, fetcher, cache_dir=CACHE_DIR):
+    """
+    캐시에 있으면 그대로, 없으면 fetcher(code) 로 받아 저장 후 반환합니다.
+    :param fetcher: code -> [(HHMMSS, open, high, low, close, volume), ...] (시간 오름차순)
+                    조회 실패는 빈 목록 대신 예외로 알려야 합니다. (예외는 그대로 전파되고 파티션은 저장하지 않음)
+    """
+    arr = read_partition(code, date_str, "1m", cache_dir)
+    if arr is not None: return arr
+    arr = np.asarray(fetcher(code), dtype=BAR_DTYPE)
+    # 09:00 봉부터 받지 못한 결과(중간에 끊긴 페이지 조회)는 캐시하지 않고 다음 실행에서 다시 조회
+    if is_complete_session(date_str) and (not len(arr) or arr["time"][0] <= MARKET_OPEN_HHMMSS):
+        write_partition(code, date_str, "1m", arr, cache_dir)
+    return arr
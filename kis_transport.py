@@ -0,0 +1,138 @@
+# kis_transport.py
+import time
+import threading
+import collections
+import requests
+from requests.adapters import HTTPAdapter
+
+# ==============================================================================
+# 🌐 KIS REST 전송 계층 (호스트별 keep-alive 풀 + 엔드포인트 종류별 재시도/타임아웃 + 지연 통계)
+# ==============================================================================
+# - 풀은 DATA(실전 시세/조건검색), TRADE(실전 주문/잔고), MOCK(모의 주문/잔고) 로 분리합니다.
+#   실전 모드에서는 DATA/TRADE 가 같은 호스트지만, 시세 병렬 조회가 커넥션을 모두 잡고 있어도
+#   주문은 자기 풀의 warm 커넥션을 바로 쓰도록 세션을 나눠 둡니다.
+# - 재시도는 멱등 조회에만 적용합니다. 주문은 서버에 도달하지 않은 것이 확실한 연결 타임아웃만 1회 재시도합니다.
+
+class EndpointPolicy:
+    __slots__ = ("timeout", "retries", "backoff", "retry_read")
+
+    def __init__(self, timeout, retries=0, backoff=0.2, retry_read=True):
+        """
+        :param timeout: (connect, read) 초
+        :param retries: 추가 시도 횟수 (0 이면 1회만 시도)
+        :param backoff: 재시도 대기 (backoff, backoff*2, ... 초)
+        :param retry_read: False 면 요청이 서버에 도달했을 수 있는 실패(읽기 타임아웃/5xx)는 재시도하지 않음
+        """
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.retry_read = retry_read
+
+POLICIES = {
+    "quote": EndpointPolicy(timeout=(1.0, 2.0), retries=0),                               # 시세: 다음 틱/루프가 곧 다시 조회
+    "query": EndpointPolicy(timeout=(2.0, 5.0), retries=2, backoff=0.2),                  # 잔고/조건검색/휴장일 (멱등)
+    "auth": EndpointPolicy(timeout=(2.0, 5.0), retries=2, backoff=0.5),                   # 승인키/해시키
+    "order": EndpointPolicy(timeout=(1.0, 5.0), retries=1, backoff=0.05, retry_read=False), # 주문/취소 (중복 주문 방지)
+}
+
+RECENT_SAMPLES = 512   # 엔드포인트별 백분위 계산에 쓰는 최근 샘플 수
+
+# ==============================================================================
+# 📈 엔드포인트별 지연 통계
+# ==============================================================================
+class EndpointStats:
+    __slots__ = ("count", "errors", "retries", "total_ms", "max_ms", "recent")
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.retries = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.recent = collections.deque(maxlen=RECENT_SAMPLES)
+
+    def summary(self):
+        samples = sorted(self.recent)
+        def pct(p): return samples[min(len(samples) - 1, int(len(samples) * p))] if samples else 0.0
+        return {
+            'count': self.count, 'errors': self.errors, 'retries': self.retries,
+            'avg_ms': self.total_ms / self.count if self.count else 0.0, 'max_ms': self.max_ms,
+            'p50_ms': pct(0.50), 'p95_ms': pct(0.95), 'p99_ms': pct(0.99),
+        }
+
+# ==============================================================================
+# 🚚 전송 계층
+# ==============================================================================
+class KisTransport:
+    def __init__(self, pool_sizes):
+        """
+        :param pool_sizes: {풀 이름: 최대 커넥션 수} 예) {"DATA": 10, "TRADE": 6, "MOCK": 6}
+        """
+        self.sessions = {}
+        for name, size in pool_sizes.items():
+            session = requests.Session()
+            session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=size))
+            self.sessions[name] = session
+        self.stats = collections.defaultdict(EndpointStats)   # {(풀, 엔드포인트): EndpointStats}
+        self.stats_lock = threading.Lock()
+
+    def request(self, pool, method, url, policy="query", throttle=None, **kwargs):
+        """
+        풀의 keep-alive 커넥션으로 요청하고 지연 시간을 기록합니다.
+        :param throttle: 재시도 전에 호출할 함수 (호출 한도 토큰 재차감용)
+        :return: requests.Response (최종 실패 시 마지막 예외를 그대로 raise)
+        """
+        rule = POLICIES[policy]
+        session = self.sessions[pool]
+        endpoint = url.rsplit('/', 1)[-1]
+        kwargs.setdefault('timeout', rule.timeout)
+
+        attempt = 0
+        while True:
+            started = time.perf_counter()
+            try:
+                res = session.request(method, url, **kwargs)
+                error = None
+            except requests.RequestException as e:
+                res, error = None, e
+            self.record(pool, endpoint, (time.perf_counter() - started) * 1000, error is not None or res.status_code >= 500, attempt > 0)
+
+            if error is None and (res.status_code < 500 or not rule.retry_read): return res
+            # 주문은 연결 단계에서 실패한 경우(서버 미도달)만 재시도
+            retryable = rule.retry_read or isinstance(error, requests.exceptions.ConnectTimeout)
+            if attempt >= rule.retries or not retryable:
+                if error is not None: raise error
+                return res
+            time.sleep(rule.backoff * (2 ** attempt))
+            attempt += 1
+            if throttle: throttle()
+
+    def get(self, pool, url, policy="query", throttle=None, **kwargs):
+        return self.request(pool, "GET", url, policy, throttle, **kwargs)
+
+    def post(self, pool, url, policy="query", throttle=None, **kwargs):
+        return self.request(pool, "POST", url, policy, throttle, **kwargs)
+
+    def record(self, pool, endpoint, elapsed_ms, failed=False, is_retry=False):
+        """지연 샘플 1건 기록 (전송 계층 밖에서 재는 구간도 같은 표에 합쳐 보기 위해 공개)"""
+        with self.stats_lock:
+            st = self.stats[(pool, endpoint)]
+            st.count += 1
+            st.total_ms += elapsed_ms
+            if elapsed_ms > st.max_ms: st.max_ms = elapsed_ms
+            st.recent.append(elapsed_ms)
+            if failed: st.errors += 1
+            if is_retry: st.retries += 1
+
+    def snapshot(self):
+        """{(풀, 엔드포인트): {'count', 'errors', 'retries', 'avg_ms', 'max_ms', 'p50_ms', 'p95_ms', 'p99_ms'}}"""
+        with self.stats_lock:
+            return {key: st.summary() for key, st in self.stats.items()}
+
+    def format_stats(self):
+        """엔드포인트별 지연 요약 (호출 많은 순)"""
+        lines = []
+        for (pool, endpoint), s in sorted(self.snapshot().items(), key=lambda kv: -kv[1]['count']):
+            lines.append(f"{pool:<5} {endpoint:<32} n={s['count']:<6} err={s['errors']:<4} "
+                         f"p50={s['p50_ms']:.0f}ms p95={s['p95_ms']:.0f}ms p99={s['p99_ms']:.0f}ms max={s['max_ms']:.0f}ms")
+        return "\n".join(lines) if lines else "기록 없음"
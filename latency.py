@@ -0,0 +1,140 @@
+# latency.py
+import os
+import json
+import time
+import bisect
+import datetime
+import threading
+
+# ==============================================================================
+# ⏱️ 핫패스 구간별 지연 계측 (단조 시계 + 메모리 히스토그램)
+# ==============================================================================
+# 사용법:
+#   with latency.span("exit.evaluate"): ...            # 블록 단위
+#   t0 = latency.now(); ...; latency.record("tick.recv", t0)   # 분기/return 이 많은 구간
+# 기록 비용은 perf_counter_ns 2회 + 버킷 이분 탐색 + 무경합 락 수준(약 1µs)입니다.
+# 백분위는 로그 스케일 버킷(단계당 12%)의 상한값으로 추정하므로 오차는 최대 12%입니다.
+
+LOG_DIR = "logs"
+METRICS_FILE = f"{LOG_DIR}/latency_{{date}}.jsonl"
+DUMP_INTERVAL = 60   # 지표 파일 기록 주기 (초)
+
+def _build_bounds(start_us=1.0, end_us=60_000_000.0, ratio=1.12):
+    bounds, b = [], start_us
+    while b < end_us:
+        bounds.append(b)
+        b *= ratio
+    bounds.append(end_us)
+    return bounds
+
+BUCKET_BOUNDS = _build_bounds()   # µs, 1µs ~ 60초
+
+now = time.perf_counter_ns
+
+class Histogram:
+    __slots__ = ("counts", "count", "total_us", "max_us", "lock")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKET_BOUNDS) + 1)
+        self.count = 0
+        self.total_us = 0.0
+        self.max_us = 0.0
+        self.lock = threading.Lock()
+
+    def add(self, us):
+        i = bisect.bisect_left(BUCKET_BOUNDS, us)
+        with self.lock:
+            self.counts[i] += 1
+            self.count += 1
+            self.total_us += us
+            if us > self.max_us: self.max_us = us
+
+    def summary(self):
+        with self.lock:
+            counts, count, total_us, max_us = list(self.counts), self.count, self.total_us, self.max_us
+        def pct(p):
+            target, seen = p * count, 0
+            for i, c in enumerate(counts):
+                seen += c
+                if c and seen >= target:
+                    return min(BUCKET_BOUNDS[i] if i < len(BUCKET_BOUNDS) else max_us, max_us)
+            return 0.0
+        return {'count': count, 'avg_us': total_us / count if count else 0.0, 'max_us': max_us,
+                'p50_us': pct(0.50), 'p95_us': pct(0.95), 'p99_us': pct(0.99)}
+
+_hists = {}
+_hists_lock = threading.Lock()
+
+def _hist(stage):
+    h = _hists.get(stage)
+    if h is None:
+        with _hists_lock:
+            h = _hists.setdefault(stage, Histogram())
+    return h
+
+def record(stage, start_ns):
+    """start_ns(latency.now()) 부터 지금까지를 stage 에 기록"""
+    _hist(stage).add((time.perf_counter_ns() - start_ns) / 1000)
+
+class span:
+    __slots__ = ("stage", "start")
+
+    def __init__(self, stage):
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _hist(self.stage).add((time.perf_counter_ns() - self.start) / 1000)
+        return False
+
+def snapshot():
+    """{stage: {'count', 'avg_us', 'max_us', 'p50_us', 'p95_us', 'p99_us'}}"""
+    with _hists_lock:
+        items = list(_hists.items())
+    return {stage: h.summary() for stage, h in sorted(items)}
+
+def reset():
+    """장 종료 후 하루치 히스토그램 초기화"""
+    with _hists_lock:
+        _hists.clear()
+
+def _fmt(us):
+    return f"{us:.0f}µs" if us < 1000 else f"{us / 1000:.1f}ms"
+
+def format_report():
+    """텔레그램 /latency 응답용 요약"""
+    lines = []
+    for stage, s in snapshot().items():
+        if not s['count']: continue
+        lines.append(f"{stage} n={s['count']} p50={_fmt(s['p50_us'])} p95={_fmt(s['p95_us'])} p99={_fmt(s['p99_us'])} max={_fmt(s['max_us'])}")
+    return "\n".join(lines) if lines else "기록 없음"
+
+# ==============================================================================
+# 💾 지표 파일 (1분마다 누적 스냅샷 1줄 추가)
+# ==============================================================================
+def dump(path_template=METRICS_FILE):
+    ts = datetime.datetime.now()
+    path = path_template.format(date=ts.strftime("%Y%m%d"))
+    try:
+        folder = os.path.dirname(path)
+        if folder and not os.path.exists(folder):
+            os.makedirs(folder)
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps({'time': ts.strftime("%Y-%m-%d %H:%M:%S"), 'stages': snapshot()}, ensure_ascii=False) + "\n")
+    except Exception as e:
+        print(f"❌ [지연 지표] 기록 실패: {e}")
+
+_dumper_thread = None
+
+def start_dumper(interval=DUMP_INTERVAL):
+    global _dumper_thread
+    if _dumper_thread is not None and _dumper_thread.is_alive(): return
+    def _loop():
+        while True:
+            time.sleep(interval)
+            dump()
+    _dumper_thread = threading.Thread(target=_loop, name="latency-dumper", daemon=True)
+    _dumper_thread.start()
@@ -0,0 +1,170 @@
+# order_tracker.py
+import json
+import time
+import base64
+import threading
+
+# AES 복호화 (pip install pycryptodome) - 없으면 체결통보 미사용, 잔고 폴링으로 동작
+try:
+    from Crypto.Cipher import AES
+    from Crypto.Util.Padding import unpad
+except ImportError:
+    AES = None
+
+# ==============================================================================
+# 📨 KIS 실시간 체결통보(H0STCNI0 / 모의 H0STCNI9) 디코더
+# ==============================================================================
+# 구독: tr_key = HTS ID. 구독 응답(JSON)의 body.output 에 AES-256-CBC key/iv 가 내려옵니다.
+# 수신 포맷: "1|H0STCNI0|001|<암호문 base64>"  (parts[0] == '1' 이면 암호화)
+# 복호화한 평문은 '^' 구분 필드이며, CNTG_YN == '2' 인 레코드가 실제 체결입니다.
+
+TR_IDS = ("H0STCNI0", "H0STCNI9")
+
+FIELDS = (
+    "cust_id",            # 고객 ID
+    "acnt_no",            # 계좌번호
+    "odno",               # 주문번호
+    "orgn_odno",          # 원주문번호
+    "side",               # 매도매수구분 (01: 매도, 02: 매수)
+    "rvse_cncl",          # 정정구분
+    "ord_kind",           # 주문종류
+    "ord_cond",           # 주문조건
+    "code",               # 종목코드
+    "cntg_qty",           # 체결수량 (접수 통보일 때는 주문수량)
+    "cntg_unpr",          # 체결단가
+    "cntg_time",          # 체결시간 (HHMMSS)
+    "rfus_yn",            # 거부여부
+    "cntg_yn",            # 체결여부 (1: 주문/정정/취소/거부 접수, 2: 체결)
+    "acpt_yn",            # 접수여부
+    "brnc_no",            # 지점번호
+    "ord_qty",            # 주문수량
+    "acnt_name",          # 계좌명
+    "name",               # 체결종목명
+)
+
+class ExecNotice:
+    __slots__ = FIELDS + ("recv_ts",)
+
+    def __init__(self, values, recv_ts):
+        for name, val in zip(FIELDS, values):
+            setattr(self, name, val)
+        self.recv_ts = recv_ts
+
+    @property
+    def is_fill(self):
+        return self.cntg_yn == "2"
+
+    @property
+    def is_buy(self):
+        return self.side == "02"
+
+    @property
+    def is_rejected(self):
+        return self.rfus_yn not in ("", "0", "N")
+
+def parse_cipher(message):
+    """구독 응답 JSON 에서 (key, iv) 추출 (체결통보 구독 응답이 아니면 None)"""
+    try:
+        data = json.loads(message)
+        if data.get('header', {}).get('tr_id') not in TR_IDS: return None
+        output = data.get('body', {}).get('output') or {}
+        if output.get('key') and output.get('iv'): return output['key'], output['iv']
+    except ValueError: pass
+    return None
+
+def decrypt(cipher_text, key, iv):
+    cipher = AES.new(key.encode('utf-8'), AES.MODE_CBC, iv.encode('utf-8'))
+    return unpad(cipher.decrypt(base64.b64decode(cipher_text)), AES.block_size).decode('utf-8')
+
+def decode_frame(message, cipher):
+    """
+    체결통보 프레임을 ExecNotice 리스트로 변환합니다. (H0STCNI0/9 가 아니면 빈 리스트)
+    :param cipher: parse_cipher 로 받은 (key, iv)
+    """
+    parts = message.split('|', 3)
+    if len(parts) < 4 or parts[1] not in TR_IDS: return []
+    body = parts[3]
+    if parts[0] == '1':
+        if not cipher or AES is None: return []
+        body = decrypt(body, *cipher)
+
+    fields = body.split('^')
+    try: count = int(parts[2])
+    except ValueError: count = 1
+    per_record = len(fields) // count if count else len(fields)
+    if per_record < len(FIELDS): return []
+
+    recv_ts = time.time()
+    return [ExecNotice(fields[i * per_record:i * per_record + len(FIELDS)], recv_ts) for i in range(count)]
+
+# ==============================================================================
+# 📒 주문 상태 테이블 (ODNO 기준)
+# ==============================================================================
+class OrderBook:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.orders = {}   # {odno: {'code', 'is_buy', 'order_qty', 'filled_qty', 'filled_amt', 'avg_price', 'rejected', 'sent_ts', 'last_fill_ts'}}
+
+    @staticmethod
+    def _key(odno):
+        # 주문 응답은 '0000012345', 체결통보는 자릿수가 다를 수 있어 앞자리 0 제거 후 비교
+        return str(odno).lstrip('0')
+
+    def _entry(self, odno, code, is_buy, order_qty):
+        return self.orders.setdefault(self._key(odno), {
+            'code': code, 'is_buy': is_buy, 'order_qty': order_qty, 'filled_qty': 0, 'filled_amt': 0,
+            'avg_price': 0.0, 'rejected': False, 'sent_ts': None, 'last_fill_ts': None
+        })
+
+    def register(self, odno, code, is_buy, order_qty):
+        """주문 접수 직후 등록 (체결통보가 먼저 도착한 경우 기존 체결 내역 유지)"""
+        if not odno: return
+        with self.lock:
+            order = self._entry(odno, code, is_buy, order_qty)
+            order['order_qty'] = order_qty
+            order['sent_ts'] = time.time()
+
+    def on_notice(self, notice):
+        """
+        통보 1건 반영.
+        :return: 체결이면 갱신된 주문 dict 사본, 아니면 None
+        """
+        try:
+            qty = int(notice.cntg_qty or 0)
+            price = int(notice.cntg_unpr or 0)
+            ord_qty = int(notice.ord_qty or 0)
+        except ValueError:
+            return None
+        with self.lock:
+            order = self._entry(notice.odno, notice.code, notice.is_buy, ord_qty)
+            if notice.is_rejected:
+                order['rejected'] = True
+                return None
+            if not notice.is_fill or qty <= 0: return None
+            order['filled_qty'] += qty
+            order['filled_amt'] += qty * price
+            order['avg_price'] = order['filled_amt'] / order['filled_qty']
+            order['last_fill_ts'] = notice.recv_ts
+            return dict(order)
+
+    def confirm_fill(self, odno, qty, avg_price):
+        """잔고 조회로 확인된 체결 반영 (재연결/복호화 실패로 체결통보가 유실된 경우 대비). 통보로 이미 잡힌 체결은 유지"""
+        if not odno or qty <= 0: return
+        with self.lock:
+            order = self.orders.get(self._key(odno))
+            if order is None or order['filled_qty'] > 0: return
+            order['filled_qty'] = qty
+            order['filled_amt'] = qty * avg_price
+            order['avg_price'] = float(avg_price)
+            order['last_fill_ts'] = time.time()
+
+    def get(self, odno):
+        with self.lock:
+            order = self.orders.get(self._key(odno))
+            return dict(order) if order else None
+
+    def orders_since(self, ts, is_buy=None):
+        """ts(epoch 초) 이후 접수한 주문 사본 목록 (is_buy 지정 시 매수/매도만)"""
+        with self.lock:
+            return [dict(o) for o in self.orders.values()
+                    if (o['sent_ts'] or 0) >= ts and (is_buy is None or o['is_buy'] == is_buy)]
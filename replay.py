@@ -0,0 +1,239 @@
+# replay.py
+import os
+import csv
+import time
+import heapq
+import types
+import datetime
+import argparse
+
+import tick_store
+import stock_bot
+from stock_bot import TradingBot
+
+# ==============================================================================
+# ⏱️ 가상 시계 (stock_bot 내부의 datetime.datetime.now() 를 리플레이 시각으로 대체)
+# ==============================================================================
+class SimClock:
+    current = None
+
+class _SimDatetime(datetime.datetime):
+    @classmethod
+    def now(cls, tz=None):
+        return SimClock.current
+
+_SIM_DATETIME_MODULE = types.SimpleNamespace(
+    datetime=_SimDatetime, date=datetime.date, time=datetime.time, timedelta=datetime.timedelta
+)
+
+# ==============================================================================
+# 🧵 리플레이용 동기 실행기 (스레드 없이 호출 즉시 실행 -> 결과가 항상 동일)
+# ==============================================================================
+class InlineExecutor:
+    def submit(self, fn, *args):
+        fn(*args)
+
+class InlineDispatcher:
+    def submit(self, code, fn, *args):
+        fn(*args)
+
+class ReplayTick:
+    """TradingBot.handle_tick 이 읽는 필드만 가진 틱 (tick_decoder.Tick 호환)"""
+    __slots__ = ("code", "stck_prpr", "acml_tr_pbmn")
+
+    def __init__(self, rec):
+        self.code = rec.code
+        self.stck_prpr = rec.price
+        self.acml_tr_pbmn = rec.acml_tr_pbmn
+
+class TradeRecorder:
+    """trade_logger 대체: 파일 대신 메모리에 매수/매도 기록"""
+    def __init__(self):
+        self.buys = []
+        self.sells = []
+
+    def log_buy(self, data):
+        self.buys.append(dict(data, time=SimClock.current))
+
+    def log_sell(self, data):
+        self.sells.append(dict(data, time=SimClock.current))
+
+# ==============================================================================
+# 🏦 가상 체결 KIS API (리플레이 중인 마지막 체결가로 즉시 체결)
+# ==============================================================================
+class ReplayApi:
+    def __init__(self, cash, market_caps):
+        self.cash = cash
+        self.market_caps = market_caps
+        self.names = {}
+        self.condition_list = []
+        self.quote_cache = {}   # KisApi.quote_cache 와 같은 형태
+        self.holdings = {}      # {code: {'qty', 'name', 'price'}}
+        self.order_seq = 0
+
+    def get_approval_key(self):
+        return None
+
+    def on_tick(self, rec):
+        self.quote_cache[rec.code] = {
+            'code': rec.code, 'name': self.names.get(rec.code, rec.code), 'price': rec.price, 'open': rec.open,
+            'high': rec.high, 'rate': rec.rate, 'program_buy': rec.pg_qty, 'acml_vol': rec.acml_vol,
+            'market_cap': self.market_caps.get(rec.code, 0), 'fetch_time': SimClock.current
+        }
+
+    def get_cached_quote(self, code, max_age=None):
+        info = self.quote_cache.get(code)
+        return dict(info) if info else None
+
+    def fetch_price_detail(self, code, name_from_rank=None, lite=False, max_age=0):
+        info = self.get_cached_quote(code)
+        if info and not lite: info['ask_price_1'] = info['price']
+        return info
+
+    def fetch_ask_price_1(self, code):
+        info = self.quote_cache.get(code)
+        return info['price'] if info else 0
+
+    def fetch_price_batch(self, items, lite=True):
+        return {code: self.get_cached_quote(code) for code, _ in items if code in self.quote_cache}
+
+    def fetch_condition_stocks(self, cond_name):
+        return list(self.condition_list)
+
+    def check_holiday(self, date_str):
+        return False
+
+    def fetch_balance(self):
+        return int(self.cash + sum(h['qty'] * self.quote_cache.get(c, {}).get('price', h['price']) for c, h in self.holdings.items()))
+
+    def fetch_my_stock_list(self):
+        return {code: dict(h) for code, h in self.holdings.items() if h['qty'] > 0}
+
+    def fetch_account(self):
+        return {'total': self.fetch_balance(), 'cash': int(self.cash), 'holdings': self.fetch_my_stock_list()}
+
+    def send_order(self, code, quantity, price=0, is_buy=True):
+        quote = self.quote_cache.get(code)
+        if not quote or quantity <= 0: return {'rt_cd': '1', 'msg1': 'replay: 체결가 없음'}
+        fill_price = quote['price']
+        self.order_seq += 1
+        if is_buy:
+            h = self.holdings.setdefault(code, {'qty': 0, 'name': quote['name'], 'price': 0.0})
+            h['price'] = (h['price'] * h['qty'] + fill_price * quantity) / (h['qty'] + quantity)
+            h['qty'] += quantity
+            self.cash -= fill_price * quantity
+        else:
+            h = self.holdings.get(code)
+            if not h or h['qty'] < quantity: return {'rt_cd': '1', 'msg1': 'replay: 잔고 부족'}
+            h['qty'] -= quantity
+            self.cash += fill_price * quantity
+            if h['qty'] == 0: del self.holdings[code]
+        return {'rt_cd': '0', 'msg1': 'replay fill', 'output': {'ODNO': f"{self.order_seq:010d}", 'KRX_FWDG_ORD_ORGNO': ''}}
+
+    def cancel_order(self, code, orgn_odno, orgn_orgno, quantity):
+        # 리플레이는 모든 주문이 즉시 체결되므로 취소할 미체결이 없음
+        return {'rt_cd': '1', 'msg1': 'replay: 미체결 없음'}
+
+# ==============================================================================
+# ▶️ 리플레이 엔진
+# ==============================================================================
+def load_market_caps(date_str, snapshots, log_dir="logs"):
+    """스냅샷에 기록된 시가총액 + 당일 value_volume_log CSV 의 시가총액(억 원)"""
+    caps = {}
+    path = os.path.join(log_dir, f"value_volume_log_{date_str}.csv")
+    if os.path.exists(path):
+        with open(path, encoding='utf-8-sig') as f:
+            for row in csv.DictReader(f):
+                try: caps[str(row['Code']).zfill(6)] = int(float(row['Market_Cap(100M)']))
+                except (KeyError, ValueError): pass
+    for _, items in snapshots:
+        for item in items:
+            if item.get('market_cap'): caps[item['code']] = item['market_cap']
+    return caps
+
+def replay_day(date_str, cash=100_000_000, tick_dir=tick_store.TICK_DIR):
+    """
+    하루치 틱 저널 + 조건검색 스냅샷으로 실제 TradingBot 의 진입/청산/타임아웃 로직을 재생합니다.
+    :return: (TradeRecorder, ReplayApi, 처리한 틱 수)
+    """
+    snapshots = list(tick_store.read_condition_snapshots(date_str, tick_dir))
+    api = ReplayApi(cash, load_market_caps(date_str, snapshots))
+    recorder = TradeRecorder()
+
+    day = datetime.datetime.strptime(date_str, "%Y%m%d")
+    close_time = day.replace(hour=stock_bot.BotConfig.MARKET_CLOSE_HOUR, minute=stock_bot.BotConfig.MARKET_CLOSE_MINUTE)
+
+    saved = (stock_bot.datetime, stock_bot.telegram_notifier, stock_bot.trade_logger)
+    stock_bot.datetime = _SIM_DATETIME_MODULE
+    stock_bot.telegram_notifier = types.SimpleNamespace(send_telegram_message=lambda message: True)
+    stock_bot.trade_logger = recorder
+    SimClock.current = day.replace(hour=9)
+    try:
+        # 워커 스레드/틱 저널은 처음부터 만들지 않음 (여러 날짜 재생 시 날짜마다 스레드가 남지 않도록)
+        bot = TradingBot(api=api, restore_state=False, dispatcher=InlineDispatcher(), order_pool=InlineExecutor(),
+                         entry_pool=InlineExecutor(), tick_journal=tick_store.NullTickJournal())
+        bot.liquidation_workers = 1          # 일괄 청산도 우선순위 순서대로 한 건씩 (결과 재현성)
+        bot.save_state = lambda: None        # 실거래 bot_state.json 보호
+        bot.market_open_time = day.replace(hour=9)
+
+        events = heapq.merge(
+            ((ts, 0, items) for ts, items in snapshots),
+            ((rec.ts, 1, rec) for rec in tick_store.read_ticks(date_str, tick_dir=tick_dir)),
+            key=lambda e: (e[0], e[1])
+        )
+        tick_count = 0
+        last_sec = None
+        for ts, kind, payload in events:
+            now = datetime.datetime.fromtimestamp(ts)
+            if now >= close_time: break
+            SimClock.current = now
+
+            # 초 단위로 REST 감시망의 타임아웃 컷 판정
+            sec = int(ts)
+            if sec != last_sec:
+                bot.check_timeouts(now)
+                last_sec = sec
+
+            if kind == 0:
+                api.condition_list = payload
+                api.names.update({item['code']: item['name'] for item in payload})
+                bot.current_value_codes = [item['code'] for item in payload]
+                bot.value_names = {item['code']: item['name'] for item in payload}
+            else:
+                api.on_tick(payload)
+                bot.handle_tick(ReplayTick(payload))
+                tick_count += 1
+
+        # 장 마감 일괄 청산
+        SimClock.current = max(SimClock.current, close_time)
+        bot.liquidate_all_positions()
+        return recorder, api, tick_count
+    finally:
+        stock_bot.datetime, stock_bot.telegram_notifier, stock_bot.trade_logger = saved
+
+def print_summary(date_str, recorder, api, tick_count, elapsed, start_cash):
+    print(f"\n📅 {date_str} | 틱 {tick_count:,}건 | 재생 {elapsed:.2f}초")
+    if not recorder.sells:
+        print("   매매 없음")
+        return
+    profits = []
+    for s in recorder.sells:
+        buy_p, sell_p = float(s['buy_price']), float(s['sell_price'])
+        rate = (sell_p - buy_p) / buy_p * 100 if buy_p > 0 else 0
+        profits.append(rate)
+        print(f"   {s['time']:%H:%M:%S} {s['name']} {buy_p:,.0f} -> {sell_p:,.0f} ({rate:+.2f}%) | {s['reason']}")
+    wins = sum(1 for p in profits if p > 0)
+    print(f"   진입 {len(recorder.buys)}건 | 청산 {len(profits)}건 | 승률 {wins / len(profits) * 100:.1f}% | "
+          f"평균 {sum(profits) / len(profits):+.2f}% | 손익 {api.cash - start_cash:+,.0f}원")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="틱 저널 기반 TradingBot 리플레이")
+    parser.add_argument("dates", nargs="*", help="YYYYMMDD (생략 시 저장된 전체 날짜)")
+    parser.add_argument("--cash", type=int, default=100_000_000, help="시작 예수금 (원)")
+    parser.add_argument("--tick-dir", default=tick_store.TICK_DIR)
+    args = parser.parse_args()
+
+    for date_str in args.dates or tick_store.list_tick_dates(args.tick_dir):
+        started = time.perf_counter()
+        recorder, api, tick_count = replay_day(date_str, args.cash, args.tick_dir)
+        print_summary(date_str, recorder, api, tick_count, time.perf_counter() - started, args.cash)
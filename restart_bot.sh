@@ -7,6 +7,8 @@ PROJECT_DIR="/home/ubuntu/stock/pg100"
 SCRIPT_NAME="stock_bot.py"
 VENV_ACTIVATE="/home/ubuntu/stock/bin/activate"
 LOG_FILE="output.log"
+# 봇 로그는 파이썬 로깅이 output.log 에 직접 기록하므로, 표준출력은 로깅 시작 전 에러 확인용 파일로만 분리
+CONSOLE_FILE="console.log"
 
 # ==============================================================================
 # 1. 기존 프로세스 종료 (강화된 로직)
@@ -66,7 +68,7 @@ echo "------------------------------------------" >> "$LOG_FILE"
 echo "Restarted at: $(date '+%Y-%m-%d %H:%M:%S')" >> "$LOG_FILE"
 echo "------------------------------------------" >> "$LOG_FILE"
 
-nohup python3 -u "$SCRIPT_NAME" >> "$LOG_FILE" 2>&1 &
+nohup python3 -u "$SCRIPT_NAME" >> "$CONSOLE_FILE" 2>&1 &
 
 NEW_PID=$!
 echo "Success! $SCRIPT_NAME started with PID: $NEW_PID"
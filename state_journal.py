@@ -0,0 +1,162 @@
+# state_journal.py
+import os
+import json
+import datetime
+import threading
+
+# ==============================================================================
+# 💾 봇 상태 저장소 (스냅샷 + append-only 이벤트 저널)
+# ==============================================================================
+# - bot_state.json    : 압축 스냅샷 (임시 파일에 쓴 뒤 os.replace 로 교체 -> 쓰다가 죽어도 이전 스냅샷 유지)
+# - bot_state.journal : 스냅샷 이후 이벤트를 한 줄씩 추가 (매수 체결 / 분할 매도 / 잔고 동기화 / 청산 / 블랙리스트)
+# 복구 시 스냅샷을 읽고 저널을 순서대로 재적용합니다. 이벤트당 비용은 작은 한 줄 append 입니다.
+# 이벤트마다 일련번호(seq)를 붙이고 스냅샷에는 복사 직전의 seq 를 기록합니다.
+# 복사와 저널 정리 사이에 들어온 이벤트는 저널에 남겨두고, 복구 시 스냅샷 seq 이후 이벤트만 재적용합니다.
+# (이벤트는 절대값 기록이라 스냅샷에 이미 반영된 이벤트를 한 번 더 적용해도 결과가 같음)
+
+SNAPSHOT_FILE = "bot_state.json"
+JOURNAL_FILE = "bot_state.journal"
+COMPACT_EVERY = 200   # 저널 이벤트가 이만큼 쌓이면 스냅샷으로 압축
+
+def _encode(value):
+    if isinstance(value, datetime.datetime): return value.isoformat()
+    raise TypeError(f"직렬화 불가 타입: {type(value)}")
+
+def _decode_position(pos):
+    pos = dict(pos)
+    if isinstance(pos.get('buy_time'), str):
+        pos['buy_time'] = datetime.datetime.fromisoformat(pos['buy_time'])
+    return pos
+
+def apply_event(portfolio, blacklist, event):
+    """저널 이벤트 1건을 포트폴리오/블랙리스트에 반영 (복구 재생용)"""
+    ev, code = event.get('ev'), event.get('code')
+    if ev == 'buy':
+        portfolio[code] = _decode_position(event['pos'])
+        blacklist[code] = "BOUGHT_TODAY"
+    elif ev in ('partial_sell', 'sync'):
+        if code in portfolio: portfolio[code].update(event['fields'])
+    elif ev == 'sold':
+        portfolio.pop(code, None)
+        blacklist[code] = event.get('reason', "SOLD")
+
+class StateJournal:
+    def __init__(self, snapshot_path=SNAPSHOT_FILE, journal_path=JOURNAL_FILE, compact_every=COMPACT_EVERY):
+        self.snapshot_path = snapshot_path
+        self.journal_path = journal_path
+        self.compact_every = compact_every
+        self.lock = threading.Lock()
+        self.file = None
+        self.events_since_snapshot = 0
+        self.seq = 0
+        self.tail = []   # [(seq, line)] 마지막 스냅샷 이후 저널에 남아 있는 이벤트
+
+    # ------------------------------------------------------------------
+    # 📥 복구
+    # ------------------------------------------------------------------
+    def load(self, date_str):
+        """
+        :param date_str: 'YYYY-MM-DD' (당일 상태만 복원)
+        :return: (portfolio, blacklist)
+        """
+        portfolio, blacklist = {}, {}
+        snapshot_seq = 0
+        try:
+            with open(self.snapshot_path, 'r', encoding='utf-8') as f: data = json.load(f)
+            self.seq = data.get("seq", 0)
+            if data.get("date") == date_str:
+                blacklist = data.get("blacklist", {})
+                portfolio = {code: _decode_position(pos) for code, pos in data.get("portfolio", {}).items()}
+                snapshot_seq = self.seq
+        except FileNotFoundError: pass
+        except ValueError as e: print(f"⚠️ [상태복원] 스냅샷 손상, 저널만으로 복구합니다: {e}")
+
+        self.tail = []
+        if os.path.exists(self.journal_path):
+            with open(self.journal_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try: event = json.loads(line)
+                    except ValueError: continue   # 비정상 종료로 잘린 마지막 줄
+                    seq = event.get('seq', 0)
+                    self.seq = max(self.seq, seq)
+                    if seq and seq <= snapshot_seq: continue   # 이미 스냅샷에 반영된 이벤트
+                    self.tail.append((seq, line if line.endswith("\n") else line + "\n"))
+                    if event.get('date') != date_str: continue
+                    apply_event(portfolio, blacklist, event)
+        self.events_since_snapshot = len(self.tail)
+        return portfolio, blacklist
+
+    # ------------------------------------------------------------------
+    # ✍️ 이벤트 기록 (주문 경로: 한 줄 append + flush)
+    # ------------------------------------------------------------------
+    def append(self, ev, code=None, **fields):
+        event = {'date': datetime.datetime.now().strftime("%Y-%m-%d"), 'ev': ev, 'code': code}
+        event.update(fields)
+        with self.lock:
+            try:
+                self.seq += 1
+                event['seq'] = self.seq
+                line = json.dumps(event, ensure_ascii=False, default=_encode) + "\n"
+                if self.file is None:
+                    self.file = self._open_journal()
+                self.file.write(line)
+                self.file.flush()
+                self.tail.append((self.seq, line))
+                self.events_since_snapshot += 1
+            except Exception as e:
+                print(f"❌ [상태저널] 기록 실패: {e}")
+        return self.events_since_snapshot >= self.compact_every
+
+    def _open_journal(self):
+        # 비정상 종료로 마지막 줄이 잘려 있으면 줄바꿈부터 넣어 다음 이벤트가 붙지 않도록 처리
+        needs_newline = False
+        if os.path.exists(self.journal_path) and os.path.getsize(self.journal_path) > 0:
+            with open(self.journal_path, 'rb') as f:
+                f.seek(-1, os.SEEK_END)
+                needs_newline = f.read(1) != b"\n"
+        f = open(self.journal_path, 'a', encoding='utf-8')
+        if needs_newline: f.write("\n")
+        return f
+
+    def mark(self):
+        """스냅샷용 상태를 복사하기 직전에 호출: 지금까지 기록된 마지막 seq"""
+        with self.lock:
+            return self.seq
+
+    # ------------------------------------------------------------------
+    # 🗜️ 스냅샷 압축 (임시 파일 -> fsync -> rename, 이후 반영된 이벤트만 저널에서 제거)
+    # ------------------------------------------------------------------
+    def snapshot(self, portfolio, blacklist, seq):
+        """:param seq: 상태 복사 직전 mark() 값 (이후 이벤트는 저널에 남김)"""
+        data = {"date": datetime.datetime.now().strftime("%Y-%m-%d"), "seq": seq, "blacklist": blacklist, "portfolio": portfolio}
+        tmp_path = self.snapshot_path + ".tmp"
+        with self.lock:
+            try:
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(data, f, ensure_ascii=False, indent=4, default=_encode)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, self.snapshot_path)
+                # 복사 이후에 들어온 이벤트만 남기고 저널을 다시 씀
+                self.tail = [(s, line) for s, line in self.tail if s > seq]
+                if self.file: self.file.close()
+                self.file = open(self.journal_path, 'w', encoding='utf-8')
+                self.file.writelines(line for _, line in self.tail)
+                self.file.flush()
+                self.events_since_snapshot = len(self.tail)
+            except Exception as e:
+                print(f"❌ [상태저널] 스냅샷 저장 실패: {e}")
+
+    def close(self):
+        with self.lock:
+            if self.file:
+                self.file.close()
+                self.file = None
+
+class NullJournal:
+    """디스크에 기록하지 않는 저널 (리플레이 등 실거래 상태 파일을 건드리면 안 되는 경우)"""
+    def load(self, date_str): return {}, {}
+    def append(self, ev, code=None, **fields): return False
+    def mark(self): return 0
+    def snapshot(self, portfolio, blacklist, seq): pass
+    def close(self): pass
@@ -1,22 +1,31 @@
 import time
 import datetime
 import threading
+import queue
 import logging
 import logging.handlers
 import sys
 import os
 import signal
+import atexit
 import copy
 import csv
 import requests
 import json
 import websocket # pip install websocket-client
+from concurrent.futures import ThreadPoolExecutor
 
 # 📂 사용자 파일 임포트 (기존 로깅 모듈 유지)
 import config
 import token_manager
 import telegram_notifier
 import trade_logger
+import tick_decoder
+import tick_store
+import state_journal
+import order_tracker
+import kis_transport
+import latency
 
 # ==============================================================================
 # 📝 [로그 시스템 설정]
@@ -29,20 +38,28 @@ def setup_logging():
     if not logger.handlers:
         formatter = logging.Formatter('%(asctime)s | %(levelname)s | %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
 
+        # output.log 는 이 핸들러 하나만 기록 (restart_bot.sh 의 stdout 리다이렉트와 겹치지 않도록)
         file_handler = logging.handlers.RotatingFileHandler(
             'output.log', maxBytes=10*1024*1024, backupCount=5, encoding='utf-8'
         )
         file_handler.setFormatter(formatter)
-        logger.addHandler(file_handler)
+        handlers = [file_handler]
         
-        stream_handler = logging.StreamHandler(sys.stdout)
-        stream_handler.setFormatter(formatter)
-        logger.addHandler(stream_handler)
+        # 터미널에서 직접 실행할 때만 콘솔에도 출력 (nohup 리다이렉트 시 중복 기록 방지)
+        if sys.__stdout__ is not None and sys.__stdout__.isatty():
+            stream_handler = logging.StreamHandler(sys.__stdout__)
+            stream_handler.setFormatter(formatter)
+            handlers.append(stream_handler)
+        
+        # 👇 [비동기 로깅] 웹소켓/주문 스레드는 큐에 넣기만 하고, 파일 쓰기와 로테이션은 리스너 스레드가 담당
+        log_queue = queue.SimpleQueue()
+        logger.addHandler(logging.handlers.QueueHandler(log_queue))
+        listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+        listener.start()
+        atexit.register(listener.stop)   # 종료 시 큐에 남은 로그까지 기록
         
     return logger
 
-logger = setup_logging()
-
 # ==============================================================================
 # 📝 [시스템 표준 입출력 로거 리다이렉션]
 # ==============================================================================
@@ -60,11 +77,14 @@ class StreamToLogger:
     def flush(self):
         pass
 
-# 1. 모든 일반 print 출력과 표준 출력을 INFO 레벨로 가로채기
-sys.stdout = StreamToLogger(logger, logging.INFO)
+def redirect_std_streams(logger):
+    # 1. 모든 일반 print 출력과 표준 출력을 INFO 레벨로 가로채기
+    sys.stdout = StreamToLogger(logger, logging.INFO)
+    # 2. 모든 파이썬 에러 메시지(Traceback)를 ERROR 레벨로 가로채기
+    sys.stderr = StreamToLogger(logger, logging.ERROR)
 
-# 2. 모든 파이썬 에러 메시지(Traceback)를 ERROR 레벨로 가로채기
-sys.stderr = StreamToLogger(logger, logging.ERROR)
+# ⚠️ 로깅 설정과 표준출력 가로채기는 봇 실행(__main__) 시에만 적용합니다.
+#    replay/backtest/verify_filters 처럼 모듈만 임포트하는 도구가 실거래 output.log 에 쓰거나 로테이션하지 않도록.
 
 # ==============================================================================
 # 🕹️ [모드 설정]
@@ -90,8 +110,46 @@ class BotConfig:
     WS_URL_REAL = "ws://ops.koreainvestment.com:21000/tryitout/H0STCNT0"
     WS_URL_MOCK = "ws://ops.koreainvestment.com:31000/tryitout/H0STCNT0"
 
-    DELAY_REAL = 0.06
-    DELAY_MOCK = 0.60 
+    # 🚦 토큰 버킷 호출 한도 (초당 허용 건수 / 순간 버스트 허용량)
+    # 실전은 앱키당 초당 20건 한도를 DATA/TRADE가 나눠 쓰고, 모의는 초당 2건 미만으로 제한
+    RATE_LIMIT_DATA = 15
+    RATE_LIMIT_TRADE = 4 if MODE == "REAL" else 1.6
+    RATE_BURST_DATA = 15
+    RATE_BURST_TRADE = 4 if MODE == "REAL" else 1
+
+    # ⚡ 조건검색 후보 시세 병렬 조회 워커 수 (세션 풀 크기 이하로 유지)
+    QUOTE_WORKERS = 8
+
+    # 🗂️ 종목별 시세 캐시 유효시간(초). 스캐너/5분 로거가 같은 스냅샷을 공유
+    QUOTE_CACHE_TTL = 2.5
+    QUOTE_LOG_MAX_AGE = 60   # 5분 로거는 이 시간 이내 스냅샷이면 네트워크 호출 없이 그대로 기록
+
+    # 📡 웹소켓 실시간 체결가 구독 한도 (KIS 세션당 41건, 보유 종목 우선 배정)
+    WS_MAX_SUBSCRIPTIONS = 40
+    SPEED_SAMPLE_SEC = 3.0   # 수급 속도 계산 최소 샘플 간격(초)
+
+    # 🧵 틱 처리 워커 수 (같은 종목은 항상 같은 워커에서 순서대로 처리)
+    TICK_WORKERS = 4
+    # 📤 매도 주문 워커 수 (주문 REST 대기가 틱 워커를 막지 않도록 분리, 같은 종목 주문은 종목별 락으로 직렬화)
+    ORDER_WORKERS = 4
+
+    # 📨 실시간 체결통보 (웹소켓이 실전 서버 고정이므로 실전 모드에서만 사용)
+    WS_TR_EXEC = "H0STCNI0" if MODE == "REAL" else "H0STCNI9"
+    BALANCE_SYNC_LOOPS = 10          # 잔고 동기화 주기 (감시 루프 횟수, 약 1초/회)
+    BALANCE_SYNC_LOOPS_NOTICE = 60   # 체결통보 수신 중에는 안전망 용도로만 드물게 동기화
+    ACCOUNT_REFRESH_SEC = 30         # 계좌 상태 캐시 주기 갱신 (체결 시에는 즉시 갱신)
+
+    # 🚨 일괄 청산 엔진 (주문 속도는 TRADE 토큰 버킷이 조절)
+    LIQUIDATION_WORKERS = 4
+    LIQUIDATION_RETRIES = 5
+    LIQUIDATION_BACKOFF_SEC = 0.3    # 거절 시 0.3, 0.6, 1.2 ... 초 후 재시도
+    LIQUIDATION_TIMEOUT_SEC = 60     # 이 시간 안에 정리 못 한 종목은 경고 후 종료
+    LIQUIDATION_FILL_WAIT_SEC = 5    # 체결통보로 플랫 도달을 확인하는 최대 대기
+
+    # 🔥 장 시작 전 워밍업 (토큰/조건식 seq/커넥션/해시키를 미리 준비해 09시 첫 스캔의 콜드스타트 제거)
+    WARMUP_HOUR = 8
+    WARMUP_MINUTE = 55
+    WARMUP_CODES = ["005930", "000660", "373220", "207940", "005380", "000270", "068270", "035420"]  # 커넥션 예열용 시세 조회 종목
 
     if MODE == "MOCK":
         TR_ID = { "balance": "VTTC8434R", "buy": "VTTC0802U", "sell": "VTTC0801U", "cancel": "VTTC0803U" }
@@ -113,6 +171,11 @@ class BotConfig:
     VALUEKING_END_MINUTE = 00
     VALUE_KING_MIN_VALUE = 5_000_000_000
     VALUE_KING_MAX_VALUE = 30_000_000_000 # 누적 거래대금 300억 이하 공략
+    # 투-트랙 진입 시간대별 누적 거래대금 범위 (시작, 종료, 최소, 최대)
+    ENTRY_TRACKS = [
+        (datetime.time(9, 2, 0), datetime.time(10, 0, 0), 5_000_000_000, 20_000_000_000),     # 오전장
+        (datetime.time(12, 0, 0), datetime.time(14, 30, 0), 100_000_000_000, float('inf')),  # 오후장
+    ]
     MIN_RATE_LIMIT = 6.0  # 6%이상 상승종목 매수
     MAX_RATE_LIMIT = 15.0  # 👈 [추가] 너무 높은 고점(+15% 초과) 추격 매수 금지 상한선
 
@@ -148,6 +211,10 @@ class BotConfig:
     MARKET_CLOSE_HOUR = 15
     MARKET_CLOSE_MINUTE = 15
 
+    # 🔑 주문 해시키: KIS 에서 선택 항목이고 서버에서만 계산되므로(로컬 계산 불가) 기본은 생략해
+    #    주문당 왕복 1회와 TRADE 호출 한도 1건을 아낌. 켜더라도 해시키 실패가 주문을 막지 않음
+    ORDER_HASHKEY = False
+
     # 👇 [추가] 모드별 주문 대기 시간 (안전 마진 포함)
     ORDER_DELAY_REAL = 0.06
     ORDER_DELAY_MOCK = 0.60
@@ -156,6 +223,37 @@ def is_excluded_stock(name):
     if name.endswith("우"): return True
     return any(keyword in name for keyword in BotConfig.EXCLUDE_KEYWORDS)
 
+# ==============================================================================
+# 🚦 토큰 버킷 레이트 리미터 (프로세스 전역 공유)
+# ==============================================================================
+class TokenBucket:
+    """초당 rate개씩 토큰이 차오르고 최대 capacity개까지 쌓이는 버킷.
+    토큰이 남아 있으면 즉시 통과시키고, 예산을 다 쓴 경우에만 부족분만큼 대기합니다."""
+    def __init__(self, rate, capacity):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self.tokens = float(capacity)
+        self.last = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, tokens=1):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.last) * self.rate)
+                self.last = now
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                wait = (tokens - self.tokens) / self.rate
+            time.sleep(wait)
+
+# DATA(시세/조건검색)와 TRADE(주문/잔고) 엔드포인트별 버킷. 모든 스레드가 같은 버킷을 공유합니다.
+RATE_LIMITERS = {
+    "DATA": TokenBucket(BotConfig.RATE_LIMIT_DATA, BotConfig.RATE_BURST_DATA),
+    "TRADE": TokenBucket(BotConfig.RATE_LIMIT_TRADE, BotConfig.RATE_BURST_TRADE),
+}
+
 # ==============================================================================
 # 2. KIS API 래퍼
 # ==============================================================================
@@ -175,8 +273,15 @@ class KisApi:
                 "appSecret": config.MOCK_API_SECRET
             }
         self.condition_seq_map = {}
-        self.session = requests.Session()
-        self.session.mount('https://', requests.adapters.HTTPAdapter(pool_connections=10, pool_maxsize=10))
+        # 🌐 DATA/TRADE/MOCK 풀을 분리한 keep-alive 전송 계층 (모든 REST 호출이 통과)
+        self.transport = kis_transport.KisTransport({
+            "DATA": BotConfig.QUOTE_WORKERS + 2,
+            "TRADE": BotConfig.LIQUIDATION_WORKERS + 2,
+            "MOCK": BotConfig.LIQUIDATION_WORKERS + 2,
+        })
+        self.quote_pool = ThreadPoolExecutor(max_workers=BotConfig.QUOTE_WORKERS, thread_name_prefix="quote")
+        self.quote_cache = {}  # {code: info} - 마지막 inquire-price 스냅샷 (info['fetch_time'] 포함)
+        self.quote_cache_lock = threading.Lock()
 
     def get_approval_key(self):
         url = f"{BotConfig.URL_REAL}/oauth2/Approval"
@@ -185,13 +290,24 @@ class KisApi:
             "appkey": config.REAL_API_KEY,       # 강제 고정
             "secretkey": config.REAL_API_SECRET  # 강제 고정
         }
-        res = requests.post(url, headers={"content-type": "application/json"}, json=body)
+        res = self.transport.post("DATA", url, "auth", json=body, headers={"content-type": "application/json"})
         if res.status_code == 200:
             return res.json().get('approval_key')
         return None
 
     def _throttle(self, type="DATA"):
-        time.sleep(BotConfig.DELAY_REAL if type == "DATA" or MODE == "REAL" else BotConfig.DELAY_MOCK)
+        # REST 요청 1건당 토큰 1개 차감 (예산 소진 시에만 대기)
+        RATE_LIMITERS[type].acquire()
+
+    def _pool(self, type="DATA"):
+        # 시세/조건검색은 항상 실전 서버, 주문/잔고는 모드에 따라 실전/모의 서버
+        return "DATA" if type == "DATA" else ("TRADE" if MODE == "REAL" else "MOCK")
+
+    def _get(self, type, url, policy="query", **kwargs):
+        return self.transport.get(self._pool(type), url, policy, lambda: self._throttle(type), **kwargs)
+
+    def _post(self, type, url, policy="query", **kwargs):
+        return self.transport.post(self._pool(type), url, policy, lambda: self._throttle(type), **kwargs)
 
     def get_headers(self, tr_id, type="DATA"):
         self._throttle(type)
@@ -204,8 +320,9 @@ class KisApi:
 
     def fetch_hashkey(self, body_dict):
         try:
+            self._throttle("TRADE")
             url = f"{BotConfig.URL_REAL}/uapi/hashkey"
-            res = requests.post(url, headers=self.base_headers_real, json=body_dict, timeout=5)
+            res = self.transport.post("TRADE", url, "auth", lambda: self._throttle("TRADE"), headers=self.base_headers_real, json=body_dict)
             if res.status_code == 200: return res.json()['HASH']
         except: pass
         return None
@@ -219,14 +336,15 @@ class KisApi:
     def check_holiday(self, date_str):
         url = f"{BotConfig.URL_REAL}/uapi/domestic-stock/v1/quotations/chk-holiday"
         try:
-            res = requests.get(url, headers=self.get_headers("CTCA0903R", "DATA"), params={"BASS_DT": date_str, "CTX_AREA_NK": "", "CTX_AREA_FK": ""}, timeout=5).json()
+            res = self._get("DATA", url, headers=self.get_headers("CTCA0903R", "DATA"), params={"BASS_DT": date_str, "CTX_AREA_NK": "", "CTX_AREA_FK": ""}).json()
             if res['rt_cd'] == '0':
                 for day in res['output']:
                     if day['bass_dt'] == date_str: return day['opnd_yn'] == 'N'
         except: pass
         return False
 
-    def fetch_balance(self):
+    def _inquire_balance(self):
+        """inquire-balance 1회 조회 (총평가/예수금/보유종목이 한 응답에 모두 포함)"""
         base_url = BotConfig.URL_REAL if MODE == "REAL" else BotConfig.URL_MOCK
         acc_no = config.REAL_ACC_NO if MODE == "REAL" else config.MOCK_ACC_NO
         url = f"{base_url}/uapi/domestic-stock/v1/trading/inquire-balance"
@@ -235,35 +353,54 @@ class KisApi:
             "UNPR_DVSN": "01", "FUND_STTL_ICLD_YN": "N", "FNCG_AMT_AUTO_RDPT_YN": "N", "PRCS_DVSN": "00", "CTX_AREA_FK100": "", "CTX_AREA_NK100": ""
         }
         try:
-            res = requests.get(url, headers=self.get_headers(BotConfig.TR_ID["balance"], "TRADE"), params=params, timeout=5).json()
-            if res['rt_cd'] == '0': return self._safe_int(res['output2'][0]['tot_evlu_amt'])
+            res = self._get("TRADE", url, headers=self.get_headers(BotConfig.TR_ID["balance"], "TRADE"), params=params).json()
+            if res['rt_cd'] == '0': return res
         except: pass
+        return None
+
+    def _parse_holdings(self, res):
+        my_stocks = {}
+        for stock in res['output1']:
+            qty = int(stock['hldg_qty'])
+            if qty > 0: my_stocks[stock['pdno']] = {'qty': qty, 'name': stock['prdt_name'], 'price': float(stock['pchs_avg_pric'])}
+        return my_stocks
+
+    def fetch_balance(self):
+        res = self._inquire_balance()
+        if res: return self._safe_int(res['output2'][0]['tot_evlu_amt'])
         return 0
 
     def fetch_my_stock_list(self):
-        base_url = BotConfig.URL_REAL if MODE == "REAL" else BotConfig.URL_MOCK
-        acc_no = config.REAL_ACC_NO if MODE == "REAL" else config.MOCK_ACC_NO
-        url = f"{base_url}/uapi/domestic-stock/v1/trading/inquire-balance"
-        params = {
-            "CANO": acc_no[:8], "ACNT_PRDT_CD": acc_no[-2:], "AFHR_FLPR_YN": "N", "OFL_YN": "N", "INQR_DVSN": "02", 
-            "UNPR_DVSN": "01", "FUND_STTL_ICLD_YN": "N", "FNCG_AMT_AUTO_RDPT_YN": "N", "PRCS_DVSN": "00", "CTX_AREA_FK100": "", "CTX_AREA_NK100": ""
-        }
+        res = self._inquire_balance()
         try:
-            res = requests.get(url, headers=self.get_headers(BotConfig.TR_ID["balance"], "TRADE"), params=params, timeout=5).json()
-            if res['rt_cd'] == '0':
-                my_stocks = {}
-                for stock in res['output1']:
-                    qty = int(stock['hldg_qty'])
-                    if qty > 0: my_stocks[stock['pdno']] = {'qty': qty, 'name': stock['prdt_name'], 'price': float(stock['pchs_avg_pric'])}
-                return my_stocks
+            if res: return self._parse_holdings(res)
+        except: pass
+        return None
+
+    def fetch_account(self):
+        """
+        총평가금액 + 예수금 + 보유종목을 한 번에 조회
+        :return: {'total', 'cash', 'holdings'} 또는 None
+        """
+        res = self._inquire_balance()
+        try:
+            if res:
+                summary = res['output2'][0]
+                return {'total': self._safe_int(summary['tot_evlu_amt']), 'cash': self._safe_int(summary['dnca_tot_amt']),
+                        'holdings': self._parse_holdings(res)}
         except: pass
         return None
 
+    def prewarm_connections(self, codes):
+        """DATA 풀에 keep-alive 커넥션을 미리 열어둠 (조회 워커 수만큼 병렬 시세 조회)"""
+        futures = [self.quote_pool.submit(self.fetch_price_detail, code, None, True) for code in codes[:BotConfig.QUOTE_WORKERS]]
+        return sum(1 for f in futures if f.result())
+
     def get_condition_seq(self, cond_name):
         if cond_name in self.condition_seq_map: return self.condition_seq_map[cond_name]
         url = f"{BotConfig.URL_REAL}/uapi/domestic-stock/v1/quotations/psearch-title"
         try:
-            res = requests.get(url, headers=self.get_headers("HHKST03900300", "DATA"), params={"user_id": config.HTS_ID}, timeout=5).json()
+            res = self._get("DATA", url, headers=self.get_headers("HHKST03900300", "DATA"), params={"user_id": config.HTS_ID}).json()
             if res['rt_cd'] == '0':
                 for item in res['output2']:
                     if item['grp_nm'] == cond_name:
@@ -277,7 +414,7 @@ class KisApi:
         if not seq: return []
         url = f"{BotConfig.URL_REAL}/uapi/domestic-stock/v1/quotations/psearch-result"
         try:
-            res = requests.get(url, headers=self.get_headers("HHKST03900400", "DATA"), params={"user_id": config.HTS_ID, "seq": seq}, timeout=5).json()
+            res = self._get("DATA", url, headers=self.get_headers("HHKST03900400", "DATA"), params={"user_id": config.HTS_ID, "seq": seq}).json()
             if res['rt_cd'] == '0':
                 return [{'code': item['code'], 'name': item['name'], 'rate': float(item.get('chgrate', 0.0)), 
                          'price': self._safe_int(item.get('price', item.get('stck_prpr', 0))), 'vol': self._safe_int(item.get('acml_vol', 0))} 
@@ -285,69 +422,200 @@ class KisApi:
         except: pass
         return []
 
-    def fetch_price_detail(self, code, name_from_rank=None):
-        self._throttle() 
+    def get_cached_quote(self, code, max_age=None):
+        """캐시된 시세 스냅샷 사본 반환. max_age(초)보다 오래됐거나 없으면 None"""
+        with self.quote_cache_lock:
+            info = self.quote_cache.get(code)
+        if not info: return None
+        if max_age is not None and (datetime.datetime.now() - info['fetch_time']).total_seconds() > max_age: return None
+        return dict(info)
+
+    def fetch_price_detail(self, code, name_from_rank=None, lite=False, max_age=0):
+        """
+        현재가(inquire-price) + 1호가(inquire-asking-price-exp-ccn) 조회.
+        lite=True면 호가 조회를 생략하고 inquire-price 필드만 반환합니다. (REST 1회)
+        max_age(초) > 0이면 그 이내의 캐시 스냅샷을 네트워크 호출 없이 재사용합니다.
+        """
+        data = self.get_cached_quote(code, max_age) if max_age > 0 else None
+        if data is None:
+            data = self._request_price(code, name_from_rank)
+            if data is None: return None
+        if not lite:
+            data['ask_price_1'] = self.fetch_ask_price_1(code)
+        return data
+
+    def _request_price(self, code, name_from_rank=None):
+        # 호출 제한은 get_headers에서 요청 1건당 1회씩만 적용 (중복 sleep 제거)
         url_price = "https://openapi.koreainvestment.com:9443/uapi/domestic-stock/v1/quotations/inquire-price"
         try:
-            res1 = self.session.get(url_price, headers=self.get_headers("FHKST01010100", "DATA"), params={"FID_COND_MRKT_DIV_CODE": "J", "FID_INPUT_ISCD": code}, timeout=2).json()
+            res1 = self._get("DATA", url_price, "quote", headers=self.get_headers("FHKST01010100", "DATA"), params={"FID_COND_MRKT_DIV_CODE": "J", "FID_INPUT_ISCD": code}).json()
             if res1['rt_cd'] != '0': return None 
             
             out1 = res1['output']
             final_name = out1.get('rprs_mant_kor_name', out1.get('hts_kor_isnm', name_from_rank)) or "이름없음"
-            
-            url_hoga = "https://openapi.koreainvestment.com:9443/uapi/domestic-stock/v1/quotations/inquire-asking-price-exp-ccn"
-            res2 = self.session.get(url_hoga, headers=self.get_headers("FHKST01010200", "DATA"), params={"FID_COND_MRKT_DIV_CODE": "J", "FID_INPUT_ISCD": code}, timeout=2).json()
-            ask_price_1 = int(res2['output1'].get('askp1', 0)) if res2.get('rt_cd') == '0' else 0
 
-            return {
+            data = {
                 'code': code, 'name': final_name, 'price': int(out1.get('stck_prpr', 0)), 'open': int(out1.get('stck_oprc', 0)),
                 'high': int(out1.get('stck_hgpr', 0)), 'rate': float(out1.get('prdy_ctrt', 0.0)), 
-                'program_buy': int(out1.get('pgtr_ntby_qty', 0)), 'ask_price_1': ask_price_1, 'acml_vol': int(out1.get('acml_vol', 0)),
+                'program_buy': int(out1.get('pgtr_ntby_qty', 0)), 'acml_vol': int(out1.get('acml_vol', 0)),
                 # 👇 [여기에 1줄 추가] API 응답에서 시가총액(억 단위) 추출
-                'market_cap': int(out1.get('hts_avls', 0))
+                'market_cap': int(out1.get('hts_avls', 0)),
+                'fetch_time': datetime.datetime.now()  # 시세 수신 시각 (속도 필터/캐시 TTL 기준)
             }
+            with self.quote_cache_lock:
+                self.quote_cache[code] = data
+            return dict(data)
         except: return None
 
+    def fetch_ask_price_1(self, code):
+        """매도 1호가 조회 (모든 필터를 통과한 종목에만 호출)"""
+        url_hoga = "https://openapi.koreainvestment.com:9443/uapi/domestic-stock/v1/quotations/inquire-asking-price-exp-ccn"
+        try:
+            res2 = self._get("DATA", url_hoga, "quote", headers=self.get_headers("FHKST01010200", "DATA"), params={"FID_COND_MRKT_DIV_CODE": "J", "FID_INPUT_ISCD": code}).json()
+            return int(res2['output1'].get('askp1', 0)) if res2.get('rt_cd') == '0' else 0
+        except: return 0
+
+    def fetch_price_batch(self, items, lite=True):
+        """
+        [(code, name), ...] 종목들의 시세를 워커 풀로 동시에 조회합니다.
+        호출 제한은 공유 토큰 버킷이 지키며, 각 결과에는 수신 시각('fetch_time')이 찍힙니다.
+        QUOTE_CACHE_TTL 이내에 이미 받은 종목은 캐시 스냅샷을 그대로 사용합니다.
+        :return: {code: info} (조회 실패 종목은 제외)
+        """
+        futures = {code: self.quote_pool.submit(self.fetch_price_detail, code, name, lite, BotConfig.QUOTE_CACHE_TTL) for code, name in items}
+        batch = {}
+        for code, future in futures.items():
+            try:
+                info = future.result()
+                if info: batch[code] = info
+            except: pass
+        return batch
+
     def send_order(self, code, quantity, price=0, is_buy=True):
         base_url = BotConfig.URL_REAL if MODE == "REAL" else BotConfig.URL_MOCK
         acc_no = config.REAL_ACC_NO if MODE == "REAL" else config.MOCK_ACC_NO
         url = f"{base_url}/uapi/domestic-stock/v1/trading/order-cash"
-        
-        headers = self.get_headers(BotConfig.TR_ID["buy"] if is_buy else BotConfig.TR_ID["sell"], "TRADE")
         body = {"CANO": acc_no[:8], "ACNT_PRDT_CD": acc_no[-2:], "PDNO": code, "ORD_DVSN": "01", "ORD_QTY": str(quantity), "ORD_UNPR": "0"}
-        
-        if MODE == "REAL":
-            hashkey = self.fetch_hashkey(body)
-            if hashkey: headers["hashkey"] = hashkey
-            else: return {'rt_cd': '9999', 'msg1': 'HashKey Failed'}
-        try: return requests.post(url, headers=headers, json=body, timeout=5).json()
-        except: return {'rt_cd': '9999', 'msg1': 'Error'}
+        return self._submit_order(url, BotConfig.TR_ID["buy"] if is_buy else BotConfig.TR_ID["sell"], body)
 
     def cancel_order(self, code, orgn_odno, orgn_orgno, quantity):
         base_url = BotConfig.URL_REAL if MODE == "REAL" else BotConfig.URL_MOCK
         acc_no = config.REAL_ACC_NO if MODE == "REAL" else config.MOCK_ACC_NO
         url = f"{base_url}/uapi/domestic-stock/v1/trading/order-rvsecncl"
-        
-        headers = self.get_headers(BotConfig.TR_ID["cancel"], "TRADE")
         body = {
             "CANO": acc_no[:8], "ACNT_PRDT_CD": acc_no[-2:], "KRX_FWDG_ORD_ORGNO": orgn_orgno,
             "ORGN_ODNO": orgn_odno, "ORD_DVSN": "01", "RVSE_CNCL_DVSN_CD": "02", # 01:시장가, 02:취소
             "ORD_QTY": str(quantity), "ORD_UNPR": "0", "QTY_ALL_ORD_YN": "Y"
         }
-        
-        if MODE == "REAL":
+        return self._submit_order(url, BotConfig.TR_ID["cancel"], body)
+
+    def _submit_order(self, url, tr_id, body):
+        """
+        주문/취소 공통 전송. 호출 시점부터 증권사 접수 응답까지를 'order-ack' 지연으로 기록합니다.
+        해시키는 실전 + ORDER_HASHKEY 일 때만 붙이며, 발급 실패 시에도 해시키 없이 전송합니다.
+        """
+        started = time.perf_counter()
+        headers = self.get_headers(tr_id, "TRADE")
+        if MODE == "REAL" and BotConfig.ORDER_HASHKEY:
             hashkey = self.fetch_hashkey(body)
             if hashkey: headers["hashkey"] = hashkey
-            else: return {'rt_cd': '9999', 'msg1': 'HashKey Failed'}
-        try: return requests.post(url, headers=headers, json=body, timeout=5).json()
-        except: return {'rt_cd': '9999', 'msg1': 'Error'}
+        try: res = self._post("TRADE", url, "order", headers=headers, json=body).json()
+        except: res = {'rt_cd': '9999', 'msg1': 'Error'}
+        self.transport.record(self._pool("TRADE"), "order-ack", (time.perf_counter() - started) * 1000, res.get('rt_cd') != '0')
+        return res
+
+# ==============================================================================
+# 🏦 계좌 상태 캐시 (매수 수량 계산 / /info 조회용)
+# ==============================================================================
+class AccountState:
+    """
+    총평가금액·예수금·보유종목을 메모리에 보관합니다.
+    체결/주문 이벤트(mark_dirty) 또는 느린 주기 타이머로 백그라운드 갱신되어, 매수 경로는 REST 조회 없이 바로 주문합니다.
+    """
+    def __init__(self, api, refresh_sec):
+        self.api = api
+        self.refresh_sec = refresh_sec
+        self.lock = threading.Lock()
+        self.total = 0
+        self.cash = 0
+        self.holdings = {}
+        self.updated_at = None
+        self.dirty = threading.Event()
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self._loop, daemon=True)
+        self.thread.start()
+
+    def _loop(self):
+        while True:
+            self.dirty.wait(self.refresh_sec)
+            self.dirty.clear()
+            self.refresh()
+
+    def refresh(self):
+        """계좌 조회 후 캐시 갱신. :return: 보유종목 dict (조회 실패 시 None)"""
+        data = self.api.fetch_account()
+        if data is None: return None
+        with self.lock:
+            self.total = data['total']
+            self.cash = data['cash']
+            self.holdings = data['holdings']
+            self.updated_at = datetime.datetime.now()
+        return dict(data['holdings'])
+
+    def mark_dirty(self):
+        """체결/주문 발생: 백그라운드 스레드가 곧바로 재조회 (스레드 미가동 시 즉시 조회)"""
+        if self.thread is None: self.refresh()
+        else: self.dirty.set()
+
+    def total_asset(self):
+        """
+        매수 수량 계산용 총평가금액 (최초 1회만 동기 조회)
+        매수는 예수금이 주식으로 바뀔 뿐 총평가금액은 그대로이므로, 연속 매수도 같은 기준 금액으로 계산됩니다.
+        """
+        if self.updated_at is None: self.refresh()
+        return self.total
+
+    def snapshot(self):
+        with self.lock:
+            return {'total': self.total, 'cash': self.cash, 'holdings': dict(self.holdings), 'updated_at': self.updated_at}
+
+# ==============================================================================
+# 🧵 종목별 직렬화 틱/주문 디스패처
+# ==============================================================================
+class TickDispatcher:
+    """
+    종목코드마다 고정된 워커 큐에 작업을 배정합니다.
+    웹소켓 수신 스레드는 큐에 넣기만 하고, 같은 종목의 틱 판정과 주문은 한 워커에서 순서대로 실행되어 서로 경합하지 않습니다.
+    """
+    def __init__(self, num_workers):
+        self.queues = [queue.Queue() for _ in range(num_workers)]
+        for i, q in enumerate(self.queues):
+            threading.Thread(target=self._worker, args=(q,), name=f"tick-worker-{i}", daemon=True).start()
+
+    def submit(self, code, fn, *args):
+        self.queues[hash(code) % len(self.queues)].put((fn, args))
+
+    def _worker(self, q):
+        while True:
+            fn, args = q.get()
+            try: fn(*args)
+            except Exception as e: print(f"⚠️ 틱 워커 처리 에러: {e}")
 
 # ==============================================================================
 # 3. 봇 메인 로직 (TradingBot - Event Driven WebSockets)
 # ==============================================================================
 class TradingBot:
-    def __init__(self):
-        self.api = KisApi()
+    def __init__(self, api=None, restore_state=True, dispatcher=None, order_pool=None, entry_pool=None, tick_journal=None):
+        """
+        :param api: KisApi 대체 객체 (리플레이 엔진의 가상 체결 API 주입용)
+        :param restore_state: False면 bot_state.json 복원과 종료 시그널 등록을 생략 (리플레이용)
+        :param dispatcher/order_pool/entry_pool/tick_journal: 대체 실행기/저널 (None이면 워커 스레드와 당일 틱 저널 생성)
+        """
+        self.api = api or KisApi()
+        # 상태 저장: 스냅샷 + 이벤트 저널 (리플레이는 실거래 상태 파일을 건드리지 않도록 메모리 전용)
+        self.state = state_journal.StateJournal() if restore_state else state_journal.NullJournal()
         self.portfolio = {}
         self.blacklist = {}
         self.is_buy_active = True
@@ -359,48 +627,69 @@ class TradingBot:
         self.ws = None
         self.ws_approval_key = self.api.get_approval_key()
         
-        self.load_state()
-        signal.signal(signal.SIGINT, self.handle_exit)
-        signal.signal(signal.SIGTERM, self.handle_exit)
+        if restore_state:
+            self.load_state()
+            signal.signal(signal.SIGINT, self.handle_exit)
+            signal.signal(signal.SIGTERM, self.handle_exit)
         
         self.is_running = True
         self.market_open_time = None 
         self.missing_counts = {}
         self.pending_sells = {}
+        self.portfolio_lock = threading.RLock()   # 수량/평단 갱신 및 포지션 제거 보호
+        self.dispatcher = dispatcher or TickDispatcher(BotConfig.TICK_WORKERS)
+        self.order_pool = order_pool or ThreadPoolExecutor(max_workers=BotConfig.ORDER_WORKERS, thread_name_prefix="order")
+        self.order_locks = {}   # {code: Lock} 같은 종목의 매도/분할매도/취소 주문이 겹치지 않도록
+        self.tick_journal = tick_journal or tick_store.TickJournal()   # 당일 틱 저널 (백테스트/리플레이 입력)
+        self.last_snapshot_codes = None
 
         # 👇 [신규 추가] 수급 속도(가속도) 계산을 위한 이전 데이터 저장소
-        self.prev_stock_data = {}  # {code: {'time': datetime, 'trade_amt': int, 'pg_amt': int}}
+        self.prev_stock_data = {}  # {code: {'time': datetime, 'trade_amt': int, 'pg_amt': int, 'price': int, 'passed': bool, 'source': 'tick'|'rest'}}
+
+        # 📡 실시간 구독 관리 (보유 종목 + value 조건검색 후보)
+        self.ws_connected = False
+        self.ws_subscribed = set()
+        self.ws_lock = threading.Lock()
+        self.value_names = {}         # {code: name} 현재 value 조건검색 편입 종목
+        self.entry_lock = threading.Lock()   # REST 스캔/틱 진입 간 중복 매수 및 슬롯 초과 방지
+        self.pending_entries = set()
+        self.entry_pool = entry_pool or ThreadPoolExecutor(max_workers=2, thread_name_prefix="entry")
+
+        # 📨 체결통보 기반 주문 상태 (ODNO 기준). 복호화 키를 받기 전/연결 끊김 중에는 잔고 폴링으로 대체
+        self.order_book = order_tracker.OrderBook()
+        self.account = AccountState(self.api, BotConfig.ACCOUNT_REFRESH_SEC)
+        self.liquidation_workers = BotConfig.LIQUIDATION_WORKERS
+        self.warmed_up_date = None
+        self.exec_cipher = None
+        self.exec_notice_active = False
 
     def load_state(self):
-        if os.path.exists('bot_state.json'):
-            try:
-                with open('bot_state.json', 'r', encoding='utf-8') as f: data = json.load(f)
-                if data.get("date") == datetime.datetime.now().strftime("%Y-%m-%d"):
-                    self.blacklist = data.get("blacklist", {})
-                    self.portfolio = data.get("portfolio", {})
-                    for code in self.portfolio:
-                        if 'buy_time' in self.portfolio[code]:
-                            self.portfolio[code]['buy_time'] = datetime.datetime.fromisoformat(self.portfolio[code]['buy_time'])
-                    print(f"📥 [상태복원] 포트폴리오 {len(self.portfolio)}개 복원 완료.")
-                    return 
-            except: pass
-        self.portfolio = {}
-        self.blacklist = {}
+        # 스냅샷(bot_state.json) + 이후 이벤트 저널 재생으로 당일 상태 복원
+        self.portfolio, self.blacklist = self.state.load(datetime.datetime.now().strftime("%Y-%m-%d"))
+        if self.portfolio or self.blacklist:
+            print(f"📥 [상태복원] 포트폴리오 {len(self.portfolio)}개 복원 완료.")
 
     def save_state(self):
-        try:
-            pf_copy = copy.deepcopy(self.portfolio)
-            for code in pf_copy:
-                if isinstance(pf_copy[code].get('buy_time'), datetime.datetime):
-                    pf_copy[code]['buy_time'] = pf_copy[code]['buy_time'].isoformat()
-            data = {"date": datetime.datetime.now().strftime("%Y-%m-%d"), "blacklist": self.blacklist, "portfolio": pf_copy}
-            with open('bot_state.json', 'w', encoding='utf-8') as f: json.dump(data, f, ensure_ascii=False, indent=4)
-        except: pass
+        """전체 상태를 스냅샷으로 압축 저장 (임시 파일 교체 방식, 복사 이후 이벤트만 저널에 남김)"""
+        seq = self.state.mark()   # 복사보다 먼저 읽어야 복사 도중 기록된 이벤트가 저널에 남음
+        with self.portfolio_lock:
+            pf_copy = {code: dict(pos) for code, pos in self.portfolio.items()}
+            bl_copy = dict(self.blacklist)
+        self.state.snapshot(pf_copy, bl_copy, seq)
+
+    def record_state(self, ev, code=None, **fields):
+        """상태 변경 이벤트 1건을 저널에 추가 (일정 건수마다 스냅샷으로 압축)"""
+        if self.state.append(ev, code, **fields):
+            self.save_state()
 
     def handle_exit(self, signum, frame):
         print(f"\n🛑 종료 신호 감지! 상태 저장 중...")
         self.save_state()
+        self.state.close()
+        self.tick_journal.close()
         if self.ws: self.ws.close()
+        trade_logger.close()        # 버퍼에 남은 매매/수집 로그 기록
+        telegram_notifier.flush()   # 큐에 남은 알림 전송 후 종료
         sys.exit(0)
 
     # ----------------------------------------------------------------------
@@ -415,23 +704,44 @@ class TradingBot:
         
         def on_message(ws, message):
             if '|' in message:
-                parts = message.split('|')
-                if len(parts) >= 4 and parts[1] == 'H0STCNT0': 
-                    data_str = parts[3].split('^')
-                    code = data_str[0]
-                    current_price = abs(int(data_str[2])) 
-                    
-                    if code in self.portfolio:
-                        self.evaluate_realtime_exit(code, current_price)
+                if message.split('|', 2)[1] in order_tracker.TR_IDS:
+                    # 체결통보는 해당 종목 워커에서 처리 (같은 종목의 매도 주문과 순서 보장)
+                    try:
+                        for notice in order_tracker.decode_frame(message, self.exec_cipher):
+                            self.dispatcher.submit(notice.code, self.handle_exec_notice, notice)
+                    except Exception as e:
+                        print(f"⚠️ 체결통보 디코딩 실패: {e}")
+                    return
+                # 다건 프레임(parts[2] = 레코드 수)도 한 건씩 모두 처리
+                # 수신 스레드는 디코딩 후 종목별 워커 큐에 넣기만 함 (REST 대기 없음)
+                with latency.span("tick.recv"):
+                    for tick in tick_decoder.decode_frame(message):
+                        self.record_tick(tick)
+                        self.dispatcher.submit(tick.code, self.handle_tick, tick)
             elif 'PINGPONG' in message:
                 ws.send(message) 
+            else:
+                cipher = order_tracker.parse_cipher(message)
+                if cipher:
+                    self.exec_cipher = cipher
+                    self.exec_notice_active = True
+                    print("📨 실시간 체결통보 구독 완료. 체결 기준으로 수량/평단을 갱신합니다.")
 
         def on_error(ws, error): print(f"⚠️ 웹소켓 에러: {error}")
-        def on_close(ws, close_status_code, close_msg): print("🔌 웹소켓 연결 종료. 재연결 시도합니다.")
+        def on_close(ws, close_status_code, close_msg):
+            print("🔌 웹소켓 연결 종료. 재연결 시도합니다.")
+            # 끊긴 동안에는 REST 스캔이 전 종목을 다시 담당
+            self.ws_connected = False
+            self.exec_notice_active = False
+            with self.ws_lock: self.ws_subscribed.clear()
         def on_open(ws):
             print("🟢 웹소켓 서버 접속 성공. 실시간 틱 수신 시작.")
+            self.ws_connected = True
+            with self.ws_lock: self.ws_subscribed.clear()
+            self.subscribe_exec_notice()
             for code in list(self.portfolio.keys()):
                 self.ws_subscribe(code, "1")
+            # value 후보는 다음 메인 루프의 sync_ws_subscriptions에서 재구독
 
         self.ws = websocket.WebSocketApp(ws_url, on_open=on_open, on_message=on_message, on_error=on_error, on_close=on_close)
         
@@ -439,14 +749,246 @@ class TradingBot:
             self.ws.run_forever()
             time.sleep(3) 
 
+    def record_tick(self, tick):
+        """틱 저널 기록 (프로그램 순매수 수량은 틱에 없으므로 마지막 REST 스냅샷 값 사용)"""
+        try:
+            quote = self.api.quote_cache.get(tick.code)
+            self.tick_journal.append_tick(tick, quote['program_buy'] if quote else 0)
+        except Exception as e:
+            print(f"⚠️ 틱 저널 기록 실패: {e}")
+
+    def record_condition_snapshot(self, value_list):
+        """편입 종목 구성이 바뀐 경우에만 조건검색 스냅샷 기록 (리플레이 입력)"""
+        codes = [item['code'] for item in value_list]
+        if codes == self.last_snapshot_codes: return
+        self.last_snapshot_codes = codes
+        items = []
+        for item in value_list:
+            quote = self.api.quote_cache.get(item['code'])
+            items.append({'code': item['code'], 'name': item['name'], 'price': item['price'], 'vol': item['vol'],
+                          'rate': item['rate'], 'market_cap': quote['market_cap'] if quote else 0})
+        try: tick_store.append_condition_snapshot(items)
+        except Exception as e: print(f"⚠️ 조건검색 스냅샷 기록 실패: {e}")
+
+    def handle_tick(self, tick):
+        """틱 워커에서 실행: 보유 종목은 청산 판정, value 후보는 진입 스캔"""
+        if tick.code in self.portfolio:
+            with latency.span("exit.evaluate"):
+                self.evaluate_realtime_exit(tick.code, tick.stck_prpr)
+        elif tick.code in self.value_names:
+            self.on_candidate_tick(tick)
+
+    def request_sell(self, code, reason):
+        """
+        매도 요청 (중복 요청 차단). 주문은 주문 워커 풀에서 실행되어 틱 워커는 REST 응답을 기다리지 않고,
+        같은 종목의 주문끼리는 order_lock 으로 직렬화됩니다.
+        """
+        with self.portfolio_lock:
+            if code in self.pending_sells: return
+            self.pending_sells[code] = datetime.datetime.now()
+        self.order_pool.submit(self.sell_stock, code, reason)
+
+    def order_lock(self, code):
+        lock = self.order_locks.get(code)
+        if lock is None:
+            lock = self.order_locks.setdefault(code, threading.Lock())
+        return lock
+
+    def subscribe_exec_notice(self):
+        """계좌 체결통보 구독 (HTS ID 기준). 실전 모드 + AES 모듈이 있을 때만"""
+        if MODE != "REAL" or order_tracker.AES is None:
+            print("ℹ️ 체결통보 미사용 (실전 모드/pycryptodome 필요). 잔고 폴링으로 체결을 확인합니다.")
+            return
+        msg = {
+            "header": {"approval_key": self.ws_approval_key, "custtype": "P", "tr_type": "1", "content-type": "utf-8"},
+            "body": {"input": {"tr_id": BotConfig.WS_TR_EXEC, "tr_key": config.HTS_ID}}
+        }
+        try: self.ws.send(json.dumps(msg))
+        except Exception as e: print(f"⚠️ 체결통보 구독 실패: {e}")
+
+    def handle_exec_notice(self, notice):
+        """종목 워커에서 실행: 주문 테이블 갱신 후 매수 체결이면 포지션 수량/평단 반영"""
+        order = self.order_book.on_notice(notice)
+        if order is None:
+            if notice.is_rejected: print(f"⚠️ [체결통보] 주문 거부 {notice.code} (주문번호 {notice.odno})")
+            return
+        side = "매수" if order['is_buy'] else "매도"
+        print(f"📨 [체결] {notice.name.strip() or notice.code} {side} {notice.cntg_qty}주 @ {int(notice.cntg_unpr or 0):,}원 "
+              f"(누적 {order['filled_qty']}/{order['order_qty']}주, 평균 {order['avg_price']:,.0f}원)")
+        if order['is_buy']:
+            self.apply_buy_fill(notice.code, notice.odno)
+        self.account.mark_dirty()
+
+    def apply_buy_fill(self, code, odno):
+        """매수 주문의 실제 체결 수량/평균단가를 포지션에 반영 (통보가 포지션 생성보다 먼저 와도 이후 호출로 반영)"""
+        order = self.order_book.get(odno)
+        if not order or order['filled_qty'] <= 0: return
+        with self.portfolio_lock:
+            pos = self.portfolio.get(code)
+            if not pos or order_tracker.OrderBook._key(pos.get('odno', '')) != order_tracker.OrderBook._key(odno): return
+            if pos.get('has_partial_sold'): return   # 분할 매도 이후 수량은 매도 기준으로 관리
+            filled = {'qty': order['filled_qty'], 'buy_price': round(order['avg_price'], 2), 'fill_confirmed': True}
+            if all(pos.get(k) == v for k, v in filled.items()): return
+            pos.update(filled)
+            self.record_state('sync', code, fields=filled)
+
     def ws_subscribe(self, code, tr_type="1"):
-        if not self.ws or not self.ws_approval_key: return
+        if not self.ws or not self.ws_approval_key or not self.ws_connected: return
         msg = {
             "header": {"approval_key": self.ws_approval_key, "custtype": "P", "tr_type": tr_type, "content-type": "utf-8"},
             "body": {"input": {"tr_id": "H0STCNT0", "tr_key": code}}
         }
-        try: self.ws.send(json.dumps(msg))
-        except: pass
+        with self.ws_lock:
+            if (tr_type == "1") == (code in self.ws_subscribed): return
+            try:
+                self.ws.send(json.dumps(msg))
+                if tr_type == "1": self.ws_subscribed.add(code)
+                else: self.ws_subscribed.discard(code)
+            except: pass
+
+    def sync_ws_subscriptions(self, value_list):
+        """보유 종목 + value 조건검색 후보를 구독 한도 내에서 유지 (편입 시 구독, 편출 시 해제)"""
+        desired = list(self.portfolio.keys())
+        for item in value_list:
+            if item['code'] not in desired and self.is_scan_target(item):
+                desired.append(item['code'])
+        desired = desired[:BotConfig.WS_MAX_SUBSCRIPTIONS]
+
+        with self.ws_lock: subscribed = list(self.ws_subscribed)
+        for code in subscribed:
+            if code not in desired: self.ws_subscribe(code, "2")
+        for code in desired:
+            self.ws_subscribe(code, "1")
+
+    # ----------------------------------------------------------------------
+    # ⚡ 수급 속도 필터 / 진입 필터 (REST 스캔과 실시간 틱이 공유)
+    # ----------------------------------------------------------------------
+    def is_scan_target(self, item):
+        code = item['code']
+        if code in self.portfolio or code in self.blacklist: return False
+        if item['price'] < BotConfig.MIN_STOCK_PRICE or item['price'] > BotConfig.MAX_STOCK_PRICE: return False
+        if is_excluded_stock(item['name']): return False
+        return True
+
+    def update_speed_filter(self, code, sample_time, trade_amt, pg_amt, price, source):
+        """
+        직전 기준 샘플 대비 분당 거래대금 유입 속도로 속도 필터 통과 여부를 판정합니다.
+        기준 샘플은 SPEED_SAMPLE_SEC 이상 지났을 때만 갱신하며, 그 사이에는 직전 판정을 유지합니다.
+        :param source: 'tick'(틱 누적 거래대금 acml_tr_pbmn) / 'rest'(누적 거래량 x 현재가)
+                       두 값은 정의가 달라 서로 빼면 가짜 속도가 나오므로, 출처가 바뀌면 기준 샘플을 새로 잡음
+        :return: 첫 샘플(또는 출처 전환 직후)이면 None, 아니면 통과 여부(bool)
+        """
+        prev_data = self.prev_stock_data.get(code)
+        if prev_data is None or prev_data.get('source') != source:
+            self.prev_stock_data[code] = {'time': sample_time, 'trade_amt': trade_amt, 'pg_amt': pg_amt, 'price': price, 'passed': False, 'source': source}
+            return None
+
+        time_diff_sec = (sample_time - prev_data['time']).total_seconds()
+        if time_diff_sec < BotConfig.SPEED_SAMPLE_SEC:
+            return prev_data.get('passed', False)
+
+        trade_diff_100m = (trade_amt - prev_data['trade_amt']) / 100_000_000
+        pg_diff_100m = (pg_amt - prev_data['pg_amt']) / 100_000_000
+        trade_speed_per_min = (trade_diff_100m / time_diff_sec) * 60
+        pg_speed_per_min = (pg_diff_100m / time_diff_sec) * 60
+
+        price_diff = price - prev_data.get('price', price)
+
+        # 거래대금 속도 체크 (상한선 해제, MIN 속도만 충족하면 통과)
+        passed = trade_speed_per_min >= BotConfig.TRADE_SPEED_MIN and price_diff > 0
+        # 프로그램 속도 체크 (프로그램도 상한선 해제)
+        # passed = passed and (is_etf or pg_speed_per_min >= BotConfig.PG_SPEED_MIN)
+
+        self.prev_stock_data[code] = {'time': sample_time, 'trade_amt': trade_amt, 'pg_amt': pg_amt, 'price': price, 'passed': passed, 'source': source}
+        return passed
+
+    def get_entry_window(self, now):
+        """투-트랙 시간대별 누적 거래대금 범위 (min, max). 진입 시간이 아니면 None"""
+        current_time = now.time()
+        for start, end, min_trade_amt, max_trade_amt in BotConfig.ENTRY_TRACKS:
+            if start <= current_time <= end:
+                return min_trade_amt, max_trade_amt
+        return None
+
+    def passes_entry_filters(self, info, trade_amt, pg_amt, is_etf, window):
+        """속도 필터 이후의 진입 필터 체인. 통과 시 info['tail_ratio']를 채웁니다."""
+        current_min_trade_amt, current_max_trade_amt = window
+
+        # 누적 거래대금 시간대별 동적 필터
+        if not (current_min_trade_amt <= trade_amt <= current_max_trade_amt): return False
+        
+        # 기본 양봉, 상승률 필터
+        if info['price'] < info['open']: return False
+        if info['rate'] < BotConfig.MIN_RATE_LIMIT or info['rate'] > BotConfig.MAX_RATE_LIMIT: return False
+        
+        # 👇 [신규 추가] 윗꼬리 비율 계산
+        high_price = info.get('high', 0)
+        tail_ratio = 0.0
+        if high_price > 0:
+            tail_ratio = ((high_price - info['price']) / high_price) * 100
+            if tail_ratio >= 3.0: return False # 3% 이상 밀린 종목 탈락
+        info['tail_ratio'] = tail_ratio
+
+        # 프로그램 꼬시기 차단
+        if not is_etf and BotConfig.PROGRAM_BUY_AMBIGUOUS_MIN <= pg_amt < BotConfig.PROGRAM_BUY_AMBIGUOUS_MAX: return False
+
+        # 시가총액
+        market_cap = info.get('market_cap', 0)
+        if market_cap < BotConfig.MIN_MARKET_CAP or market_cap > BotConfig.MAX_MARKET_CAP: return False
+        return True
+
+    def try_buy(self, info):
+        """슬롯/중복 여부를 락 안에서 재확인한 뒤 매수 (REST 스캔과 틱 진입이 동시에 들어와도 안전)"""
+        with self.entry_lock:
+            code = info['code']
+            if code in self.portfolio or code in self.blacklist: return
+            if len(self.portfolio) >= BotConfig.MAX_GLOBAL_SLOTS: return
+            self.execute_buy(info)
+
+    # ----------------------------------------------------------------------
+    # ⚡ 실시간 틱 기반 후보 스캔 (value 조건검색 구독 종목)
+    # ----------------------------------------------------------------------
+    def on_candidate_tick(self, tick):
+        code = tick.code
+        current_price = tick.stck_prpr
+        acml_tr_pbmn = tick.acml_tr_pbmn
+        if code in self.portfolio or code in self.blacklist: return
+
+        # 프로그램 순매수는 틱에 없으므로 마지막 REST 스냅샷 값을 사용
+        cached = self.api.get_cached_quote(code)
+        pg_amt = cached['program_buy'] * current_price if cached else 0
+        passed = self.update_speed_filter(code, datetime.datetime.now(), acml_tr_pbmn, pg_amt, current_price, 'tick')
+        if not passed: return
+
+        if not self.is_buy_active or len(self.portfolio) >= BotConfig.MAX_GLOBAL_SLOTS: return
+        if self.market_open_time is None or self.get_entry_window(datetime.datetime.now()) is None: return
+        if code in self.pending_entries: return
+        self.pending_entries.add(code)
+        # 웹소켓 수신 스레드는 REST를 기다리지 않도록 진입 판별은 별도 풀에서 실행
+        self.entry_pool.submit(self.evaluate_tick_entry, code, acml_tr_pbmn)
+
+    def evaluate_tick_entry(self, code, acml_tr_pbmn):
+        try:
+            name = self.value_names.get(code, '')
+            window = self.get_entry_window(datetime.datetime.now())
+            if window is None: return
+            with latency.span("entry.tick_quote"):
+                info = self.api.fetch_price_detail(code, name, lite=True, max_age=BotConfig.QUOTE_CACHE_TTL)
+            if not info or info['open'] == 0: return
+
+            is_etf = any(keyword in name for keyword in BotConfig.ETF_KEYWORDS)
+            current_pg_amt = info.get('program_buy', 0) * info['price']
+            with latency.span("entry.filters"):
+                passed = self.passes_entry_filters(info, acml_tr_pbmn, current_pg_amt, is_etf, window)
+            if not passed: return
+
+            info['ask_price_1'] = self.api.fetch_ask_price_1(code)
+            print(f"⚡ [틱 진입 포착] {info['name']} ({code})")
+            self.try_buy(info)
+        except Exception as e:
+            print(f"Tick Entry Error [{code}]: {e}")
+        finally:
+            self.pending_entries.discard(code)
 
     def evaluate_realtime_exit(self, code, current_price):
         if code not in self.portfolio: return
@@ -522,9 +1064,10 @@ class TradingBot:
         elif info.get('has_partial_sold', False) and profit_rate <= BotConfig.TIMEOUT_PROFIT:
             reason = f"📉본전 이탈(익절 후 잔량 방어 컷)"
         
-        if reason and code not in self.pending_sells:
-            self.pending_sells[code] = datetime.datetime.now()
-            threading.Thread(target=self.sell_stock, args=(code, reason), daemon=True).start()
+        if reason:
+            # 주문은 주문 워커로 넘기고 틱 워커는 바로 다음 틱 처리 (중복 매도는 pending_sells 가 차단)
+            self.request_sell(code, reason)
+            return
 
         # 💰 절반 기계적 익절 (+2.5% 이상)
         if not info.get('has_partial_sold', False) and profit_rate >= BotConfig.PARTIAL_PROFIT_RATE:
@@ -532,14 +1075,24 @@ class TradingBot:
             sell_qty = int(info['qty'] * BotConfig.PARTIAL_SELL_RATIO)
             
             if sell_qty == 0 and info['qty'] > 0:
-                threading.Thread(target=self.sell_stock, args=(code, f"💰소액 잔량 전량익절({profit_rate*100:.2f}%)"), daemon=True).start()
+                self.request_sell(code, f"💰소액 잔량 전량익절({profit_rate*100:.2f}%)")
             elif sell_qty > 0:
-                def partial_sell():
-                    res = self.api.send_order(code, sell_qty, is_buy=False)
-                    if res['rt_cd'] == '0':
-                        self.portfolio[code]['qty'] -= sell_qty
-                        telegram_notifier.send_telegram_message(f"💰 [절반익절] {info['name']} {profit_rate*100:.2f}% 돌파")
-                threading.Thread(target=partial_sell, daemon=True).start()
+                self.order_pool.submit(self.partial_sell, code, sell_qty, profit_rate)
+
+    def partial_sell(self, code, sell_qty, profit_rate):
+        with self.order_lock(code):
+            # 대기 중에 전량 매도/일괄 청산이 잡혔으면 절반익절은 건너뜀 (잔고 부족 주문 방지)
+            with self.portfolio_lock:
+                if code not in self.portfolio or code in self.pending_sells: return
+            res = self.api.send_order(code, sell_qty, is_buy=False)
+            if res['rt_cd'] == '0':
+                self.order_book.register(res.get('output', {}).get('ODNO', ''), code, False, sell_qty)
+                with self.portfolio_lock:
+                    if code not in self.portfolio: return
+                    self.portfolio[code]['qty'] -= sell_qty
+                    name = self.portfolio[code]['name']
+                    self.record_state('partial_sell', code, fields={'qty': self.portfolio[code]['qty'], 'has_partial_sold': True})
+                telegram_notifier.send_telegram_message(f"💰 [절반익절] {name} {profit_rate*100:.2f}% 돌파")
 
     # ----------------------------------------------------------------------
     # 🕵️ REST API 감시망 (조건 편출 및 10:30 타임아웃 담당)
@@ -548,81 +1101,90 @@ class TradingBot:
         sync_counter = 0
         while self.is_running:
             sync_counter += 1
-            if sync_counter >= 10:
-                real_holdings = self.api.fetch_my_stock_list()
+            sync_every = BotConfig.BALANCE_SYNC_LOOPS_NOTICE if self.exec_notice_active else BotConfig.BALANCE_SYNC_LOOPS
+            if sync_counter >= sync_every:
+                # 잔고 동기화 조회로 계좌 상태 캐시도 함께 갱신 (같은 inquire-balance 1회)
+                real_holdings = self.account.refresh()
                 if real_holdings is not None:
-                    for my_code in list(self.portfolio.keys()):
-                        if my_code not in real_holdings:
-                            self.missing_counts[my_code] = self.missing_counts.get(my_code, 0) + 1
-                            if self.missing_counts[my_code] >= 18: 
-                                self.ws_subscribe(my_code, "2") 
-                                del self.portfolio[my_code]
-                                self.blacklist[my_code] = "SOLD"
-                                if my_code in self.missing_counts: del self.missing_counts[my_code]
-                        else:
-                            self.portfolio[my_code]['qty'] = real_holdings[my_code]['qty']
-                            self.portfolio[my_code]['buy_price'] = real_holdings[my_code]['price']
+                    with self.portfolio_lock:
+                        for my_code in list(self.portfolio.keys()):
+                            if my_code not in real_holdings:
+                                self.missing_counts[my_code] = self.missing_counts.get(my_code, 0) + 1
+                                if self.missing_counts[my_code] >= 18: 
+                                    self.ws_subscribe(my_code, "2") 
+                                    self.portfolio.pop(my_code, None)
+                                    self.blacklist[my_code] = "SOLD"
+                                    self.record_state('sold', my_code, reason="SOLD")
+                                    if my_code in self.missing_counts: del self.missing_counts[my_code]
+                            else:
+                                # 잔고에 있으면 매수 체결 확정 (체결통보를 놓쳤어도 주문 테이블이 미체결로 남지 않도록)
+                                self.order_book.confirm_fill(self.portfolio[my_code].get('odno', ''), real_holdings[my_code]['qty'], real_holdings[my_code]['price'])
+                                synced = {'qty': real_holdings[my_code]['qty'], 'buy_price': real_holdings[my_code]['price']}
+                                if any(self.portfolio[my_code].get(k) != v for k, v in synced.items()):
+                                    self.portfolio[my_code].update(synced)
+                                    self.record_state('sync', my_code, fields=synced)
                 sync_counter = 0
 
-            codes_to_sell = []
-            now_time = datetime.datetime.now()
+            self.check_timeouts(datetime.datetime.now())
+
+            time.sleep(1)
+
+    def check_timeouts(self, now_time):
+        """매수 시각 기준 타임아웃 컷 판정 (REST 감시 루프와 리플레이 엔진이 공유)"""
+        codes_to_sell = []
+        
+        for my_code in list(self.portfolio.keys()):
+            info = self.portfolio[my_code]
             
-            for my_code in list(self.portfolio.keys()):
-                info = self.portfolio[my_code]
+            '''# ⏳ 1. 타임아웃 컷 (10:30 돌파 시 수익 미달) - 절대 방어선
+            is_timeout = False
+            if now_time.hour > BotConfig.TIMEOUT_HOUR:
+                is_timeout = True
+            elif now_time.hour == BotConfig.TIMEOUT_HOUR and now_time.minute >= BotConfig.TIMEOUT_MINUTE:
+                is_timeout = True
                 
-                '''# ⏳ 1. 타임아웃 컷 (10:30 돌파 시 수익 미달) - 절대 방어선
-                is_timeout = False
+            if is_timeout:
+                # 웹소켓이 최신화한 메모리 상의 가격을 활용하여 API 호출 낭비 없음
+                current_price = info.get('current_price', info['buy_price'])
+                if info['buy_price'] > 0:
+                    profit_rate = (current_price - info['buy_price']) / info['buy_price']
+                    if profit_rate <= BotConfig.TIMEOUT_PROFIT:
+                        codes_to_sell.append((my_code, f"⏳타임아웃(수익미달 컷)"))'''
+
+            # =====================================================================
+            # ⏳ 1. 타임아웃 컷 (매수 시간 기준 오전/오후 이원화)
+            # =====================================================================
+            is_timeout = False
+            buy_time = info.get('buy_time', now_time) # 종목을 매수한 시간 확인
+
+            # [오전장 매수 종목] -> 기존 설정대로 11시(TIMEOUT_HOUR)에 일괄 검사
+            if buy_time.hour < 12:
                 if now_time.hour > BotConfig.TIMEOUT_HOUR:
                     is_timeout = True
                 elif now_time.hour == BotConfig.TIMEOUT_HOUR and now_time.minute >= BotConfig.TIMEOUT_MINUTE:
                     is_timeout = True
                     
-                if is_timeout:
-                    # 웹소켓이 최신화한 메모리 상의 가격을 활용하여 API 호출 낭비 없음
-                    current_price = info.get('current_price', info['buy_price'])
-                    if info['buy_price'] > 0:
-                        profit_rate = (current_price - info['buy_price']) / info['buy_price']
-                        if profit_rate <= BotConfig.TIMEOUT_PROFIT:
-                            codes_to_sell.append((my_code, f"⏳타임아웃(수익미달 컷)"))'''
-
-                # =====================================================================
-                # ⏳ 1. 타임아웃 컷 (매수 시간 기준 오전/오후 이원화)
-                # =====================================================================
-                is_timeout = False
-                buy_time = info.get('buy_time', now_time) # 종목을 매수한 시간 확인
-
-                # [오전장 매수 종목] -> 기존 설정대로 11시(TIMEOUT_HOUR)에 일괄 검사
-                if buy_time.hour < 12:
-                    if now_time.hour > BotConfig.TIMEOUT_HOUR:
-                        is_timeout = True
-                    elif now_time.hour == BotConfig.TIMEOUT_HOUR and now_time.minute >= BotConfig.TIMEOUT_MINUTE:
-                        is_timeout = True
-                        
-                # [오후장 매수 종목] -> 14시 50분 (장 마감 30분 전)까지 여유를 두고 검사
-                else:
-                    if now_time.hour > 14:
-                        is_timeout = True
-                    elif now_time.hour == 14 and now_time.minute >= 50:
-                        is_timeout = True
-                    
-                if is_timeout:
-                    # 웹소켓이 최신화한 메모리 상의 가격을 활용하여 API 호출 낭비 없음
-                    current_price = info.get('current_price', info['buy_price'])
-                    if info['buy_price'] > 0:
-                        profit_rate = (current_price - info['buy_price']) / info['buy_price']
-                        if profit_rate <= BotConfig.TIMEOUT_PROFIT:
-                            codes_to_sell.append((my_code, f"⏳타임아웃(수익미달 컷)"))
+            # [오후장 매수 종목] -> 14시 50분 (장 마감 30분 전)까지 여유를 두고 검사
+            else:
+                if now_time.hour > 14:
+                    is_timeout = True
+                elif now_time.hour == 14 and now_time.minute >= 50:
+                    is_timeout = True
                 
-                # 🚨 2. 조건검색 편출 즉시 매도 (수급 이탈)
-                # if self.current_value_codes and (my_code not in self.current_value_codes):
-                #     codes_to_sell.append((my_code, "🚨조건검색 편출 즉시 손절(수급이탈)"))
-
-            for code, reason in codes_to_sell:
-                if code not in self.pending_sells:
-                    self.pending_sells[code] = datetime.datetime.now()
-                    threading.Thread(target=self.sell_stock, args=(code, reason), daemon=True).start()
+            if is_timeout:
+                # 웹소켓이 최신화한 메모리 상의 가격을 활용하여 API 호출 낭비 없음
+                current_price = info.get('current_price', info['buy_price'])
+                if info['buy_price'] > 0:
+                    profit_rate = (current_price - info['buy_price']) / info['buy_price']
+                    if profit_rate <= BotConfig.TIMEOUT_PROFIT:
+                        codes_to_sell.append((my_code, f"⏳타임아웃(수익미달 컷)"))
+            
+            # 🚨 2. 조건검색 편출 즉시 매도 (수급 이탈)
+            # if self.current_value_codes and (my_code not in self.current_value_codes):
+            #     codes_to_sell.append((my_code, "🚨조건검색 편출 즉시 손절(수급이탈)"))
 
-            time.sleep(1)
+        for code, reason in codes_to_sell:
+            self.request_sell(code, reason)
 
     # ----------------------------------------------------------------------
     # 📝 조건검색식 데이터 전수 로깅 (5분 주기)
@@ -630,43 +1192,34 @@ class TradingBot:
     def log_value_list_volumes(self, value_list):
         if not value_list: return
 
-        # 👇 [추가] logs 폴더 경로 지정 및 폴더가 없으면 자동 생성
-        log_dir = "logs"
-        if not os.path.exists(log_dir):
-            os.makedirs(log_dir)
-        
-        filename = os.path.join(log_dir, f"value_volume_log_{datetime.datetime.now().strftime('%Y%m%d')}.csv")
-
-        file_exists = os.path.isfile(filename)
-        now_str = datetime.datetime.now().strftime("%H:%M:%S")
+        now = datetime.datetime.now()
+        now_str = now.strftime("%H:%M:%S")
+        rows = []
         try:
-            with open(filename, mode='a', newline='', encoding='utf-8-sig') as f:
-                writer = csv.writer(f)
-                if not file_exists:
-                    # 👇 [헤더 수정] 마지막에 'Market_Cap(100M)' 추가
-                    writer.writerow(['Time', 'Code', 'Name', 'Price', 'Volume', 'Trade_Amt(100M)', 'Rate(%)', 'PG_Amt(100M)', 'Market_Cap(100M)'])
+            for item in value_list:
+                code = item.get('code', '')
+                name = item.get('name', '')
+                price = item.get('price', 0)
+                vol = item.get('vol', 0)
+                trade_amt_100m = (price * vol) // 100000000
                 
-                for item in value_list:
-                    code = item.get('code', '')
-                    name = item.get('name', '')
-                    price = item.get('price', 0)
-                    vol = item.get('vol', 0)
-                    trade_amt_100m = (price * vol) // 100000000
-                    
-                    pg_amt_100m = 0
-                    market_cap_100m = 0  # 👈 [추가] 시가총액 변수 초기화
+                pg_amt_100m = 0
+                market_cap_100m = 0  # 👈 [추가] 시가총액 변수 초기화
 
-                    info = self.api.fetch_price_detail(code, name)
-                    if info: 
-                        pg_amt_100m = (info.get('program_buy', 0) * info.get('price', 0)) // 100000000
-                        market_cap_100m = info.get('market_cap', 0)  # 👈 [추가] 상세 정보에서 시가총액 가져오기
+                # 스캐너가 방금 받아둔 스냅샷을 우선 사용 (없거나 오래된 종목만 직접 조회)
+                info = self.api.fetch_price_detail(code, name, lite=True, max_age=BotConfig.QUOTE_LOG_MAX_AGE)
+                if info: 
+                    pg_amt_100m = (info.get('program_buy', 0) * info.get('price', 0)) // 100000000
+                    market_cap_100m = info.get('market_cap', 0)  # 👈 [추가] 상세 정보에서 시가총액 가져오기
 
-                        # 👇 [수정] info 딕셔너리에서 가져온 최신 rate 사용
-                        writer.writerow([now_str, code, name, price, vol, trade_amt_100m, info.get('rate', 0.0), pg_amt_100m, market_cap_100m])
-                    else:
-                        writer.writerow([now_str, code, name, price, vol, trade_amt_100m, item.get('rate', 0.0), 0, 0])
+                    # 👇 [수정] info 딕셔너리에서 가져온 최신 rate 사용
+                    rows.append([now_str, code, name, price, vol, trade_amt_100m, info.get('rate', 0.0), pg_amt_100m, market_cap_100m])
+                else:
+                    rows.append([now_str, code, name, price, vol, trade_amt_100m, item.get('rate', 0.0), 0, 0])
 
-            print(f"📝 [데이터 수집] {now_str} 기준 검색기 포착 {len(value_list)}종목 전수 로깅 완료. (경로: {filename})")
+            # 파일 쓰기는 trade_logger 플러시 스레드가 담당 (logs/value_volume_log_YYYYMMDD.csv, 헤더 동일)
+            trade_logger.log_value_volumes(rows, now.strftime('%Y%m%d'))
+            print(f"📝 [데이터 수집] {now_str} 기준 검색기 포착 {len(value_list)}종목 전수 로깅 완료.")
         except: pass
 
     # ----------------------------------------------------------------------
@@ -675,7 +1228,8 @@ class TradingBot:
     def execute_buy(self, info):
         if not self.is_buy_active: return
         code = info['code']
-        total_asset = self.api.fetch_balance()
+        with latency.span("entry.balance"):
+            total_asset = self.account.total_asset()   # 메모리 캐시 (REST 왕복 없이 바로 주문)
         invest_amount = int(total_asset * BotConfig.INVEST_RATIO)
         
         # 💡 [수정] 수량 계산은 진입 직전가 기준
@@ -683,19 +1237,22 @@ class TradingBot:
         qty = int(invest_amount / expected_price) if expected_price > 0 else 0
 
         if qty > 0:
-            res = self.api.send_order(code, qty, price=0, is_buy=True) # 시장가(0) 주문
+            with latency.span("entry.order"):
+                res = self.api.send_order(code, qty, price=0, is_buy=True) # 시장가(0) 주문
             if res['rt_cd'] == '0':
 
                 # 👇 [핵심 추가] API 응답에서 원주문번호와 주문조직번호 확보
                 output = res.get('output', {})
                 odno = output.get('ODNO', '')
                 orgno = output.get('KRX_FWDG_ORD_ORGNO', '')
+                self.order_book.register(odno, code, True, qty)
+                if not self.exec_notice_active: self.account.mark_dirty()   # 체결통보가 없으면 주문 직후 재조회
 
                 # 🛡️ [핵심 수정] 매수 직후 0.5초 대기 후 잔고를 즉시 조회하여 '진짜 체결 평단가'를 가져옴
                 # time.sleep(0.5) 
                 # real_holdings = self.api.fetch_my_stock_list()
                 
-                # 실제 체결가가 확인되면 적용, 혹시 조회가 실패하면 임시가 적용
+                # 진입 시점에는 임시가 적용, 실제 체결가/수량은 체결통보(apply_buy_fill)가 도착하는 대로 반영
                 actual_buy_price = expected_price
                 # if real_holdings and code in real_holdings:
                     # actual_buy_price = real_holdings[code]['price']
@@ -733,21 +1290,99 @@ class TradingBot:
                     'price': actual_buy_price, 'qty': qty, 'pg_amt': pg_amt_now, 'gap': info.get('rate', 0), 'leader': ''
                 })
                 
-                self.save_state()
                 self.blacklist[code] = "BOUGHT_TODAY" 
+                self.record_state('buy', code, pos=self.portfolio[code])
+                self.apply_buy_fill(code, odno)   # 주문 응답보다 먼저 도착한 체결통보 반영
 
     def liquidate_all_positions(self, reason="장 마감(Time-Cut)"): 
+        """
+        일괄 청산 엔진: 잔고 1회 스냅샷 -> 손실 큰 순/평가금액 큰 순으로 매도 주문 파이프라인 제출
+        (TRADE 토큰 버킷이 속도 조절) -> 거절 시 백오프 재시도 -> 전량 정리까지 걸린 시간 보고
+        """
         if not self.portfolio: return
+        started = time.monotonic()
         telegram_notifier.send_telegram_message(f"🚨 전량 매도 실행: {reason}")
-        for code in list(self.portfolio.keys()):
-            if code not in self.pending_sells:
-                self.pending_sells[code] = datetime.datetime.now()
-                threading.Thread(target=self.sell_stock, args=(code, reason), daemon=True).start()
+
+        deadline = started + BotConfig.LIQUIDATION_TIMEOUT_SEC
+        failed = []
+        while self.portfolio and time.monotonic() < deadline:
+            # 다른 워커에서 이미 매도 중인 종목은 그 결과를 기다리고, 나머지만 이번 패스에서 처리
+            with self.portfolio_lock:
+                codes = [c for c in self.portfolio if c not in self.pending_sells]
+                for c in codes: self.pending_sells[c] = datetime.datetime.now()
+            if not codes:
+                time.sleep(0.2)
+                continue
+
+            # 종목별 잔고 조회 대신 패스마다 1회 스냅샷 (잔고에 있으면 체결통보와 무관하게 매도)
+            real_holdings = self.account.refresh()
+            codes.sort(key=self._liquidation_priority)
+            with ThreadPoolExecutor(max_workers=self.liquidation_workers, thread_name_prefix="liquidate") as pool:
+                results = list(pool.map(lambda c: (c, self._liquidate_one(c, reason, real_holdings)), codes))
+            failed = [c for c, ok in results if not ok]
+
+        elapsed = time.monotonic() - started
+        flat_sec = self._wait_liquidation_fills(started)
+        if self.portfolio:
+            names = ", ".join(self.portfolio[c]['name'] for c in list(self.portfolio))
+            telegram_notifier.send_telegram_message(f"⚠️ [일괄 청산 미완료] {elapsed:.1f}초 경과, 잔여: {names}")
+        else:
+            fill_msg = f" / 체결 완료 {flat_sec:.1f}초" if flat_sec is not None else ""
+            telegram_notifier.send_telegram_message(f"🏁 [일괄 청산 완료] 주문 완료 {elapsed:.1f}초{fill_msg}")
+        print(f"🏁 일괄 청산 종료: {elapsed:.2f}초, 실패 {len(failed)}건")
+
+    def _liquidation_priority(self, code):
+        """손실이 큰 종목 먼저, 같은 손익이면 평가금액이 큰 종목 먼저"""
+        p = self.portfolio.get(code)
+        if not p: return (0, 0)
+        cur_price = p.get('current_price', p['buy_price'])
+        profit_rate = (cur_price - p['buy_price']) / p['buy_price'] if p['buy_price'] > 0 else 0
+        return (profit_rate, -cur_price * p['qty'])   # 평가금액은 손익률이 정확히 같을 때만 비교
+
+    def _liquidate_one(self, code, reason, real_holdings):
+        """종목 1개 청산 (거절 시 지수 백오프 재시도). :return: 장부에서 정리됐으면 True"""
+        try:
+            # 진행 중인 절반익절 주문이 끝난 뒤의 수량으로 매도
+            with self.order_lock(code):
+                p_data = self.portfolio.get(code)
+                if not p_data: return True
+                qty = p_data['qty']
+                if self.is_buy_unfilled(code, p_data, real_holdings):
+                    if self.cancel_unfilled_buy(code, reason): return True
+                    # 취소 거절 = 체결통보 유실 가능성. 최신 잔고에 있으면 그 수량으로 매도
+                    qty = self.confirm_holding(code)
+                    if not qty: return False
+                for attempt in range(BotConfig.LIQUIDATION_RETRIES):
+                    res = self.api.send_order(code, qty, is_buy=False)
+                    if res['rt_cd'] == '0':
+                        self.complete_sell(code, reason, qty, res, fetch_price=False)
+                        return True
+                    print(f"⚠️ 청산 주문 거절 [{code}] ({attempt + 1}/{BotConfig.LIQUIDATION_RETRIES}): {res.get('msg1')}")
+                    time.sleep(BotConfig.LIQUIDATION_BACKOFF_SEC * (2 ** attempt))
+                return False
+        finally:
+            self.pending_sells.pop(code, None)
+
+    def _wait_liquidation_fills(self, started):
+        """체결통보 수신 중이면 청산 매도 주문의 체결까지 기다려 실제 플랫 도달 시간(초) 반환"""
+        if not self.exec_notice_active: return None
+        wait_until = time.monotonic() + BotConfig.LIQUIDATION_FILL_WAIT_SEC
+        started_ts = time.time() - (time.monotonic() - started)
+        while time.monotonic() < wait_until:
+            sells = self.order_book.orders_since(started_ts, is_buy=False)
+            if sells and all(o['filled_qty'] >= o['order_qty'] for o in sells):
+                return max(o['last_fill_ts'] for o in sells) - started_ts
+            time.sleep(0.1)
+        return None
             
     def wait_until_next_morning(self):
         now = datetime.datetime.now()
         next_morning = datetime.datetime((now + datetime.timedelta(days=1)).year, (now + datetime.timedelta(days=1)).month, (now + datetime.timedelta(days=1)).day, 8, 50, 0)
         telegram_notifier.send_telegram_message(f"💤 장 종료. 내일 대기.")
+        print(f"🌐 [REST 지연 통계]\n{self.api.transport.format_stats()}")
+        latency.dump()
+        print(f"⏱️ [구간별 지연]\n{latency.format_report()}")
+        latency.reset()
         self.portfolio = {}
         self.blacklist = {}
         self.save_state()
@@ -760,6 +1395,9 @@ class TradingBot:
             if now.weekday() >= 5 or self.api.check_holiday(now.strftime("%Y%m%d")):
                 self.wait_until_next_morning()
                 return False
+            if now.hour == BotConfig.WARMUP_HOUR and now.minute >= BotConfig.WARMUP_MINUTE and self.warmed_up_date != now.date():
+                self.warm_up(now)
+                continue
             if now.hour == 8 and now.minute >= 45: time.sleep(10); continue
             if now.hour == 9 and now.minute >= 0:
                 self.market_open_time = now
@@ -767,76 +1405,172 @@ class TradingBot:
                 return True
             time.sleep(1)
             
+    def warm_up(self, now):
+        """장 시작 전 1회: 첫 스캔/첫 주문이 부담할 준비 작업을 미리 끝내둠"""
+        started = time.monotonic()
+        self.warmed_up_date = now.date()
+        report = []
+        try:
+            # 1. 토큰: 장 마감(+30분)까지 버티지 못하면 지금 재발급
+            session_end = now.replace(hour=BotConfig.MARKET_CLOSE_HOUR, minute=BotConfig.MARKET_CLOSE_MINUTE) + datetime.timedelta(minutes=30)
+            for mode in {"REAL", MODE}:
+                ok = token_manager.ensure_token_valid_until(mode, session_end) is not None
+                report.append(f"토큰[{mode}] {'✅' if ok else '❌'}")
+
+            # 2. 조건검색식 seq 캐시 (첫 루프의 psearch-title 왕복 제거)
+            seq = self.api.get_condition_seq("value")
+            report.append(f"조건식 seq {'✅' if seq else '❌'}")
+
+            # 3. 웹소켓 승인키 (시작 시 발급 실패한 경우에만 재발급, 연결 중인 세션은 그대로 유지)
+            if not self.ws_approval_key:
+                self.ws_approval_key = self.api.get_approval_key()
+                report.append(f"승인키 {'✅' if self.ws_approval_key else '❌'}")
+
+            # 4. DATA 호스트 keep-alive 커넥션 + TRADE 호스트(계좌 캐시 갱신 겸)
+            warmed = self.api.prewarm_connections(BotConfig.WARMUP_CODES)
+            report.append(f"DATA 커넥션 {warmed}개")
+            report.append(f"계좌 {'✅' if self.account.refresh() is not None else '❌'}")
+
+            # 5. 해시키 엔드포인트 (실전 주문 경로)
+            if MODE == "REAL" and BotConfig.ORDER_HASHKEY:
+                acc_no = config.REAL_ACC_NO
+                body = {"CANO": acc_no[:8], "ACNT_PRDT_CD": acc_no[-2:], "PDNO": BotConfig.WARMUP_CODES[0], "ORD_DVSN": "01", "ORD_QTY": "1", "ORD_UNPR": "0"}
+                report.append(f"해시키 {'✅' if self.api.fetch_hashkey(body) else '❌'}")
+        except Exception as e:
+            report.append(f"에러: {e}")
+        elapsed = time.monotonic() - started
+        print(f"🔥 [워밍업] {elapsed:.2f}초 | " + " | ".join(report))
+        telegram_notifier.send_telegram_message(f"🔥 장 시작 전 워밍업 완료 ({elapsed:.1f}초)\n" + "\n".join(report))
+
     def sell_stock(self, code, reason):
-        if code in self.portfolio:
-            p_data = self.portfolio[code]
-            qty = p_data['qty']
-            name = p_data['name']
-            buy_price = p_data['buy_price']
+        # 같은 종목의 분할 매도/청산 주문이 끝날 때까지 대기 후 최신 수량으로 주문
+        with self.order_lock(code):
+            if code in self.portfolio:
+                p_data = self.portfolio[code]
+                qty = p_data['qty']
             
-            # 👇 [핵심 추가] 1. 실제 잔고 확인 (미체결 여부 판별)
-            real_holdings = self.api.fetch_my_stock_list()
+                # 👇 [핵심 추가] 1~2. 체결된 수량이 없다면 미체결 상태이므로 취소 주문 실행
+                with latency.span("exit.balance_check"):
+                    unfilled = self.is_buy_unfilled(code, p_data)
+                if unfilled:
+                    if self.cancel_unfilled_buy(code, reason): return
+                    # 취소 거절 = 이미 체결됐을 수 있음 (체결통보 유실). 실제 잔고로 다시 확인해 보유 중이면 매도
+                    qty = self.confirm_holding(code)
+                    if not qty:
+                        self.pending_sells.pop(code, None)
+                        return
+
+                # 👇 3. 잔고에 있다면 기존처럼 정상 매도 실행
+                with latency.span("exit.order"):
+                    res = self.api.send_order(code, qty, is_buy=False)
             
-            # 👇 [핵심 추가] 2. 잔고에 없다면 미체결 상태이므로 취소 주문 실행
-            if real_holdings is not None and code not in real_holdings:
-                res = self.api.cancel_order(code, p_data.get('odno', ''), p_data.get('orgno', ''), qty)
                 if res['rt_cd'] == '0':
-                    msg = f"🚫 [미체결 매수 취소] {name}\n사유: {reason}"
-                    telegram_notifier.send_telegram_message(msg)
-                    self.blacklist[code] = "CANCELLED"
-                    self.ws_subscribe(code, "2")
-                    self.portfolio.pop(code, None)
-                    self.pending_sells.pop(code, None)
-                    self.save_state()
+                    self.complete_sell(code, reason, qty, res)
                 else:
+                    # 👇 [핵심 추가] API 주문 거절/실패 시 잠금 해제하여 다음 틱에서 재시도할 수 있게 복구
                     self.pending_sells.pop(code, None)
-                    print(f"⚠️ 취소 주문 실패 [{code}]: {res.get('msg1')}")
-                return
-
-            # 👇 3. 잔고에 있다면 기존처럼 정상 매도 실행
-            res = self.api.send_order(code, qty, is_buy=False)
-            
-            if res['rt_cd'] == '0':
-                p_data = self.portfolio[code]
-                name = p_data['name']
-                buy_price = p_data['buy_price']
-                
-                temp_info = self.api.fetch_price_detail(code)
-
-                # API 동시 호출 제한(TPS 초과)으로 조회가 실패할 경우 메모리의 최신 가격 사용
-                fallback_price = p_data.get('current_price', buy_price)
-                cur_price = temp_info['price'] if temp_info and temp_info.get('price', 0) > 0 else fallback_price
-                exit_pg = (temp_info['program_buy'] * cur_price) if temp_info else 0
+                    print(f"⚠️ 매도 주문 실패 [{code}]: {res.get('msg1')} - 다음 루프에서 재시도합니다.")
+            else:
+                # 큐에서 기다리는 사이 이미 청산된 종목
+                self.pending_sells.pop(code, None)
 
-                # cur_price = temp_info['price'] if temp_info else 0
-                # exit_pg = (temp_info['program_buy'] * temp_info['price']) if temp_info else 0
-                profit_rate = ((cur_price - buy_price) / buy_price * 100) if buy_price > 0 else 0
+    def is_buy_unfilled(self, code, p_data, real_holdings=None):
+        """
+        매수 주문이 아직 한 주도 체결되지 않았는지 판별
+        (real_holdings 스냅샷에 있으면 체결, 체결통보 수신 중이면 주문 테이블, 아니면 실제 잔고 조회)
+        """
+        if real_holdings is not None and code in real_holdings: return False
+        order = self.order_book.get(p_data.get('odno', '')) if self.exec_notice_active else None
+        if order is not None:
+            return order['filled_qty'] == 0
+        if real_holdings is None:
+            real_holdings = self.api.fetch_my_stock_list()
+        return real_holdings is not None and code not in real_holdings
+
+    def cancel_unfilled_buy(self, code, reason):
+        """미체결 매수 취소 + 장부 정리. :return: 취소 성공 여부"""
+        p_data = self.portfolio[code]
+        res = self.api.cancel_order(code, p_data.get('odno', ''), p_data.get('orgno', ''), p_data['qty'])
+        if res['rt_cd'] == '0':
+            msg = f"🚫 [미체결 매수 취소] {p_data['name']}\n사유: {reason}"
+            telegram_notifier.send_telegram_message(msg)
+            self.blacklist[code] = "CANCELLED"
+            self.ws_subscribe(code, "2")
+            self.portfolio.pop(code, None)
+            self.pending_sells.pop(code, None)
+            self.record_state('sold', code, reason="CANCELLED")
+            return True
+        # pending_sells 는 호출한 쪽이 정리 (취소 거절 시 잔고 확인 후 매도로 이어갈 수 있도록)
+        print(f"⚠️ 취소 주문 실패 [{code}]: {res.get('msg1')}")
+        return False
 
-                msg = (f"👋 [{MODE} 절대 방어선 청산] {name}\n사유: {reason}\n매도가: {cur_price:,}원 ({profit_rate:+.2f}%)")
-                telegram_notifier.send_telegram_message(msg)
-                
-                hold_min = int((datetime.datetime.now() - p_data['buy_time']).total_seconds() / 60) if 'buy_time' in p_data else 0
-                
-                # 원본 코드의 매도 로그 및 통계 기록 유지
-                trade_logger.log_sell({
-                    'code': code, 'name': name, 'strategy': p_data['strategy'], 'reason': reason,
-                    'buy_price': buy_price, 'sell_price': cur_price, 'qty': qty, 'hold_time_min': hold_min,
-                    'max_price': p_data.get('stats_max_price', 0), 'min_price': p_data.get('stats_min_price', 0),
-                    'entry_pg': p_data.get('stats_entry_pg', 0), 'max_pg': p_data.get('stats_max_pg', 0), 'exit_pg': exit_pg
-                })
-                
-                self.blacklist[code] = "SOLD" 
-                self.ws_subscribe(code, "2") # 📡 웹소켓 구독 즉시 해제
+    def confirm_holding(self, code, real_holdings=None):
+        """
+        취소가 거절된 매수를 실제 잔고로 재확인. 보유 중이면 체결을 주문 테이블/장부에 반영하고 매도할 수량 반환 (없으면 0)
+        """
+        if real_holdings is None:
+            real_holdings = self.api.fetch_my_stock_list()
+        held = (real_holdings or {}).get(code)
+        if not held: return 0
+        with self.portfolio_lock:
+            p_data = self.portfolio.get(code)
+            if not p_data: return 0
+            self.order_book.confirm_fill(p_data.get('odno', ''), held['qty'], held['price'])
+            synced = {'qty': held['qty'], 'buy_price': held['price'], 'fill_confirmed': True}
+            p_data.update(synced)
+            self.record_state('sync', code, fields=synced)
+        print(f"ℹ️ [{code}] 매수 체결통보 누락 -> 잔고 {held['qty']}주 확인, 매도 진행")
+        return held['qty']
+
+    def complete_sell(self, code, reason, qty, res, fetch_price=True):
+        """
+        매도 주문 접수 후 알림/로그/장부 정리
+        :param fetch_price: False면 매도가를 REST 조회 없이 최근 틱 가격(없으면 QUOTE_CACHE_TTL 이내 캐시)으로 기록 (일괄 청산용)
+        """
+        self.order_book.register(res.get('output', {}).get('ODNO', ''), code, False, qty)
+        if not self.exec_notice_active: self.account.mark_dirty()
+        p_data = self.portfolio[code]
+        name = p_data['name']
+        buy_price = p_data['buy_price']
+        
+        if fetch_price:
+            temp_info = self.api.fetch_price_detail(code, lite=True)
+        else:
+            # 오래된 캐시 스냅샷이 매도가로 기록되지 않도록 TTL 이내만 사용
+            temp_info = self.api.get_cached_quote(code, max_age=BotConfig.QUOTE_CACHE_TTL)
+
+        # API 동시 호출 제한(TPS 초과)으로 조회가 실패할 경우 메모리의 최신 가격 사용
+        fallback_price = p_data.get('current_price', buy_price)
+        cur_price = temp_info['price'] if temp_info and temp_info.get('price', 0) > 0 else fallback_price
+        # 일괄 청산은 웹소켓 틱으로 갱신된 가격이 캐시보다 최신
+        if not fetch_price and p_data.get('current_price', 0) > 0: cur_price = p_data['current_price']
+        exit_pg = (temp_info['program_buy'] * cur_price) if temp_info else 0
+
+        # cur_price = temp_info['price'] if temp_info else 0
+        # exit_pg = (temp_info['program_buy'] * temp_info['price']) if temp_info else 0
+        profit_rate = ((cur_price - buy_price) / buy_price * 100) if buy_price > 0 else 0
+
+        msg = (f"👋 [{MODE} 절대 방어선 청산] {name}\n사유: {reason}\n매도가: {cur_price:,}원 ({profit_rate:+.2f}%)")
+        telegram_notifier.send_telegram_message(msg)
+        
+        hold_min = int((datetime.datetime.now() - p_data['buy_time']).total_seconds() / 60) if 'buy_time' in p_data else 0
+        
+        # 원본 코드의 매도 로그 및 통계 기록 유지
+        trade_logger.log_sell({
+            'code': code, 'name': name, 'strategy': p_data['strategy'], 'reason': reason,
+            'buy_price': buy_price, 'sell_price': cur_price, 'qty': qty, 'hold_time_min': hold_min,
+            'max_price': p_data.get('stats_max_price', 0), 'min_price': p_data.get('stats_min_price', 0),
+            'entry_pg': p_data.get('stats_entry_pg', 0), 'max_pg': p_data.get('stats_max_pg', 0), 'exit_pg': exit_pg
+        })
+        
+        self.blacklist[code] = "SOLD" 
+        self.ws_subscribe(code, "2") # 📡 웹소켓 구독 즉시 해제
 
-                # 👇 [수정] 강제 삭제(del) 대신 안전한 pop 사용 (에러 방지)
-                self.portfolio.pop(code, None)
-                self.pending_sells.pop(code, None) 
+        # 👇 [수정] 강제 삭제(del) 대신 안전한 pop 사용 (에러 방지)
+        self.portfolio.pop(code, None)
+        self.pending_sells.pop(code, None) 
 
-                self.save_state()
-            else:
-                # 👇 [핵심 추가] API 주문 거절/실패 시 잠금 해제하여 다음 틱에서 재시도할 수 있게 복구
-                self.pending_sells.pop(code, None)
-                print(f"⚠️ 매도 주문 실패 [{code}]: {res.get('msg1')} - 다음 루프에서 재시도합니다.")
+        self.record_state('sold', code, reason="SOLD")
 
     # ----------------------------------------------------------------------
     # 📱 텔레그램 리스너 (실시간 수익률 표출 적용)
@@ -854,10 +1588,14 @@ class TradingBot:
 
                         cmd = update['message']['text'].strip().split()[0].lower()
                         if cmd in ['/info', 'info']:
-                            real_holdings = self.api.fetch_my_stock_list() or {}
-                            balance = self.api.fetch_balance()
-
-                            msg = f"📊 [상태]\n잔고: {balance:,}원\n"
+                            # 계좌 상태 캐시에서 즉시 응답 (응답 후 백그라운드 재조회)
+                            account = self.account.snapshot()
+                            real_holdings = account['holdings']
+                            balance = account['total']
+                            updated = f"{account['updated_at']:%H:%M:%S}" if account['updated_at'] else "미조회"
+                            self.account.mark_dirty()
+
+                            msg = f"📊 [상태]\n잔고: {balance:,}원 (예수금 {account['cash']:,}원, 기준 {updated})\n"
                             
                             msg += "\n[🤖 봇 내부 장부 (포트폴리오)]"
                             if not self.portfolio: msg += "\n없음"
@@ -879,13 +1617,20 @@ class TradingBot:
                                 msg += f"\n\n⚠️ [경고] 봇 미관리 종목(고아):\n{', '.join(orphans)}"
 
                             telegram_notifier.send_telegram_message(msg)
+                        elif cmd in ['/latency', 'latency']:
+                            # 구간별 지연 (p50/p95/p99) + 주문 접수 지연
+                            msg = f"⏱️ [구간별 지연]\n{latency.format_report()}"
+                            ack = self.api.transport.snapshot().get((self.api._pool("TRADE"), "order-ack"))
+                            if ack:
+                                msg += f"\n\n[주문 접수] n={ack['count']} p50={ack['p50_ms']:.0f}ms p95={ack['p95_ms']:.0f}ms p99={ack['p99_ms']:.0f}ms"
+                            telegram_notifier.send_telegram_message(msg)
                         elif cmd in ['/stop', 'stop']: self.is_buy_active = False; telegram_notifier.send_telegram_message("⛔ 매수 정지")
                         elif cmd in ['/start', 'start']: self.is_buy_active = True; telegram_notifier.send_telegram_message("🟢 매수 재개")
                         elif cmd in ['/sell', 'sell']:
                             if len(update['message']['text'].split()) > 1:
                                 target = update['message']['text'].split()[1]
                                 target_code = next((c for c, v in self.portfolio.items() if v['name'] == target or c == target), None)
-                                if target_code: self.sell_stock(target_code, "원격 지정 매도")
+                                if target_code: self.request_sell(target_code, "원격 지정 매도")
                             else: self.liquidate_all_positions(reason="원격 긴급매도")
             except: time.sleep(5)
 
@@ -893,6 +1638,8 @@ class TradingBot:
     # ⚙️ 메인 루프
     # ----------------------------------------------------------------------
     def run(self):
+        self.account.start()
+        latency.start_dumper()
         threading.Thread(target=self.monitor_portfolio, daemon=True).start()
         threading.Thread(target=self.telegram_listener, daemon=True).start()
         threading.Thread(target=self.start_websocket, daemon=True).start()
@@ -911,8 +1658,14 @@ class TradingBot:
                 # ==================================================================
                 # API 호출 최적화: 조건검색 1회 조회 후 전역 변수로 공유
                 # ==================================================================
-                value_list = self.api.fetch_condition_stocks("value")
-                if value_list: self.current_value_codes = [item['code'] for item in value_list]
+                with latency.span("entry.condition_fetch"):
+                    value_list = self.api.fetch_condition_stocks("value")
+                if value_list:
+                    self.current_value_codes = [item['code'] for item in value_list]
+                    self.value_names = {item['code']: item['name'] for item in value_list}
+                    # 📡 조건검색 편입/편출에 맞춰 실시간 구독 갱신 (조회 실패 시 기존 구독 유지)
+                    self.sync_ws_subscriptions(value_list)
+                    self.record_condition_snapshot(value_list)
                 
                 # 5분 단위 데이터 전수 로깅
                 if now.minute % 5 == 0 and (self.last_value_log_time is None or now.minute != self.last_value_log_time.minute):
@@ -922,118 +1675,67 @@ class TradingBot:
                 # ==================================================================
                 # 밸류 킹 매수 진입 (09:00 ~ 09:30 데이터 검증 최적화)
                 # ==================================================================
-                current_slots = sum(1 for _ in self.portfolio)
-                # is_valid_time = (now.hour == BotConfig.VALUEKING_START_HOUR and now.minute <= BotConfig.VALUEKING_END_MINUTE)
-                # is_valid_time = (now.hour == 9) or (now.hour == 10 and now.minute == 0) 
-
                 # 1. 투-트랙 시간대 세팅
-                is_valid_time = False
-                current_time = now.time()
-                
-                if datetime.time(9, 2, 0) <= current_time <= datetime.time(10, 0, 0):
-                    is_valid_time = True
-                    current_min_trade_amt = 5_000_000_000
-                    current_max_trade_amt = 20_000_000_000
-                elif datetime.time(12, 0, 0) <= current_time <= datetime.time(14, 30, 0):
-                    is_valid_time = True
-                    current_min_trade_amt = 100_000_000_000
-                    current_max_trade_amt = float('inf')
+                entry_window = self.get_entry_window(now)
+                is_valid_time = entry_window is not None
 
                 # 👇 [신규 추가] 조건을 통과한 매수 후보 종목들을 담을 빈 리스트 생성
                 candidates = []
 
-                # 2. 백그라운드 데이터 수집 및 매수 판별 통합 루프
-                for item in value_list:
-                    code = item['code']
-                    name = item['name']
+                # 2. 사전 필터 통과 종목 중 실시간 틱이 들어오지 않는 종목만 REST로 병렬 조회
+                #    (구독 중인 종목은 on_candidate_tick에서 틱 단위로 판별)
+                with self.ws_lock: tick_covered = set(self.ws_subscribed)
+                targets = [(item['code'], item['name']) for item in value_list
+                           if self.is_scan_target(item) and item['code'] not in tick_covered]
 
-                    if code in self.portfolio or code in self.blacklist: continue
-                    if item['price'] < BotConfig.MIN_STOCK_PRICE or item['price'] > BotConfig.MAX_STOCK_PRICE: continue
-                    if is_excluded_stock(name): continue
+                with latency.span("entry.quote_fanout"):
+                    quote_batch = self.api.fetch_price_batch(targets, lite=True)
 
-                    info = self.api.fetch_price_detail(code, name)
+                # 3. 스냅샷 배치에 대해 속도 계산 및 매수 판별
+                for code, name in targets:
+                    info = quote_batch.get(code)
                     if not info or info['open'] == 0: continue
 
-                    current_fetch_time = datetime.datetime.now()
                     is_etf = any(keyword in name for keyword in BotConfig.ETF_KEYWORDS)
 
                     # 🚨 [복구된 핵심 로직] 데이터 최신화 및 속도 계산
                     current_trade_amt = info.get('acml_vol', 0) * info['price']
                     current_pg_amt = info.get('program_buy', 0) * info['price']
-                    passed_speed_filter = False
-
-                    if code in self.prev_stock_data:
-                        prev_data = self.prev_stock_data[code]
-                        time_diff_sec = (current_fetch_time - prev_data['time']).total_seconds()
-                        
-                        if time_diff_sec >= 3.0: 
-                            trade_diff_100m = (current_trade_amt - prev_data['trade_amt']) / 100_000_000
-                            pg_diff_100m = (current_pg_amt - prev_data['pg_amt']) / 100_000_000
-                            trade_speed_per_min = (trade_diff_100m / time_diff_sec) * 60
-                            pg_speed_per_min = (pg_diff_100m / time_diff_sec) * 60
-
-                            price_diff = info['price'] - prev_data.get('price', info['price'])
-
-                            # 거래대금 속도 체크 (상한선 해제, MIN 속도만 충족하면 통과)
-                            if trade_speed_per_min >= BotConfig.TRADE_SPEED_MIN:
-                                if price_diff > 0:
-                                    passed_speed_filter = True
-                                # 프로그램 속도 체크 (프로그램도 상한선 해제)
-                                # if is_etf or (pg_speed_per_min >= BotConfig.PG_SPEED_MIN):
-                                #     passed_speed_filter = True
-                    else:
-                        self.prev_stock_data[code] = {'time': current_fetch_time, 'trade_amt': current_trade_amt, 'pg_amt': current_pg_amt, 'price': info['price']}
-                        continue 
-
-                    self.prev_stock_data[code] = {'time': current_fetch_time, 'trade_amt': current_trade_amt, 'pg_amt': current_pg_amt, 'price': info['price']}
+                    passed_speed_filter = self.update_speed_filter(code, info['fetch_time'], current_trade_amt, current_pg_amt, info['price'], 'rest')
+                    if passed_speed_filter is None: continue
 
                     # =============== 🚧 실제 진입 판별 (is_valid_time일 때만) ===============
-                    if self.is_buy_active and current_slots < BotConfig.MAX_GLOBAL_SLOTS and is_valid_time:
-                        
-                        # 누적 거래대금 시간대별 동적 필터
-                        if not (current_min_trade_amt <= current_trade_amt <= current_max_trade_amt): continue
+                    if self.is_buy_active and len(self.portfolio) < BotConfig.MAX_GLOBAL_SLOTS and is_valid_time:
                         
                         # 속도 필터 통과 여부
                         if not passed_speed_filter: continue
-                        
-                        # 기본 양봉, 상승률 필터
-                        if info['price'] < info['open']: continue
-                        if info['rate'] < BotConfig.MIN_RATE_LIMIT or info['rate'] > BotConfig.MAX_RATE_LIMIT: continue
-                        
-                        # 👇 [신규 추가] 윗꼬리 비율 계산
-                        high_price = info.get('high', 0)
-                        tail_ratio = 0.0
-                        if high_price > 0:
-                            tail_ratio = ((high_price - info['price']) / high_price) * 100
-                            if tail_ratio >= 3.0: continue # 3% 이상 밀린 종목 탈락
-                        info['tail_ratio'] = tail_ratio
-
-                        # 프로그램 꼬시기 차단
-                        if not is_etf and BotConfig.PROGRAM_BUY_AMBIGUOUS_MIN <= current_pg_amt < BotConfig.PROGRAM_BUY_AMBIGUOUS_MAX: continue
+                        with latency.span("entry.filters"):
+                            passed = self.passes_entry_filters(info, current_trade_amt, current_pg_amt, is_etf, entry_window)
+                        if not passed: continue
 
-                        # 시가총액
-                        market_cap = info.get('market_cap', 0)
-                        if market_cap < BotConfig.MIN_MARKET_CAP or market_cap > BotConfig.MAX_MARKET_CAP: continue
+                        # 모든 필터 통과 종목만 호가 조회 (스캔 단계는 lite 시세만 사용)
+                        info['ask_price_1'] = self.api.fetch_ask_price_1(code)
 
                         # 즉시 매수하지 않고 후보군에 담기
                         candidates.append(info)
 
                 # ==========================================================
-                # 🚀 3. 후보군 정렬 및 최우선 종목 매수 실행
+                # 🚀 4. 후보군 정렬 및 최우선 종목 매수 실행
                 # ==========================================================
                 if candidates:
                     # 윗꼬리가 짧은 순서대로(오름차순) 정렬
                     candidates.sort(key=lambda x: x['tail_ratio'])
                     
                     for candidate in candidates:
-                        if sum(1 for _ in self.portfolio) >= BotConfig.MAX_GLOBAL_SLOTS: 
+                        if len(self.portfolio) >= BotConfig.MAX_GLOBAL_SLOTS: 
                             break
-                        self.execute_buy(candidate)
+                        self.try_buy(candidate)
                 time.sleep(1)
             except Exception as e:
                 print(f"Main Loop Error: {e}")
                 time.sleep(5)
 
 if __name__ == "__main__":
+    redirect_std_streams(setup_logging())
     bot = TradingBot()
     bot.run()
@@ -0,0 +1,163 @@
+# sweep.py
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import backtest
+from backtest import BotConfig, ConfigView
+
+# ==============================================================================
+# 🔬 BotConfig 파라미터 그리드 스윕
+# ==============================================================================
+# 사용 예)
+#   python sweep.py TRADE_SPEED_MIN=10:40:5 MAX_RATE_LIMIT=11,13,15 HARD_STOP_RATE=-0.04:-0.02:0.005
+#   - 'a:b:step' : a 부터 b 까지(포함) step 간격
+#   - 'a,b,c'    : 나열한 값만
+# 파싱된 로그 배열은 임시 폴더에 .npy 로 한 번 저장하고, 워커는 mmap 으로 열어 공유합니다. (피클 복사 없음)
+
+ARRAY_COLUMNS = ["Price", "Rate", "Trade_Amt", "PG_Amt", "Market_Cap", "Sec", "is_etf", "excluded",
+                 "has_prev", "trade_speed", "price_diff", "group", "order",
+                 "Open", "High", "Low", "Close", "has_bar"]
+
+def parse_range(spec):
+    """'10:40:5' -> [10, 15, ..., 40] / '11,13,15' -> [11, 13, 15]"""
+    def num(v):
+        return int(v) if v.lstrip("-").isdigit() else float(v)
+    if ":" in spec:
+        start, stop, step = (num(v) for v in spec.split(":"))
+        count = int(round((stop - start) / step)) + 1
+        values = [start + step * i for i in range(count)]
+        return [round(v, 10) if isinstance(v, float) else v for v in values]
+    return [num(v) for v in spec.split(",")]
+
+def parse_grid(args):
+    grid = {}
+    for arg in args:
+        name, spec = arg.split("=", 1)
+        if not hasattr(BotConfig, name):
+            raise SystemExit(f"❌ BotConfig 에 '{name}' 항목이 없습니다.")
+        grid[name] = parse_range(spec)
+    return grid
+
+# ==============================================================================
+# 1. 로그 배열을 mmap 공유용 .npy 로 저장
+# ==============================================================================
+def build_arrays(df, bars, array_dir):
+    """로그 + 일봉을 행 단위 숫자 배열로 펼쳐 array_dir/<컬럼>.npy 로 저장"""
+    merged = df.merge(bars, on=["Code", "Date"], how="left")
+    arrays = {
+        "Price": merged["Price"].to_numpy(np.float64),
+        "Rate": merged["Rate"].to_numpy(np.float64),
+        "Trade_Amt": merged["Trade_Amt"].to_numpy(np.float64),
+        "PG_Amt": merged["PG_Amt"].to_numpy(np.float64),
+        "Market_Cap": merged["Market_Cap"].to_numpy(np.float64),
+        "Sec": merged["Sec"].to_numpy(np.int64),
+        "is_etf": merged["is_etf"].to_numpy(bool),
+        "excluded": merged["excluded"].to_numpy(bool),
+        "has_prev": merged["has_prev"].to_numpy(bool),
+        "trade_speed": merged["trade_speed"].to_numpy(np.float64),
+        "price_diff": merged["price_diff"].to_numpy(np.float64),
+        # (종목, 일자) 그룹 번호: 하루 1회 진입 판정용 / 시간순 정렬 키: 낙폭 계산용
+        "group": merged.groupby(["Code", "Date"], sort=False).ngroup().to_numpy(np.int64),
+        "order": (pd.to_datetime(merged["Date"]).astype("int64") // 10**9 + merged["Sec"]).to_numpy(np.int64),
+        "Open": merged["Open"].to_numpy(np.float64),
+        "High": merged["High"].to_numpy(np.float64),
+        "Low": merged["Low"].to_numpy(np.float64),
+        "Close": merged["Close"].to_numpy(np.float64),
+        "has_bar": merged["Open"].notna().to_numpy(bool),
+    }
+    for name, arr in arrays.items():
+        np.save(os.path.join(array_dir, f"{name}.npy"), arr)
+    return len(merged)
+
+# ==============================================================================
+# 2. 워커 (mmap 배열로 한 그리드 포인트씩 평가)
+# ==============================================================================
+_ARRAYS = None
+
+def _init_worker(array_dir):
+    global _ARRAYS
+    _ARRAYS = {name: np.load(os.path.join(array_dir, f"{name}.npy"), mmap_mode="r") for name in ARRAY_COLUMNS}
+
+def evaluate(params, arrays=None):
+    """한 파라미터 조합의 백테스트 통계"""
+    a = arrays if arrays is not None else _ARRAYS
+    cfg = ConfigView(params)
+
+    mask = backtest.signal_mask(a, cfg)
+    # 일봉이 있고 양봉(현재가 >= 시가)인 시그널만 후보 (봇과 같이 첫 시그널 선정 전에 적용)
+    mask &= np.asarray(a["has_bar"])
+    mask &= np.asarray(a["Price"]) >= np.asarray(a["Open"])
+    idx = np.flatnonzero(mask)
+    # 행이 (종목, 일자, 시각) 순으로 정렬돼 있으므로 그룹별 첫 시그널 = 하루 1회 진입
+    _, first = np.unique(a["group"][idx], return_index=True)
+    idx = idx[first]
+    idx = idx[np.argsort(a["order"][idx], kind="stable")]
+
+    _, profit = backtest.exit_profits(a["Price"][idx], a["High"][idx], a["Low"][idx], a["Close"][idx], cfg)
+    return dict(params, **backtest.summarize_profits(profit))
+
+def _evaluate_chunk(chunk):
+    return [evaluate(params) for params in chunk]
+
+# ==============================================================================
+# 3. 그리드 실행
+# ==============================================================================
+def run_sweep(grid, df, bars, workers=None, chunk_size=20):
+    names = list(grid)
+    points = [dict(zip(names, values)) for values in itertools.product(*(grid[n] for n in names))]
+    chunks = [points[i:i + chunk_size] for i in range(0, len(points), chunk_size)]
+
+    array_dir = tempfile.mkdtemp(prefix="sweep_")
+    try:
+        build_arrays(df, bars, array_dir)
+        results = []
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(array_dir,)) as pool:
+            for chunk_result in pool.map(_evaluate_chunk, chunks):
+                results.extend(chunk_result)
+    finally:
+        shutil.rmtree(array_dir, ignore_errors=True)
+    return pd.DataFrame(results)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="BotConfig 파라미터 그리드 스윕 (프로세스 풀)")
+    parser.add_argument("params", nargs="+", help="NAME=a:b:step 또는 NAME=a,b,c")
+    parser.add_argument("--log-dir", default=backtest.LOG_DIR)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--sort", default="expectancy", choices=["expectancy", "hit_rate", "max_drawdown", "total", "trades"])
+    parser.add_argument("--min-trades", type=int, default=10, help="진입 횟수가 이보다 적은 조합은 순위에서 제외")
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--out", default="sweep_result.csv")
+    args = parser.parse_args()
+
+    grid = parse_grid(args.params)
+    total = int(np.prod([len(v) for v in grid.values()]))
+
+    df = backtest.load_value_logs(args.log_dir)
+    if df.empty:
+        print(f"❌ '{args.log_dir}' 에 value_volume_log_*.csv 가 없습니다.")
+        sys.exit(1)
+    # 파라미터와 무관하게 진입 가능성이 있는 (종목, 일자) 일봉을 미리 캐시에 확보
+    candidates = df[~df["excluded"]]
+    bars = backtest.load_daily_bars(set(zip(candidates["Code"], candidates["Date"])))
+
+    print(f"🔬 그리드 {total:,}개 조합 x 로그 {len(df):,}행 스윕 시작...")
+    started = time.perf_counter()
+    result = run_sweep(grid, df, bars, args.workers)
+    elapsed = time.perf_counter() - started
+
+    ranked = result[result["trades"] >= args.min_trades].sort_values(args.sort, ascending=(args.sort == "max_drawdown"))
+    result.sort_values(args.sort, ascending=(args.sort == "max_drawdown")).to_csv(args.out, index=False, encoding="utf-8-sig")
+
+    print(f"✅ 완료: {elapsed:.1f}초 ({total / max(elapsed, 1e-9):,.0f} 조합/초)\n")
+    with pd.option_context("display.width", 200, "display.max_columns", None):
+        print(ranked.head(args.top).to_string(index=False, float_format=lambda v: f"{v:.3f}"))
+    print(f"\n💾 전체 결과 저장: {args.out}")
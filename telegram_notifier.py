@@ -1,26 +1,134 @@
 # telegram_notifier.py
 
+import atexit
 import requests
 import time
+import queue
+import threading
 import config
+import latency
 
 # ==============================================================================
-# 📞 텔레그램 알림 함수
+# 📞 텔레그램 알림 (비동기 전송 큐)
 # ==============================================================================
+# 주문 경로에서는 큐에 넣기만 하고 즉시 리턴합니다.
+# 백그라운드 전송 스레드가 짧은 시간 안에 몰린 메시지를 한 건으로 묶어 보내고,
+# 텔레그램 전송 한도(채팅방당 초당 1건 수준)와 429 retry_after 를 지킵니다.
+
+COALESCE_WINDOW = 0.5                                # 첫 메시지 이후 이 시간 동안 들어온 메시지는 묶어서 전송
+MIN_INTERVAL = max(getattr(config, 'TIME_SLEEP', 0), 1.0)   # 전송 간 최소 간격 (초)
+MAX_MESSAGE_LEN = 4000                               # 텔레그램 최대 4096자 (여유분 확보)
+SEND_TIMEOUT = 10
+
+_queue = queue.Queue()
+_session = requests.Session()
+_sender_lock = threading.Lock()
+_sender_thread = None
+
+def _ensure_sender():
+    global _sender_thread
+    with _sender_lock:
+        if _sender_thread is None or not _sender_thread.is_alive():
+            _sender_thread = threading.Thread(target=_sender_loop, name="telegram-sender", daemon=True)
+            _sender_thread.start()
 
 def send_telegram_message(message):
-    """텔레그램 봇으로 메시지를 전송하는 함수"""
+    """텔레그램 메시지를 전송 큐에 넣고 바로 리턴 (네트워크 대기 없음)"""
+    with latency.span("notify.telegram"):
+        _ensure_sender()
+        for chunk in _split_message(str(message)):
+            _queue.put(chunk)
+    return True
+
+def _split_message(text):
+    """MAX_MESSAGE_LEN 을 넘는 메시지는 줄 단위로 나눔 (한 줄이 너무 길면 그 줄을 잘라서)"""
+    if len(text) <= MAX_MESSAGE_LEN: return [text]
+    chunks, current = [], ""
+    for line in text.split("\n"):
+        while len(line) > MAX_MESSAGE_LEN:
+            if current:
+                chunks.append(current)
+                current = ""
+            chunks.append(line[:MAX_MESSAGE_LEN])
+            line = line[MAX_MESSAGE_LEN:]
+        if current and len(current) + 1 + len(line) > MAX_MESSAGE_LEN:
+            chunks.append(current)
+            current = line
+        else:
+            current = f"{current}\n{line}" if current else line
+    if current: chunks.append(current)
+    return chunks
+
+def flush(timeout=5.0):
+    """큐에 남은 메시지를 timeout 초까지 전송 대기 (종료 직전 호출)"""
+    deadline = time.monotonic() + timeout
+    while _queue.unfinished_tasks and time.monotonic() < deadline:
+        time.sleep(0.05)
+    return _queue.unfinished_tasks == 0
+
+# 전송 스레드는 데몬이므로, 짧게 실행되는 스크립트가 먼저 끝나도 남은 알림은 보내고 종료
+atexit.register(flush)
+
+# ==============================================================================
+# 📤 백그라운드 전송 스레드
+# ==============================================================================
+def _collect_batch(first, send_after):
+    """
+    첫 메시지 이후 COALESCE_WINDOW (전송 간격 대기 중이면 그 시간까지) 동안 들어온 메시지를 하나로 묶기
+    :return: (묶인 메시지 목록, 길이 초과로 다음 묶음에 넘길 메시지 또는 None)
+    """
+    parts = [first]
+    length = len(first)
+    deadline = max(time.monotonic() + COALESCE_WINDOW, send_after)
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0: break
+        try:
+            msg = _queue.get(timeout=remaining)
+        except queue.Empty:
+            break
+        if length + len(msg) + 2 > MAX_MESSAGE_LEN:
+            return parts, msg
+        parts.append(msg)
+        length += len(msg) + 2
+    return parts, None
+
+def _post(text):
     url = f"https://api.telegram.org/bot{config.TELEGRAM_BOT_TOKEN}/sendMessage"
     payload = {
         'chat_id': config.TELEGRAM_CHAT_ID,
-        'text': message,
+        'text': text,
         'parse_mode': 'Markdown'
     }
-    try:
-        response = requests.post(url, data=payload)
-        response.raise_for_status() 
-        time.sleep(config.TIME_SLEEP)
-        return True
-    except Exception as e:
-        print(f"[텔레그램] 메시지 전송 실패: {e}")
-        return False
\ No newline at end of file
+    for attempt in range(3):
+        try:
+            response = _session.post(url, data=payload, timeout=SEND_TIMEOUT)
+            if response.status_code == 429:
+                # 전송 한도 초과: 텔레그램이 알려준 시간만큼 대기 후 재시도
+                retry_after = response.json().get('parameters', {}).get('retry_after', 1)
+                time.sleep(retry_after)
+                continue
+            if response.status_code == 400 and 'parse_mode' in payload:
+                # 묶인 메시지의 마크다운이 깨진 경우 일반 텍스트로 재전송
+                payload.pop('parse_mode')
+                continue
+            response.raise_for_status()
+            return True
+        except Exception as e:
+            print(f"[텔레그램] 메시지 전송 실패: {e}")
+            time.sleep(1)
+    return False
+
+def _sender_loop():
+    last_sent = 0.0
+    carry = None
+    while True:
+        first = carry if carry is not None else _queue.get()
+        parts, carry = _collect_batch(first, last_sent + MIN_INTERVAL)
+        try:
+            with latency.span("notify.telegram_send"):
+                _post("\n\n".join(parts))
+        finally:
+            last_sent = time.monotonic()
+            for _ in parts:
+                _queue.task_done()
@@ -1,7 +1,7 @@
 import pandas as pd
 import numpy as np
-import FinanceDataReader as fdr
 import os
+import bar_cache
 
 def run_intraday_backtest():
     print("1. 밸류킹 로그 데이터 로딩 및 가속도 계산 중...")
@@ -69,20 +69,22 @@ def run_intraday_backtest():
     # =======================================================
     # 🎯 FDR 당일 봉 데이터를 활용한 가상 청산 시뮬레이션
     # =======================================================
+    # 시그널 (종목, 일자) 일봉을 로컬 캐시에서 한 번에 확보 (캐시에 없는 일자만 FDR 조회)
+    signals['Code'] = signals['Code'].astype(str).str.zfill(6)
+    signals['Date'] = signals['Date'].str.replace('-', '')
+    daily_bars = bar_cache.load_daily_bars(zip(signals['Code'], signals['Date']))
+
     results = []
     for idx, row in signals.iterrows():
         date_str = row['Date']
-        code = str(row['Code']).zfill(6)
+        code = row['Code']
         buy_price = row['Price']
         
         try:
-            fdr_df = fdr.DataReader(code, date_str, date_str)
-            if fdr_df.empty: continue
+            bar = daily_bars.get((code, date_str))
+            if bar is None: continue
             
-            daily_open = fdr_df['Open'].iloc[0]
-            daily_high = fdr_df['High'].iloc[0]
-            daily_low = fdr_df['Low'].iloc[0]
-            daily_close = fdr_df['Close'].iloc[0]
+            daily_open, daily_high, daily_low, daily_close, _ = bar
             
             # 음봉 진입 차단 로직 (봇의 info['price'] < info['open'] continue 동일 적용)
             if buy_price < daily_open:
@@ -0,0 +1,111 @@
+# tick_decoder.py
+import time
+
+# ==============================================================================
+# 📡 KIS 실시간 체결가(H0STCNT0) 디코더
+# ==============================================================================
+# 수신 포맷: "0|H0STCNT0|003|필드^필드^...^필드"
+#  - parts[2] : 한 프레임에 담긴 레코드 수 (급등락 구간에서는 여러 건이 묶여서 옴)
+#  - parts[3] : 레코드 수 x 46개 필드가 '^' 로 이어진 문자열
+
+TR_ID = "H0STCNT0"
+
+def _int(val):
+    try: return int(val)
+    except: return 0
+
+def _price(val):
+    try: return abs(int(val))
+    except: return 0
+
+def _float(val):
+    try: return float(val)
+    except: return 0.0
+
+def _str(val):
+    return val
+
+# (필드명, 변환함수) - KIS 문서의 필드 순서 그대로 (종목코드만 'code'로 축약)
+FIELDS = (
+    ("code", _str),                          # 유가증권 단축 종목코드
+    ("stck_cntg_hour", _str),                # 주식 체결 시간 (HHMMSS)
+    ("stck_prpr", _price),                   # 주식 현재가
+    ("prdy_vrss_sign", _str),                # 전일 대비 부호
+    ("prdy_vrss", _int),                     # 전일 대비
+    ("prdy_ctrt", _float),                   # 전일 대비율
+    ("wghn_avrg_stck_prc", _float),          # 가중 평균 주식 가격
+    ("stck_oprc", _price),                   # 주식 시가
+    ("stck_hgpr", _price),                   # 주식 최고가
+    ("stck_lwpr", _price),                   # 주식 최저가
+    ("askp1", _price),                       # 매도호가1
+    ("bidp1", _price),                       # 매수호가1
+    ("cntg_vol", _int),                      # 체결 거래량
+    ("acml_vol", _int),                      # 누적 거래량
+    ("acml_tr_pbmn", _int),                  # 누적 거래 대금
+    ("seln_cntg_csnu", _int),                # 매도 체결 건수
+    ("shnu_cntg_csnu", _int),                # 매수 체결 건수
+    ("ntby_cntg_csnu", _int),                # 순매수 체결 건수
+    ("cttr", _float),                        # 체결강도
+    ("seln_cntg_smtn", _int),                # 총 매도 수량
+    ("shnu_cntg_smtn", _int),                # 총 매수 수량
+    ("ccld_dvsn", _str),                     # 체결구분 (1:매수, 3:장전, 5:매도)
+    ("shnu_rate", _float),                   # 매수비율
+    ("prdy_vol_vrss_acml_vol_rate", _float), # 전일 거래량 대비 등락율
+    ("oprc_hour", _str),                     # 시가 시간
+    ("oprc_vrss_prpr_sign", _str),           # 시가대비구분
+    ("oprc_vrss_prpr", _int),                # 시가대비
+    ("hgpr_hour", _str),                     # 최고가 시간
+    ("hgpr_vrss_prpr_sign", _str),           # 고가대비구분
+    ("hgpr_vrss_prpr", _int),                # 고가대비
+    ("lwpr_hour", _str),                     # 최저가 시간
+    ("lwpr_vrss_prpr_sign", _str),           # 저가대비구분
+    ("lwpr_vrss_prpr", _int),                # 저가대비
+    ("bsop_date", _str),                     # 영업 일자
+    ("new_mkop_cls_code", _str),             # 신 장운영 구분 코드
+    ("trht_yn", _str),                       # 거래정지 여부
+    ("askp_rsqn1", _int),                    # 매도호가 잔량1
+    ("bidp_rsqn1", _int),                    # 매수호가 잔량1
+    ("total_askp_rsqn", _int),               # 총 매도호가 잔량
+    ("total_bidp_rsqn", _int),               # 총 매수호가 잔량
+    ("vol_tnrt", _float),                    # 거래량 회전율
+    ("prdy_smns_hour_acml_vol", _int),       # 전일 동시간 누적 거래량
+    ("prdy_smns_hour_acml_vol_rate", _float),# 전일 동시간 누적 거래량 비율
+    ("hour_cls_code", _str),                 # 시간 구분 코드 (0:장중, A:장후예상, B:장전예상 ...)
+    ("mrkt_trtm_cls_code", _str),            # 임의종료구분코드
+    ("vi_stnd_prc", _price),                 # 정적VI발동기준가
+)
+FIELD_COUNT = len(FIELDS)
+_NAMES = tuple(name for name, _ in FIELDS)
+_CONVERTERS = tuple(conv for _, conv in FIELDS)
+
+class Tick:
+    """H0STCNT0 체결 1건. __slots__ 로 dict 없이 고정 필드만 보관합니다."""
+    __slots__ = _NAMES + ("recv_ts",)
+
+    def __init__(self, raw_fields, recv_ts=None):
+        for name, conv, raw in zip(_NAMES, _CONVERTERS, raw_fields):
+            setattr(self, name, conv(raw))
+        self.recv_ts = recv_ts if recv_ts is not None else time.time()  # 수신 시각 (epoch 초)
+
+    def __repr__(self):
+        return f"Tick({self.code} {self.stck_cntg_hour} {self.stck_prpr:,}원 누적 {self.acml_vol:,}주)"
+
+def decode_frame(message):
+    """
+    웹소켓 수신 문자열을 Tick 리스트로 변환합니다.
+    H0STCNT0 프레임이 아니면 빈 리스트를 반환하며, 다건 프레임은 레코드 수만큼 모두 분리합니다.
+    """
+    parts = message.split('|', 3)
+    if len(parts) < 4 or parts[1] != TR_ID: return []
+
+    fields = parts[3].split('^')
+    try: count = int(parts[2])
+    except ValueError: count = len(fields) // FIELD_COUNT
+
+    recv_ts = time.time()
+    ticks = []
+    for i in range(count):
+        chunk = fields[i * FIELD_COUNT:(i + 1) * FIELD_COUNT]
+        if len(chunk) < FIELD_COUNT: break
+        ticks.append(Tick(chunk, recv_ts))
+    return ticks
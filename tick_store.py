@@ -0,0 +1,190 @@
+# tick_store.py
+import os
+import json
+import mmap
+import struct
+import datetime
+import threading
+
+# ==============================================================================
+# 💾 당일 실시간 체결 틱 저널 (append-only, memory-mapped)
+# ==============================================================================
+# 파일 구조: ticks/ticks_YYYYMMDD.bin
+#  - 헤더 32바이트 : magic(4) | version(4) | record_size(4) | reserved(4) | count(8) | reserved(8)
+#  - 레코드 56바이트 고정폭 (수신 순서 = 시간 순서로 이어붙임)
+# 웹소켓 스레드는 mmap 영역에 pack_into 로 복사만 하므로 건당 수 마이크로초 수준입니다.
+
+TICK_DIR = "ticks"
+MAGIC = b"TICK"
+VERSION = 1
+HEADER = struct.Struct("<4sIII q 8x")
+RECORD = struct.Struct("<8s q i i i f q q q")
+#          code | ts_us | price | open | high | rate | acml_vol | acml_tr_pbmn | pg_qty
+COUNT_OFFSET = 16
+GROW_RECORDS = 1_000_000   # 파일이 가득 차면 레코드 100만 건(약 56MB)씩 확장
+
+def tick_file_path(date_str, tick_dir=TICK_DIR):
+    """date_str: 'YYYYMMDD'"""
+    return os.path.join(tick_dir, f"ticks_{date_str}.bin")
+
+class TickRecord:
+    """저널에서 읽어온 틱 1건"""
+    __slots__ = ("code", "ts", "price", "open", "high", "rate", "acml_vol", "acml_tr_pbmn", "pg_qty")
+
+    def __init__(self, code, ts, price, open_, high, rate, acml_vol, acml_tr_pbmn, pg_qty):
+        self.code = code
+        self.ts = ts                    # epoch 초 (float)
+        self.price = price
+        self.open = open_
+        self.high = high
+        self.rate = rate
+        self.acml_vol = acml_vol
+        self.acml_tr_pbmn = acml_tr_pbmn
+        self.pg_qty = pg_qty            # 프로그램 순매수 수량 (마지막 REST 스냅샷 기준)
+
+    @property
+    def time(self):
+        return datetime.datetime.fromtimestamp(self.ts)
+
+    def __repr__(self):
+        return f"TickRecord({self.code} {self.time:%H:%M:%S.%f} {self.price:,}원)"
+
+# ==============================================================================
+# ✍️ 기록기
+# ==============================================================================
+class TickJournal:
+    def __init__(self, tick_dir=TICK_DIR):
+        self.tick_dir = tick_dir
+        self.lock = threading.Lock()
+        self.file = None
+        self.mm = None
+        self.count = 0
+        self.capacity = 0
+        self.day_end_ts = 0.0
+
+    def _open(self, ts):
+        self._close()
+        day = datetime.datetime.fromtimestamp(ts).date()
+        self.day_end_ts = datetime.datetime.combine(day + datetime.timedelta(days=1), datetime.time()).timestamp()
+        if not os.path.exists(self.tick_dir):
+            os.makedirs(self.tick_dir)
+        path = tick_file_path(day.strftime("%Y%m%d"), self.tick_dir)
+
+        if os.path.exists(path) and os.path.getsize(path) >= HEADER.size:
+            # 재시작 시 기존 저널 뒤에 이어서 기록
+            self.file = open(path, "r+b")
+            magic, version, record_size, _, count = HEADER.unpack(self.file.read(HEADER.size))
+            if magic != MAGIC or record_size != RECORD.size:
+                raise ValueError(f"틱 저널 형식 불일치: {path}")
+            self.count = count
+        else:
+            self.file = open(path, "w+b")
+            self.file.write(HEADER.pack(MAGIC, VERSION, RECORD.size, 0, 0))
+            self.count = 0
+        self._map(max(self.count + GROW_RECORDS, GROW_RECORDS))
+
+    def _map(self, capacity):
+        if self.mm: self.mm.close()
+        self.file.truncate(HEADER.size + capacity * RECORD.size)
+        self.mm = mmap.mmap(self.file.fileno(), 0)
+        self.capacity = capacity
+
+    def append(self, code, ts, price, open_, high, rate, acml_vol, acml_tr_pbmn, pg_qty):
+        with self.lock:
+            if self.mm is None or ts >= self.day_end_ts:
+                self._open(ts)  # 최초 기록 또는 날짜 변경(일자별 롤오버)
+            if self.count >= self.capacity:
+                self._map(self.capacity + GROW_RECORDS)
+            RECORD.pack_into(self.mm, HEADER.size + self.count * RECORD.size,
+                             code.encode("ascii"), int(ts * 1_000_000), price, open_, high, rate,
+                             acml_vol, acml_tr_pbmn, pg_qty)
+            self.count += 1
+            struct.pack_into("<q", self.mm, COUNT_OFFSET, self.count)
+
+    def append_tick(self, tick, pg_qty=0):
+        """tick_decoder.Tick 을 그대로 기록"""
+        self.append(tick.code, tick.recv_ts, tick.stck_prpr, tick.stck_oprc, tick.stck_hgpr,
+                    tick.prdy_ctrt, tick.acml_vol, tick.acml_tr_pbmn, pg_qty)
+
+    def flush(self):
+        with self.lock:
+            if self.mm: self.mm.flush()
+
+    def _close(self):
+        if self.mm:
+            self.mm.flush()
+            self.mm.close()
+            self.mm = None
+        if self.file:
+            # 남는 예비 공간은 잘라내고 닫기
+            self.file.truncate(HEADER.size + self.count * RECORD.size)
+            self.file.close()
+            self.file = None
+
+    def close(self):
+        with self.lock:
+            self._close()
+
+class NullTickJournal:
+    """디스크에 기록하지 않는 틱 저널 (리플레이 등 저장된 틱을 읽기만 하는 경우)"""
+    def append(self, *args): pass
+    def append_tick(self, tick, pg_qty=0): pass
+    def flush(self): pass
+    def close(self): pass
+
+# ==============================================================================
+# 📖 리더
+# ==============================================================================
+def read_ticks(date_str, codes=None, tick_dir=TICK_DIR):
+    """
+    하루치 저널을 시간 순서대로 스트리밍합니다.
+    :param date_str: 'YYYYMMDD'
+    :param codes: 지정 시 해당 종목 틱만 반환 (set/list)
+    """
+    path = tick_file_path(date_str, tick_dir)
+    if not os.path.exists(path) or os.path.getsize(path) < HEADER.size: return
+    codes = set(codes) if codes else None
+
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        magic, version, record_size, _, count = HEADER.unpack_from(mm, 0)
+        if magic != MAGIC or record_size != RECORD.size:
+            raise ValueError(f"틱 저널 형식 불일치: {path}")
+        # 헤더 count 이후는 미사용 예비 공간 (비정상 종료 시에도 count까지만 유효)
+        count = min(count, (len(mm) - HEADER.size) // RECORD.size)
+        for i in range(count):
+            code_b, ts_us, price, open_, high, rate, acml_vol, acml_tr_pbmn, pg_qty = RECORD.unpack_from(mm, HEADER.size + i * RECORD.size)
+            code = code_b.rstrip(b"\x00").decode("ascii")
+            if codes is not None and code not in codes: continue
+            yield TickRecord(code, ts_us / 1_000_000, price, open_, high, rate, acml_vol, acml_tr_pbmn, pg_qty)
+
+def list_tick_dates(tick_dir=TICK_DIR):
+    """기록된 저널 날짜 목록 (오름차순, 'YYYYMMDD')"""
+    if not os.path.exists(tick_dir): return []
+    return sorted(name[6:14] for name in os.listdir(tick_dir) if name.startswith("ticks_") and name.endswith(".bin"))
+
+# ==============================================================================
+# 📋 조건검색 편입 종목 스냅샷 (편입/편출이 있을 때만 1줄씩 기록)
+# ==============================================================================
+def condition_file_path(date_str, tick_dir=TICK_DIR):
+    return os.path.join(tick_dir, f"conditions_{date_str}.jsonl")
+
+def append_condition_snapshot(items, ts=None, tick_dir=TICK_DIR):
+    """
+    :param items: [{'code', 'name', 'price', 'vol', 'rate', 'market_cap'}, ...]
+    """
+    ts = ts if ts is not None else datetime.datetime.now().timestamp()
+    if not os.path.exists(tick_dir):
+        os.makedirs(tick_dir)
+    date_str = datetime.datetime.fromtimestamp(ts).strftime("%Y%m%d")
+    with open(condition_file_path(date_str, tick_dir), "a", encoding="utf-8") as f:
+        f.write(json.dumps({"ts": ts, "items": items}, ensure_ascii=False) + "\n")
+
+def read_condition_snapshots(date_str, tick_dir=TICK_DIR):
+    """(ts, items) 를 기록 순서(=시간 순서)대로 반환"""
+    path = condition_file_path(date_str, tick_dir)
+    if not os.path.exists(path): return
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try: row = json.loads(line)
+            except ValueError: continue   # 비정상 종료로 잘린 마지막 줄
+            yield row["ts"], row["items"]
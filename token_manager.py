@@ -1,12 +1,21 @@
 import requests
 import json
 import datetime
+import time
 import os
+import threading
 import config
 
 # 💾 토큰을 저장할 통합 파일명
 TOKEN_FILE = "kis_token.json"
 
+# ⏱️ 만료 1분 전까지만 재사용 (안전마진)
+EXPIRY_MARGIN_SEC = 60
+# 🔄 만료 30분 전부터는 백그라운드에서 미리 재발급
+REFRESH_AHEAD_SEC = 30 * 60
+# 🚦 백그라운드 재발급 실패 시 재시도 최소 간격 (tokenP 호출 한도 보호)
+BG_RETRY_SEC = 60
+
 def load_token_data():
     """JSON 파일에서 전체 토큰 데이터를 읽어옵니다."""
     if not os.path.exists(TOKEN_FILE):
@@ -18,42 +27,97 @@ def load_token_data():
     except Exception:
         return {}
 
+# ==============================================================================
+# 🧠 메모리 토큰 캐시 (파일은 시작 시 1회 읽기, 재발급 시에만 쓰기)
+# ==============================================================================
+_token_cache = {}                   # {mode: {"access_token": str, "expired_at": str}}
+_refresh_lock = threading.Lock()    # issue_new_token 동시 실행 방지 (single-flight)
+_bg_refreshing = set()              # 백그라운드 재발급이 진행 중인 모드
+_bg_lock = threading.Lock()         # _bg_refreshing 갱신용 (재발급 중에도 빠른 경로를 막지 않음)
+_bg_last_attempt = {}               # {mode: 마지막 백그라운드 재발급 시도 시각 (monotonic)}
+
+def _load_cache():
+    """시작 시 파일에 저장된 토큰을 메모리 캐시로 불러옵니다."""
+    for mode, token_info in load_token_data().items():
+        if isinstance(token_info, dict) and token_info.get("access_token"):
+            _token_cache[mode] = token_info
+
+def _cached_token(mode, margin_sec=EXPIRY_MARGIN_SEC):
+    """캐시된 토큰이 만료 margin_sec초 전까지 유효하면 반환, 아니면 None"""
+    token_info = _token_cache.get(mode)
+    if not token_info or not token_info.get("expired_at"):
+        return None
+    expired_at = datetime.datetime.strptime(token_info["expired_at"], "%Y-%m-%d %H:%M:%S")
+    if datetime.datetime.now() < expired_at - datetime.timedelta(seconds=margin_sec):
+        return token_info["access_token"]
+    return None
+
 def save_token_data(mode, token, expired_at):
-    """토큰 정보를 JSON 파일에 저장합니다. (기존 데이터 유지)"""
-    data = load_token_data()
-    
-    data[mode] = {
+    """토큰 정보를 메모리 캐시에 반영하고 JSON 파일에 저장합니다. (기존 데이터 유지)"""
+    _token_cache[mode] = {
         "access_token": token,
         "expired_at": expired_at
     }
     
     with open(TOKEN_FILE, 'w', encoding='utf-8') as f:
-        json.dump(data, f, indent=4, ensure_ascii=False)
+        json.dump(_token_cache, f, indent=4, ensure_ascii=False)
+
+def _refresh_in_background(mode):
+    try:
+        with _refresh_lock:
+            # 대기하는 사이 다른 스레드가 이미 재발급했다면 생략
+            if _cached_token(mode, REFRESH_AHEAD_SEC) is None:
+                issue_new_token(mode)
+    finally:
+        with _bg_lock:
+            _bg_refreshing.discard(mode)
 
 def get_access_token(mode="MOCK"):
     """
     접근 토큰을 반환합니다.
-    1. 파일에 저장된 토큰이 유효하면 -> 그대로 사용 (API 호출 X)
-    2. 없거나 만료되었으면 -> API 호출하여 재발급 후 파일 저장
+    1. 메모리 캐시의 토큰이 유효하면 -> 그대로 사용 (파일/API 접근 X)
+       - 만료 30분 이내로 남았으면 백그라운드 재발급만 걸어두고 기존 토큰 반환
+    2. 없거나 만료되었으면 -> 락을 잡고 API 호출하여 재발급 후 파일 저장
+       (동시에 여러 스레드가 들어와도 발급 요청은 1회만 나감)
     :param mode: "REAL" (실전) 또는 "MOCK" (모의)
     """
     
-    # [1] 파일에서 저장된 토큰 확인
-    saved_data = load_token_data()
-    
-    if mode in saved_data:
-        token_info = saved_data[mode]
-        expired_at_str = token_info.get("expired_at")
-        
-        if expired_at_str:
-            expired_at = datetime.datetime.strptime(expired_at_str, "%Y-%m-%d %H:%M:%S")
-            # 만료 1분 전까지만 재사용 (안전마진)
-            if datetime.datetime.now() < expired_at - datetime.timedelta(seconds=60):
-                # print(f"✅ [{mode}] 기존 토큰 유효 (만료: {expired_at_str})") # 너무 자주 뜨면 주석 처리
-                return token_info["access_token"]
+    # [1] 메모리 캐시 확인 (락 없이 빠른 경로)
+    token = _cached_token(mode)
+    if token:
+        if _cached_token(mode, REFRESH_AHEAD_SEC) is None and mode not in _bg_refreshing:
+            with _bg_lock:
+                # 직전 시도가 실패했더라도 BG_RETRY_SEC 이내에는 다시 시도하지 않음
+                now = time.monotonic()
+                start_bg = mode not in _bg_refreshing and now - _bg_last_attempt.get(mode, -BG_RETRY_SEC) >= BG_RETRY_SEC
+                if start_bg:
+                    _bg_refreshing.add(mode)
+                    _bg_last_attempt[mode] = now
+            if start_bg:
+                threading.Thread(target=_refresh_in_background, args=(mode,), daemon=True).start()
+        return token
 
-    # [2] 토큰 재발급 요청 (유효하지 않을 경우)
-    return issue_new_token(mode)
+    # [2] 토큰 재발급 요청 (유효하지 않을 경우) - single-flight
+    with _refresh_lock:
+        token = _cached_token(mode)
+        if token:
+            return token
+        return issue_new_token(mode)
+
+def ensure_token_valid_until(mode, until):
+    """
+    장 시작 전 워밍업용: 토큰이 until(datetime) 이전에 만료되면 지금 미리 재발급합니다.
+    (장중 첫 진입 구간에 재발급 왕복이 끼어들지 않도록)
+    """
+    margin_sec = max((until - datetime.datetime.now()).total_seconds(), 0) + EXPIRY_MARGIN_SEC
+    token = _cached_token(mode, margin_sec)
+    if token:
+        return token
+    with _refresh_lock:
+        token = _cached_token(mode, margin_sec)
+        if token:
+            return token
+        return issue_new_token(mode)
 
 def issue_new_token(mode):
     print(f"🔄 [{mode}] 새로운 토큰 발급 요청 중...")
@@ -99,6 +163,8 @@ def issue_new_token(mode):
         print(f"❌ 토큰 요청 중 에러 발생: {e}")
         return None
 
+_load_cache()
+
 if __name__ == "__main__":
     # 테스트 실행
     print("--- REAL 모드 테스트 ---")
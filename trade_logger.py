@@ -2,101 +2,201 @@
 import csv
 import os
 import datetime
+import threading
 
 # 📂 로그 저장 경로 설정
 LOG_DIR = "logs"
 BUY_LOG_FILE = f"{LOG_DIR}/buy_log.csv"
 SELL_LOG_FILE = f"{LOG_DIR}/sell_log.csv"
+VALUE_LOG_FILE = f"{LOG_DIR}/value_volume_log_{{date}}.csv"
+
+BUY_HEADER = [
+    "Time", "Code", "Name", "Strategy", "Level",
+    "Buy_Price", "Qty", "Program_Amt_Entry",
+    "Gap_Rate", "Leader_Name"
+]
+SELL_HEADER = [
+    "Time", "Code", "Name", "Strategy", "Reason",
+    "Buy_Price", "Sell_Price", "Qty", "Profit_Rate(%)", "Hold_Min(분)",
+    "Max_Price_During_Hold", "Min_Price_During_Hold",
+    "Entry_PG_Amt", "Max_PG_Amt_During_Hold",
+    "Exit_PG_Amt"
+]
+VALUE_HEADER = ['Time', 'Code', 'Name', 'Price', 'Volume', 'Trade_Amt(100M)', 'Rate(%)', 'PG_Amt(100M)', 'Market_Cap(100M)']
+
+FLUSH_INTERVAL = 2.0   # 백그라운드 플러시 주기 (초)
+
+# ==============================================================================
+# 🗂️ 버퍼형 CSV 기록기 (파일 핸들 유지 + 메모리 버퍼 + 주기적 플러시)
+# ==============================================================================
+# 매매 경로에서는 메모리 버퍼에 행을 추가만 하고, 디스크 쓰기는 플러시 스레드(또는 종료 시 flush)가 담당합니다.
+class BufferedCsvLog:
+    def __init__(self, path_template, header, fsync=False):
+        """
+        :param path_template: '{date}' 가 들어 있으면 일자별 파일로 롤오버 (YYYYMMDD)
+        :param fsync: True 면 플러시마다 os.fsync (매매 기록처럼 유실되면 안 되는 로그)
+        """
+        self.path_template = path_template
+        self.header = header
+        self.fsync = fsync
+        self.lock = threading.Lock()
+        self.pending = []      # [(date_str, row), ...]
+        self.file = None
+        self.writer = None
+        self.path = None
+
+    def append(self, row, date_str=None):
+        date_str = date_str or datetime.datetime.now().strftime("%Y%m%d")
+        with self.lock:
+            self.pending.append((date_str, row))
+
+    def _open(self, path):
+        self._close()
+        folder = os.path.dirname(path)
+        if folder and not os.path.exists(folder):
+            os.makedirs(folder)
+        is_new = not os.path.exists(path)
+        self.file = open(path, 'a', encoding='utf-8-sig', newline='')
+        self.writer = csv.writer(self.file)
+        self.path = path
+        if is_new:
+            # 파일이 없을 때만 헤더 작성 (이미 존재하면 이어쓰기)
+            self.writer.writerow(self.header)
+            print(f"📁 [Log] 신규 로그 파일 생성: {path}")
+
+    def _close(self):
+        if self.file:
+            self.file.close()
+            self.file = None
+            self.writer = None
+            self.path = None
+
+    def flush(self):
+        with self.lock:
+            rows, self.pending = self.pending, []
+            if not rows: return
+            try:
+                for date_str, row in rows:
+                    path = self.path_template.format(date=date_str)
+                    # 날짜가 바뀌었거나 파일이 외부에서 삭제되면 다시 열기
+                    if path != self.path or not os.path.exists(path):
+                        self._open(path)
+                    self.writer.writerow(row)
+                self.file.flush()
+                if self.fsync:
+                    os.fsync(self.file.fileno())
+            except Exception as e:
+                # 디스크 부족/파일 잠김 등: 행을 버퍼 앞쪽에 되돌려 다음 플러시에서 재시도 (유실보다 중복 1회가 낫다)
+                print(f"❌ [Log Error] {self.path_template} 기록 실패, {len(rows)}행 재시도 대기: {e}")
+                self.pending = rows + self.pending
+                try: self._close()
+                except Exception:
+                    self.file = None
+                    self.writer = None
+                    self.path = None
+
+    def close(self):
+        self.flush()
+        with self.lock:
+            self._close()
+
+buy_log = BufferedCsvLog(BUY_LOG_FILE, BUY_HEADER, fsync=True)
+sell_log = BufferedCsvLog(SELL_LOG_FILE, SELL_HEADER, fsync=True)
+value_log = BufferedCsvLog(VALUE_LOG_FILE, VALUE_HEADER)
+_ALL_LOGS = (buy_log, sell_log, value_log)
+
+# ==============================================================================
+# ⏱️ 백그라운드 플러시 스레드
+# ==============================================================================
+_flusher_lock = threading.Lock()
+_flusher_thread = None
+_stop_event = threading.Event()
+
+def _flush_loop():
+    while not _stop_event.wait(FLUSH_INTERVAL):
+        flush()
+
+def _ensure_flusher():
+    global _flusher_thread
+    if _flusher_thread is not None and _flusher_thread.is_alive(): return
+    with _flusher_lock:
+        if _flusher_thread is None or not _flusher_thread.is_alive():
+            _flusher_thread = threading.Thread(target=_flush_loop, name="trade-log-flusher", daemon=True)
+            _flusher_thread.start()
+
+def flush():
+    """버퍼에 쌓인 행을 즉시 디스크에 기록"""
+    for log in _ALL_LOGS:
+        log.flush()
+
+def close():
+    """종료 시 호출: 남은 행 기록 후 파일 닫기"""
+    _stop_event.set()
+    for log in _ALL_LOGS:
+        log.close()
 
 def initialize_logs():
     """
     로그 파일이 존재하는지 확인하고, 없을 경우에만 새로 생성하여 헤더를 작성합니다.
     (이미 존재하면 건너뛰므로 덮어쓰지 않습니다.)
     """
-    if not os.path.exists(LOG_DIR):
-        os.makedirs(LOG_DIR)
-
-    # 1. 매수 로그 확인
-    if not os.path.exists(BUY_LOG_FILE):
-        # 파일이 없을 때만 'w'(쓰기) 모드로 열어서 헤더 작성
-        with open(BUY_LOG_FILE, 'w', encoding='utf-8-sig', newline='') as f:
-            writer = csv.writer(f)
-            writer.writerow([
-                "Time", "Code", "Name", "Strategy", "Level", 
-                "Buy_Price", "Qty", "Program_Amt_Entry", 
-                "Gap_Rate", "Leader_Name"
-            ])
-        print(f"📁 [Log] 신규 매수 로그 파일 생성: {BUY_LOG_FILE}")
-
-    # 2. 매도 로그 확인
-    if not os.path.exists(SELL_LOG_FILE):
-        # 파일이 없을 때만 'w'(쓰기) 모드로 열어서 헤더 작성
-        with open(SELL_LOG_FILE, 'w', encoding='utf-8-sig', newline='') as f:
-            writer = csv.writer(f)
-            writer.writerow([
-                "Time", "Code", "Name", "Strategy", "Reason",
-                "Buy_Price", "Sell_Price", "Qty", "Profit_Rate(%)", "Hold_Min(분)",
-                "Max_Price_During_Hold", "Min_Price_During_Hold",
-                "Entry_PG_Amt", "Max_PG_Amt_During_Hold",
-                "Exit_PG_Amt"
-            ])
-        print(f"📁 [Log] 신규 매도 로그 파일 생성: {SELL_LOG_FILE}")
+    for log in (buy_log, sell_log):
+        with log.lock:
+            if log.file is None:
+                log._open(log.path_template)
 
+# ==============================================================================
+# ✍️ 기록 함수 (매매 경로: 메모리 버퍼에 추가만 함)
+# ==============================================================================
 def log_buy(data):
     """매수 데이터 이어쓰기 (Append)"""
-    # 혹시 파일이 삭제되었을 경우를 대비해 헤더 체크
-    initialize_logs()
-    
-    try:
-        # 'a' 모드(append)는 기존 내용을 유지하고 끝에 추가합니다.
-        with open(BUY_LOG_FILE, 'a', encoding='utf-8-sig', newline='') as f:
-            writer = csv.writer(f)
-            writer.writerow([
-                datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                data.get('code'),
-                data.get('name'),
-                data.get('strategy'),
-                data.get('level'),
-                data.get('price'),
-                data.get('qty'),
-                data.get('pg_amt'),
-                data.get('gap'),
-                data.get('leader')
-            ])
-    except Exception as e:
-        print(f"❌ [Log Error] Buy Log Failed: {e}")
+    _ensure_flusher()
+    buy_log.append([
+        datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        data.get('code'),
+        data.get('name'),
+        data.get('strategy'),
+        data.get('level'),
+        data.get('price'),
+        data.get('qty'),
+        data.get('pg_amt'),
+        data.get('gap'),
+        data.get('leader')
+    ])
 
 def log_sell(data):
     """매도 데이터 이어쓰기 (Append)"""
-    initialize_logs()
-    
+    _ensure_flusher()
     try:
-        # 'a' 모드(append)로 열기
-        with open(SELL_LOG_FILE, 'a', encoding='utf-8-sig', newline='') as f:
-            writer = csv.writer(f)
-            
-            # 수익률 계산 (안전장치 포함)
-            buy_p = float(data.get('buy_price', 0))
-            sell_p = float(data.get('sell_price', 0))
-            profit_rate = ((sell_p - buy_p) / buy_p * 100) if buy_p > 0 else 0
-
-            writer.writerow([
-                datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                data.get('code'),
-                data.get('name'),
-                data.get('strategy'),
-                data.get('reason'),
-                buy_p,
-                sell_p,
-                data.get('qty'),
-                round(profit_rate, 2),
-                data.get('hold_time_min'),
-                data.get('max_price'),  
-                data.get('min_price'),  
-                data.get('entry_pg'),   
-                data.get('max_pg'),     
-                data.get('exit_pg')     
-            ])
+        # 수익률 계산 (안전장치 포함)
+        buy_p = float(data.get('buy_price', 0))
+        sell_p = float(data.get('sell_price', 0))
+        profit_rate = ((sell_p - buy_p) / buy_p * 100) if buy_p > 0 else 0
     except Exception as e:
         print(f"❌ [Log Error] Sell Log Failed: {e}")
+        return
+
+    sell_log.append([
+        datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        data.get('code'),
+        data.get('name'),
+        data.get('strategy'),
+        data.get('reason'),
+        buy_p,
+        sell_p,
+        data.get('qty'),
+        round(profit_rate, 2),
+        data.get('hold_time_min'),
+        data.get('max_price'),
+        data.get('min_price'),
+        data.get('entry_pg'),
+        data.get('max_pg'),
+        data.get('exit_pg')
+    ])
 
+def log_value_volumes(rows, date_str=None):
+    """조건검색 전수 로깅 행 (VALUE_HEADER 순서) 을 일자별 value_volume_log 에 추가"""
+    _ensure_flusher()
+    date_str = date_str or datetime.datetime.now().strftime("%Y%m%d")
+    for row in rows:
+        value_log.append(row, date_str)
@@ -1,9 +1,14 @@
 import requests
 import time
 import csv
+import os
+import json
+import threading
 import config
 import token_manager
+import bar_cache
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 # ==============================================================================
 # ⚙️ 설정 부분
@@ -16,6 +21,36 @@ HTS_ID = config.HTS_ID
 # 검색할 조건식 이름 (기존에 사용하신 'value' 조건식 기준)
 CONDITION_NAME = "value" 
 
+# 동시에 분봉을 받을 종목 수 / 전체 워커가 공유하는 초당 호출 한도 (실전 계좌 초당 20건 이내)
+MAX_WORKERS = 4
+RATE_LIMIT = 15
+# 분봉 페이지 조회 오류(초당 호출 초과 EGW00201 등) 재시도 횟수 / 대기 (0.5, 1, 2초 ...)
+FETCH_RETRIES = 3
+FETCH_BACKOFF_SEC = 0.5
+# 완료된 종목 결과를 한 줄씩 기록 -> 중단 후 재실행 시 이어서 진행 (정상 완료되면 삭제)
+CHECKPOINT_FILE = "value_time_tracking_{date}.progress.jsonl"
+
+# ==============================================================================
+# 🚦 공유 호출 제한 + 세션
+# ==============================================================================
+class RateLimiter:
+    """여러 스레드가 공유하는 초당 호출 제한 (호출 간 최소 간격 보장)"""
+    def __init__(self, rate):
+        self.interval = 1.0 / rate
+        self.lock = threading.Lock()
+        self.next_time = 0.0
+
+    def wait(self):
+        with self.lock:
+            now = time.monotonic()
+            wait_sec = self.next_time - now
+            self.next_time = max(now, self.next_time) + self.interval
+        if wait_sec > 0:
+            time.sleep(wait_sec)
+
+limiter = RateLimiter(RATE_LIMIT)
+session = requests.Session()
+
 def get_headers(tr_id):
     token = token_manager.get_access_token("REAL")
     return {
@@ -27,10 +62,10 @@ def get_headers(tr_id):
         "tr_id": tr_id
     }
 
-def fetch_all_1min_candles(code):
+def fetch_all_1min_candles(code, headers=None):
     """특정 종목의 당일 1분봉 데이터를 09:00부터 끝까지 모두 수집합니다."""
     url = f"{URL_REAL}/uapi/domestic-stock/v1/quotations/inquire-time-itemchartprice"
-    headers = get_headers("FHKST03010200")
+    headers = headers or get_headers("FHKST03010200")
     
     all_candles = []
     # 장 마감 시간(15:30:00)부터 역순으로 조회 시작
@@ -45,10 +80,17 @@ def fetch_all_1min_candles(code):
             "FID_PW_DIV_CODE": "0" 
         }
         
-        time.sleep(0.1) # 초당 호출 제한 방어
-        res = requests.get(url, headers=headers, params=params).json()
+        for attempt in range(FETCH_RETRIES + 1):
+            limiter.wait() # 초당 호출 제한 방어 (전체 워커 공유)
+            res = session.get(url, headers=headers, params=params, timeout=5).json()
+            if res['rt_cd'] == '0': break
+            if attempt == FETCH_RETRIES:
+                # 중간에 끊긴 분봉을 완료로 기록하지 않도록 예외로 알림 (체크포인트/캐시 미기록 -> 재실행 시 다시 수집)
+                raise RuntimeError(f"분봉 조회 실패 ({target_time}): [{res.get('msg_cd')}] {res.get('msg1')}")
+            time.sleep(FETCH_BACKOFF_SEC * (2 ** attempt))
         
-        if res['rt_cd'] != '0' or not res['output2']:
+        # 정상 응답인데 더 받을 데이터가 없으면 종료
+        if not res['output2']:
             break
             
         candles = res['output2']
@@ -66,6 +108,63 @@ def fetch_all_1min_candles(code):
     # 시간 역순(15:30 -> 09:00)을 정순(09:00 -> 15:30)으로 뒤집기
     return list(reversed(all_candles))
 
+def fetch_1min_bars(code, headers=None):
+    """당일 1분봉을 bar_cache 형식 (HHMMSS, 시, 고, 저, 종, 거래량) 튜플 목록으로 변환"""
+    return [
+        (int(c['stck_cntg_hour']), float(c['stck_oprc']), float(c['stck_hgpr']), float(c['stck_lwpr']),
+         float(c['stck_prpr']), int(c['cntg_vol']))
+        for c in fetch_all_1min_candles(code, headers)
+    ]
+
+def summarize_time_value(name, code, bars):
+    """1분봉을 09시부터 순회하며 시간대별 누적 거래대금 스냅샷 계산"""
+    cum_value = 0
+    value_0930 = 0
+    value_1000 = 0
+    value_1100 = 0
+    value_1300 = 0
+    value_total = 0
+    
+    for c_time, c_price, c_vol in zip(bars['time'], bars['close'], bars['volume']):
+        cum_value += int(c_price) * int(c_vol)
+        
+        # 지정된 시간을 지나는 순간의 누적 거래대금을 스냅샷으로 저장
+        if c_time <= 93000: value_0930 = cum_value
+        if c_time <= 100000: value_1000 = cum_value
+        if c_time <= 110000: value_1100 = cum_value
+        if c_time <= 130000: value_1300 = cum_value
+        value_total = cum_value # 마지막이 최종 거래대금
+        
+    return {
+        'Name': name,
+        'Code': code,
+        'Val_09:30(억)': value_0930 // 100_000_000,
+        'Val_10:00(억)': value_1000 // 100_000_000,
+        'Val_11:00(억)': value_1100 // 100_000_000,
+        'Val_13:00(억)': value_1300 // 100_000_000,
+        'Val_Total(억)': value_total // 100_000_000
+    }
+
+# ==============================================================================
+# 💾 체크포인트 (종목 단위 완료 기록)
+# ==============================================================================
+def load_checkpoint(path):
+    """장 마감 이후 기록된(최종 거래대금) 행만 재사용. 장중 기록은 누적값이 중간값이므로 다시 수집"""
+    done = {}
+    if not os.path.exists(path): return done
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try: row = json.loads(line)
+            except ValueError: continue   # 중단으로 잘린 마지막 줄
+            if not row.pop('_complete', False): continue
+            done[row['Code']] = row
+    return done
+
+def append_checkpoint(path, row, complete):
+    """:param complete: 장 마감 이후 수집한 행이면 True (재실행 시 그대로 재사용 가능)"""
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(dict(row, _complete=complete), ensure_ascii=False) + "\n")
+
 def analyze_time_based_value():
     print(f"🔍 ['{CONDITION_NAME}'] 종목들의 시간대별 거래대금 분석을 시작합니다...\n")
     
@@ -93,56 +192,48 @@ def analyze_time_based_value():
         return
         
     stock_list = res_result['output2']
-    print(f"✅ {len(stock_list)}개 종목 포착. 분봉 추적을 시작합니다. (약 1~2분 소요 예상)\n")
+    # ETF/ETN 등은 분석에서 제외 (개별 주식만 보기 위함)
+    stock_list = [item for item in stock_list
+                  if not any(x in item['name'] for x in ["KODEX", "TIGER", "HANARO", "SOL", "RISE", "KBSTAR", "인버스", "레버리지"])]
     
-    results = []
+    # 장 마감 이후 받은 분봉은 (종목, 일자) 파티션으로 캐시 -> 재실행 시 API 재조회 없음
+    today = datetime.now().strftime("%Y%m%d")
+    checkpoint_path = CHECKPOINT_FILE.format(date=today)
+    done = load_checkpoint(checkpoint_path)
+    todo = [item for item in stock_list if item['code'] not in done]
+    if done:
+        print(f"♻️ 이전 실행에서 완료된 {len(done)}개 종목은 건너뜁니다.")
+    print(f"✅ {len(stock_list)}개 종목 포착. 분봉 추적을 시작합니다. (동시 {MAX_WORKERS}종목 / 초당 {RATE_LIMIT}건)\n")
     
-    for idx, item in enumerate(stock_list):
-        code = item['code']
-        name = item['name']
-        
-        # ETF/ETN 등은 분석에서 제외 (개별 주식만 보기 위함)
-        if any(x in name for x in ["KODEX", "TIGER", "HANARO", "SOL", "RISE", "KBSTAR", "인버스", "레버리지"]):
-            continue
-            
-        candles = fetch_all_1min_candles(code)
-        
-        if not candles:
-            continue
-            
-        # 시간대별 누적 거래대금 기록용 변수
-        cum_value = 0
-        value_0930 = 0
-        value_1000 = 0
-        value_1100 = 0
-        value_1300 = 0
-        value_total = 0
-        
-        # 1분봉을 09시부터 순회하며 거래대금 누적
-        for candle in candles:
-            c_time = candle['stck_cntg_hour']
-            c_price = int(candle['stck_prpr'])
-            c_vol = int(candle['cntg_vol'])
-            
-            cum_value += (c_price * c_vol)
-            
-            # 지정된 시간을 지나는 순간의 누적 거래대금을 스냅샷으로 저장
-            if c_time <= "093000": value_0930 = cum_value
-            if c_time <= "100000": value_1000 = cum_value
-            if c_time <= "110000": value_1100 = cum_value
-            if c_time <= "130000": value_1300 = cum_value
-            value_total = cum_value # 마지막이 최종 거래대금
+    # 토큰/헤더는 실행당 1회만 생성해 모든 워커가 공유
+    headers = get_headers("FHKST03010200")
+    fetcher = lambda code: fetch_1min_bars(code, headers)
+    
+    finished = len(done)
+    failed = 0
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as pool:
+        futures = {pool.submit(bar_cache.load_minute_bars, item['code'], today, fetcher): item for item in todo}
+        for future in as_completed(futures):
+            item = futures[future]
+            try:
+                bars = future.result()
+            except Exception as e:
+                # 체크포인트에 남기지 않으므로 재실행 시 다시 시도
+                print(f"⚠️ {item['name']} 분봉 수집 실패: {e}")
+                failed += 1
+                continue
+            finished += 1
+            if not len(bars):
+                continue
             
-        results.append({
-            'Name': name,
-            'Code': code,
-            'Val_09:30(억)': value_0930 // 100_000_000,
-            'Val_10:00(억)': value_1000 // 100_000_000,
-            'Val_11:00(억)': value_1100 // 100_000_000,
-            'Val_13:00(억)': value_1300 // 100_000_000,
-            'Val_Total(억)': value_total // 100_000_000
-        })
-        print(f"⏳ [{idx+1:02d}/{len(stock_list):02d}] {name} 완료 (종가기준: {value_total // 100_000_000:,}억)")
+            # 종목이 끝나는 즉시 스냅샷 출력 + 체크포인트 기록
+            row = summarize_time_value(item['name'], item['code'], bars)
+            append_checkpoint(checkpoint_path, row, bar_cache.is_complete_session(today))
+            done[item['code']] = row
+            print(f"⏳ [{finished:02d}/{len(stock_list):02d}] {row['Name']} | 09:30 {row['Val_09:30(억)']:,}억 | 10:00 {row['Val_10:00(억)']:,}억 | "
+                  f"11:00 {row['Val_11:00(억)']:,}억 | 13:00 {row['Val_13:00(억)']:,}억 | 종가기준 {row['Val_Total(억)']:,}억")
+
+    results = [done[item['code']] for item in stock_list if item['code'] in done]
 
     # 3. CSV 파일로 저장 (종가 거래대금 순 정렬)
     results.sort(key=lambda x: x['Val_Total(억)'], reverse=True)
@@ -153,6 +244,10 @@ def analyze_time_based_value():
             writer = csv.DictWriter(f, fieldnames=results[0].keys())
             writer.writeheader()
             writer.writerows(results)
+    
+    # 모든 종목이 끝났으면 체크포인트 정리 (실패 종목이 남아 있으면 재실행 시 이어서 진행)
+    if not failed and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
             
     print("\n" + "="*60)
     print(f"✅ 분석 완료! 데이터가 '{filename}' 파일로 저장되었습니다.")